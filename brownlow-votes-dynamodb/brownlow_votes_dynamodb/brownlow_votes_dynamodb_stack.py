@@ -3,6 +3,7 @@ from aws_cdk import (
     Stack,
     aws_dynamodb,
     aws_lambda,
+    aws_lambda_event_sources,
     aws_apigateway,
     CfnOutput
 )
@@ -23,6 +24,7 @@ class BrownlowVotesDynamodbStack(Stack):
             billing_mode=aws_dynamodb.BillingMode.PROVISIONED,
             read_capacity=5,
             write_capacity=5,
+            stream=aws_dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
         )
 
         # Add Global Secondary Index (GSI)
@@ -42,6 +44,61 @@ class BrownlowVotesDynamodbStack(Stack):
             write_capacity=5
         )
 
+        # Add a GSI so one season (and model) can be read for filtered leaderboards
+        ddb_table.add_global_secondary_index(
+            index_name="yearGSI",
+            partition_key=aws_dynamodb.Attribute(
+                name="Year",
+                type=aws_dynamodb.AttributeType.STRING
+            ),
+            sort_key=aws_dynamodb.Attribute(
+                name="Model",
+                type=aws_dynamodb.AttributeType.STRING
+            ),
+            projection_type=aws_dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["Player", "Team", "Round", "Votes"],
+            read_capacity=5,
+            write_capacity=5
+        )
+
+        # Last inferred round per year and model, so the inference Lambda can find the
+        # next round with a GetItem instead of scanning the predictions table
+        progress_table = aws_dynamodb.Table(self, "AflBrownlowInferenceProgressTable",
+            table_name="afl-brownlow-inference-progress",
+            partition_key=aws_dynamodb.Attribute(name="Year",
+                type=aws_dynamodb.AttributeType.NUMBER),
+            sort_key=aws_dynamodb.Attribute(name="Model",
+                type=aws_dynamodb.AttributeType.STRING),
+            billing_mode=aws_dynamodb.BillingMode.PROVISIONED,
+            read_capacity=1,
+            write_capacity=1,
+        )
+
+        # Vote totals per board ("ALL", or "<year>#<model>") and player, kept up to date
+        # from the predictions table's stream
+        leaderboard_table = aws_dynamodb.Table(self, "AflBrownlowLeaderboardTable",
+            table_name="afl-brownlow-leaderboard",
+            partition_key=aws_dynamodb.Attribute(name="Board",
+                type=aws_dynamodb.AttributeType.STRING),
+            sort_key=aws_dynamodb.Attribute(name="Player",
+                type=aws_dynamodb.AttributeType.STRING),
+            billing_mode=aws_dynamodb.BillingMode.PROVISIONED,
+            read_capacity=5,
+            write_capacity=5,
+            # Expires the aggregator's markers of applied stream records
+            time_to_live_attribute="ExpiresAt",
+        )
+
+        # Local Secondary Index (LSI) so a board can be read already sorted by votes
+        leaderboard_table.add_local_secondary_index(
+            index_name="votesLSI",
+            sort_key=aws_dynamodb.Attribute(
+                name="Votes",
+                type=aws_dynamodb.AttributeType.NUMBER
+            ),
+            projection_type=aws_dynamodb.ProjectionType.ALL,
+        )
+
         # Create Lambda function from external file
         leaderboard_lambda = aws_lambda.Function(self, "LeaderboardLambda",
             runtime=aws_lambda.Runtime.PYTHON_3_9,
@@ -49,16 +106,60 @@ class BrownlowVotesDynamodbStack(Stack):
             code=aws_lambda.Code.from_asset("lambda"), 
             timeout=cdk.Duration.minutes(15),
             memory_size=1024,# Path to lambda function folder
+            environment={
+                "LEADERBOARD_TABLE_NAME": leaderboard_table.table_name,
+                "VOTES_TABLE_NAME": ddb_table.table_name,
+            },
         )
 
         # Grant DynamoDB read permissions to the Lambda
         leaderboard_lambda.add_to_role_policy(
             PolicyStatement(
-                actions=["dynamodb:Scan", "dynamodb:Query"],
+                actions=["dynamodb:Query", "dynamodb:GetItem"],
+                resources=[
+                    leaderboard_table.table_arn,
+                    f"{leaderboard_table.table_arn}/index/*",
+                    f"{ddb_table.table_arn}/index/yearGSI",
+                ]
+            )
+        )
+
+        # Aggregator applying each batch of vote changes to the leaderboard totals
+        aggregator_lambda = aws_lambda.Function(self, "LeaderboardAggregatorLambda",
+            runtime=aws_lambda.Runtime.PYTHON_3_9,
+            handler="leaderboard_aggregator.handler",
+            code=aws_lambda.Code.from_asset("lambda"),
+            timeout=cdk.Duration.minutes(5),
+            memory_size=256,
+            environment={
+                "LEADERBOARD_TABLE_NAME": leaderboard_table.table_name,
+                "VOTES_TABLE_NAME": ddb_table.table_name,
+            },
+        )
+
+        aggregator_lambda.add_to_role_policy(
+            PolicyStatement(
+                actions=["dynamodb:UpdateItem", "dynamodb:PutItem", "dynamodb:GetItem", "dynamodb:BatchWriteItem"],
+                resources=[leaderboard_table.table_arn]
+            )
+        )
+
+        # Scan is only used when the aggregator is invoked to rebuild the totals
+        aggregator_lambda.add_to_role_policy(
+            PolicyStatement(
+                actions=["dynamodb:Scan"],
                 resources=[ddb_table.table_arn]
             )
         )
 
+        aggregator_lambda.add_event_source(aws_lambda_event_sources.DynamoEventSource(ddb_table,
+            starting_position=aws_lambda.StartingPosition.TRIM_HORIZON,
+            batch_size=100,
+            max_batching_window=cdk.Duration.seconds(5),
+            bisect_batch_on_error=True,
+            retry_attempts=5,
+        ))
+
         # Create API Gateway
         api = aws_apigateway.LambdaRestApi(self, "LeaderboardAPI",
             handler=leaderboard_lambda,
@@ -76,3 +177,11 @@ class BrownlowVotesDynamodbStack(Stack):
         # Output the table name
         CfnOutput(self, 'DynamoDBTableName', value=ddb_table.table_name,
             export_name=f'{self.stack_name}-TableName')
+
+        # Output the leaderboard table name
+        CfnOutput(self, 'LeaderboardTableName', value=leaderboard_table.table_name,
+            export_name=f'{self.stack_name}-LeaderboardTableName')
+
+        # Output the progress table name
+        CfnOutput(self, 'ProgressTableName', value=progress_table.table_name,
+            export_name=f'{self.stack_name}-ProgressTableName')
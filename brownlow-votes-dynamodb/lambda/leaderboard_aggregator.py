@@ -0,0 +1,183 @@
+import os
+import time
+from collections import defaultdict
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+LEADERBOARD_TABLE_NAME = os.environ.get('LEADERBOARD_TABLE_NAME', 'afl-brownlow-leaderboard')
+VOTES_TABLE_NAME = os.environ.get('VOTES_TABLE_NAME', 'afl-brownlow-vote-predictions')
+
+# Every vote counts towards the board of its year and model, and towards the board of all
+# votes that the leaderboard API has always served.
+ALL_BOARD = 'ALL'
+
+# Version marker read by the leaderboard Lambda to invalidate its cached responses
+VERSION_KEY = {'Board': '_meta', 'Player': 'version'}
+# When the last rebuild started; stream records from before it are already in the totals
+REBUILD_KEY = {'Board': '_meta', 'Player': 'rebuild'}
+
+deserializer = TypeDeserializer()
+
+def boards(item):
+    """Returns the leaderboards a predictions item counts towards."""
+    keys = [ALL_BOARD]
+    if 'Year' in item and 'Model' in item:
+        keys.append(f"{item['Year']}#{item['Model']}")
+    return keys
+
+# Each applied stream record leaves a marker under this board, so a retried batch skips the
+# records it already applied. Markers only need to outlive the stream's 24-hour retention.
+APPLIED_BOARD = '_applied'
+APPLIED_TTL_SECONDS = 2 * 24 * 3600
+# TransactWriteItems takes at most 100 actions: one marker per record plus one update per total
+MAX_TRANSACT_ITEMS = 100
+
+def record_deltas(record):
+    """Returns the vote changes of one stream record per (board, player)."""
+    deltas = defaultdict(int)
+    images = record.get('dynamodb', {})
+    for image_name, sign in (('OldImage', -1), ('NewImage', 1)):
+        image = images.get(image_name)
+        if not image:
+            continue
+        item = {k: deserializer.deserialize(v) for k, v in image.items()}
+        if 'Player' not in item or 'Votes' not in item:
+            continue
+        for board in boards(item):
+            deltas[(board, item['Player'])] += sign * int(item['Votes'])
+    return {key: delta for key, delta in deltas.items() if delta}
+
+def vote_deltas(records):
+    """Sums the vote changes of a batch of stream records per (board, player)."""
+    deltas = defaultdict(int)
+    for record in records:
+        for key, delta in record_deltas(record).items():
+            deltas[key] += delta
+    return {key: delta for key, delta in deltas.items() if delta}
+
+def _transact(table, records, now):
+    """Applies the summed deltas of `records` and their markers in one transaction."""
+    deltas = vote_deltas(records)
+    actions = [
+        {'Put': {
+            'TableName': table.name,
+            'Item': {'Board': APPLIED_BOARD, 'Player': record['eventID'], 'ExpiresAt': now + APPLIED_TTL_SECONDS},
+            'ConditionExpression': 'attribute_not_exists(Board)',
+        }}
+        for record in records
+    ]
+    actions += [
+        {'Update': {
+            'TableName': table.name,
+            'Key': {'Board': board, 'Player': player},
+            'UpdateExpression': 'ADD Votes :delta',
+            'ExpressionAttributeValues': {':delta': delta},
+        }}
+        for (board, player), delta in deltas.items()
+    ]
+    table.meta.client.transact_write_items(TransactItems=actions)
+    return len(deltas)
+
+def _chunks(records):
+    """Groups records so each group's markers and totals fit in one transaction."""
+    chunk, keys = [], set()
+    for record in records:
+        record_keys = set(record_deltas(record))
+        if chunk and len(chunk) + 1 + len(keys | record_keys) > MAX_TRANSACT_ITEMS:
+            yield chunk
+            chunk, keys = [], set()
+        chunk.append(record)
+        keys |= record_keys
+    if chunk:
+        yield chunk
+
+def _apply_once(table, record, now):
+    """Applies one record on its own; returns 0 if an earlier attempt already applied it."""
+    try:
+        return _transact(table, [record], now)
+    except ClientError as e:
+        reasons = e.response.get('CancellationReasons') or [{}]
+        if e.response['Error']['Code'] == 'TransactionCanceledException' and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return 0
+        raise
+
+def apply_records(table, records, rebuilt_at=None, now=None):
+    """Applies the vote changes of stream records to the totals exactly once.
+
+    Each group of records is applied in a transaction with a marker per record, conditional
+    on the marker not existing. When a retried or bisected batch holds records already
+    applied, the group is cancelled and its records are applied one at a time, skipping
+    those with a marker. Records created before `rebuilt_at` are already counted by a
+    rebuild and are skipped. Returns the number of totals updated.
+    """
+    now = int(now if now is not None else time.time())
+    pending = [
+        record for record in records
+        if record_deltas(record)
+        and (rebuilt_at is None or record.get('dynamodb', {}).get('ApproximateCreationDateTime', now) >= rebuilt_at)
+    ]
+    updated = 0
+    for chunk in _chunks(pending):
+        try:
+            updated += _transact(table, chunk, now)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            updated += sum(_apply_once(table, record, now) for record in chunk)
+    return updated
+
+def bump_version(table):
+    table.update_item(
+        Key=VERSION_KEY,
+        UpdateExpression='ADD Version :one',
+        ExpressionAttributeValues={':one': 1},
+    )
+
+def rebuild(votes_table, leaderboard_table):
+    """Recomputes every board from a paginated scan of the predictions table.
+
+    Puts are absolute, so a rebuild can be repeated. The scan's start time is recorded
+    and stream records from before it are skipped, as the scan already counted them. A
+    vote written while the scan runs may still be missed or counted twice, so rebuild
+    when no inference is writing.
+    """
+    started = int(time.time())
+    totals = defaultdict(int)
+    kwargs = {'ProjectionExpression': 'Player, Votes, #y, Model', 'ExpressionAttributeNames': {'#y': 'Year'}}
+    while True:
+        response = votes_table.scan(**kwargs)
+        for item in response['Items']:
+            if 'Player' in item and 'Votes' in item:
+                for board in boards(item):
+                    totals[(board, item['Player'])] += int(item['Votes'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    with leaderboard_table.batch_writer(overwrite_by_pkeys=['Board', 'Player']) as batch:
+        for (board, player), votes in totals.items():
+            batch.put_item(Item={'Board': board, 'Player': player, 'Votes': votes})
+    leaderboard_table.put_item(Item=dict(REBUILD_KEY, RebuiltAt=started))
+    return len(totals)
+
+def rebuilt_at(table):
+    item = table.get_item(Key=REBUILD_KEY).get('Item')
+    return int(item['RebuiltAt']) if item else None
+
+def handler(event, context):
+    dynamodb = boto3.resource('dynamodb')
+    leaderboard_table = dynamodb.Table(LEADERBOARD_TABLE_NAME)
+
+    # Invoked directly with {"rebuild": true} to seed the boards from existing predictions
+    if event.get('rebuild'):
+        count = rebuild(dynamodb.Table(VOTES_TABLE_NAME), leaderboard_table)
+        bump_version(leaderboard_table)
+        return {'rebuilt': count}
+
+    records = event.get('Records', [])
+    updated = apply_records(leaderboard_table, records, rebuilt_at(leaderboard_table)) if records else 0
+    if updated:
+        bump_version(leaderboard_table)
+    return {'updated': updated}
@@ -1,31 +1,314 @@
+import base64
+import hashlib
 import json
+import os
+import time
+from collections import OrderedDict, defaultdict
+from decimal import Decimal, InvalidOperation
+
 import boto3
-from collections import defaultdict
+from boto3.dynamodb.conditions import Attr, Key
 
-def handler(event, context):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('afl-brownlow-vote-predictions')
+LEADERBOARD_TABLE_NAME = os.environ.get('LEADERBOARD_TABLE_NAME', 'afl-brownlow-leaderboard')
+VOTES_TABLE_NAME = os.environ.get('VOTES_TABLE_NAME', 'afl-brownlow-vote-predictions')
+VOTES_INDEX_NAME = 'votesLSI'
+YEAR_INDEX_NAME = 'yearGSI'
+ALL_BOARD = 'ALL'
+# Season simulations written by the inference Lambda, one board per year and model
+SIMULATION_BOARD = 'sim#{year}#{model}'
+VIEWS = ('votes', 'simulation')
+
+DEFAULT_TOP = 100
+MAX_TOP = 1000
+CACHE_CONTROL = 'public, max-age=300'
+
+# Bumped by the inference Lambda and the aggregator whenever votes change
+VERSION_KEY = {'Board': '_meta', 'Player': 'version'}
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '300'))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '256'))
+VERSION_CHECK_SECONDS = float(os.environ.get('VERSION_CHECK_SECONDS', '30'))
+
+class TTLCache:
+    """Least-recently-used cache whose entries also expire `ttl` seconds after being set."""
+
+    def __init__(self, ttl, max_entries, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self.clock():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+# Kept for the life of the container so warm invocations answer from memory
+clock = time.monotonic
+_dynamodb = None
+_responses = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+# Sorted season totals per data version and filters, so later pages skip the re-query
+_season_totals = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+_version = {'value': None, 'checked': float('-inf')}
 
-    # Scan the DynamoDB table to retrieve all votes
-    response = table.scan()
-    items = response['Items']
+class BadRequest(ValueError):
+    pass
 
-    # Dictionary to hold the total votes for each player
-    player_votes = defaultdict(int)
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
 
-    # Sum votes for each player
-    for item in items:
-        player = item['Player']
-        votes = int(item['Votes'])
-        player_votes[player] += votes
+# A board cursor holds the last key read from votesLSI
+CURSOR_KEY_ATTRIBUTES = {'Board', 'Player', 'Votes'}
 
-    # Convert dictionary to a sorted list of tuples (player, votes)
-    leaderboard = sorted(player_votes.items(), key=lambda x: x[1], reverse=True)
+def _valid_key(key):
+    if not isinstance(key, dict) or set(key) != CURSOR_KEY_ATTRIBUTES:
+        return False
+    if not isinstance(key['Board'], str) or not isinstance(key['Player'], str):
+        return False
+    if isinstance(key['Votes'], bool) or not isinstance(key['Votes'], (int, str)):
+        return False
+    try:
+        return Decimal(str(key['Votes'])).is_finite()
+    except InvalidOperation:
+        return False
 
-    # Return the top player and leaderboard
+def decode_cursor(token):
+    """Decodes a cursor: {"offset": n} into season totals or {"key": {...}} into a board."""
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        cursor = None
+    if not isinstance(cursor, dict) or len(cursor) != 1:
+        raise BadRequest("Invalid cursor")
+    if 'offset' in cursor:
+        offset = cursor['offset']
+        if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+            raise BadRequest("Invalid cursor")
+    elif not _valid_key(cursor.get('key')):
+        raise BadRequest("Invalid cursor")
+    return cursor
+
+def int_param(params, name, default=None, minimum=0, maximum=None):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+    if value < minimum:
+        raise BadRequest(f"'{name}' must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise BadRequest(f"'{name}' must be at most {maximum}")
+    return value
+
+def parse_query(params):
+    """Validates the query string of GET /leaderboard."""
+    query = {
+        'year': int_param(params, 'year', minimum=1897, maximum=9999),
+        'model': params.get('model'),
+        'team': params.get('team'),
+        'round_from': int_param(params, 'round_from'),
+        'round_to': int_param(params, 'round_to'),
+        'top': int_param(params, 'top', DEFAULT_TOP, minimum=1, maximum=MAX_TOP),
+        'cursor': decode_cursor(params['cursor']) if params.get('cursor') else None,
+        'view': params.get('view', 'votes'),
+    }
+    if query['view'] not in VIEWS:
+        raise BadRequest(f"'view' must be one of {', '.join(VIEWS)}")
+    if query['view'] == 'simulation':
+        if query['year'] is None or query['model'] is None:
+            raise BadRequest("'year' and 'model' are required for the simulation view")
+        if query['team'] is not None or query['round_from'] is not None or query['round_to'] is not None:
+            raise BadRequest("The simulation view covers whole seasons and takes no team or round filters")
+    filtered = [name for name in ('model', 'team', 'round_from', 'round_to') if query[name] is not None]
+    if filtered and query['year'] is None:
+        raise BadRequest(f"'year' is required when filtering by {', '.join(filtered)}")
+    if None not in (query['round_from'], query['round_to']) and query['round_from'] > query['round_to']:
+        raise BadRequest("'round_from' must not be after 'round_to'")
+    # A cursor only continues the kind of listing that issued it
+    cursor = query['cursor']
+    if cursor is not None:
+        board = board_name(query)
+        if (board is None) != ('offset' in cursor) or (board is not None and cursor['key']['Board'] != board):
+            raise BadRequest("Cursor does not match the query")
+    return query
+
+def board_name(query):
+    """Returns the precomputed board answering `query`, or None if it needs per-vote rows."""
+    if query.get('view') == 'simulation':
+        return SIMULATION_BOARD.format(year=query['year'], model=query['model'])
+    if query['team'] is not None or query['round_from'] is not None or query['round_to'] is not None:
+        return None
+    if query['year'] is None:
+        return ALL_BOARD
+    if query['model'] is not None:
+        return f"{query['year']}#{query['model']}"
+    return None
+
+def vote_row(item):
+    return (item['Player'], int(item['Votes'])) if item['Votes'] else None
+
+def simulation_row(item):
     return {
-        'statusCode': 200,
-        'body': json.dumps({
-            'Leaderboard': leaderboard
-        })
+        'Player': item['Player'],
+        'ExpectedVotes': float(item['Votes']),
+        'WinProbability': float(item['WinProbability']),
+        'RankProbabilities': [float(p) for p in item.get('RankProbabilities', [])],
+    }
+
+def read_board(table, board, limit=None, start_key=None, row=vote_row):
+    """Reads a board's rows already sorted by votes from the local secondary index.
+
+    Returns `row` of each item, (player, votes) pairs by default, and the key to continue
+    from, if `limit` cut the read short.
+    """
+    leaderboard = []
+    kwargs = {
+        'IndexName': VOTES_INDEX_NAME,
+        'KeyConditionExpression': Key('Board').eq(board),
+        'ScanIndexForward': False,
     }
+    if start_key:
+        kwargs['ExclusiveStartKey'] = start_key
+    while True:
+        if limit is not None:
+            kwargs['Limit'] = limit - len(leaderboard)
+        response = table.query(**kwargs)
+        leaderboard.extend(r for r in map(row, response['Items']) if r is not None)
+        last_key = response.get('LastEvaluatedKey')
+        if last_key is None or (limit is not None and len(leaderboard) >= limit):
+            return leaderboard, last_key
+        kwargs['ExclusiveStartKey'] = last_key
+
+def sum_season_votes(table, query):
+    """Totals the votes of one season from `yearGSI`, sorted by votes then player."""
+    key_condition = Key('Year').eq(str(query['year']))
+    if query['model'] is not None:
+        key_condition = key_condition & Key('Model').eq(query['model'])
+    kwargs = {
+        'IndexName': YEAR_INDEX_NAME,
+        'KeyConditionExpression': key_condition,
+        'ProjectionExpression': 'Player, Votes, #round',
+        'ExpressionAttributeNames': {'#round': 'Round'},
+    }
+    if query['team'] is not None:
+        kwargs['FilterExpression'] = Attr('Team').eq(query['team'])
+
+    round_from = query['round_from'] if query['round_from'] is not None else float('-inf')
+    round_to = query['round_to'] if query['round_to'] is not None else float('inf')
+    totals = defaultdict(int)
+    while True:
+        response = table.query(**kwargs)
+        for item in response['Items']:
+            # Round is stored as a string, so the range is applied here rather than in the key
+            if round_from <= int(item['Round']) <= round_to:
+                totals[item['Player']] += int(item['Votes'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return sorted(totals.items(), key=lambda x: (-x[1], x[0]))
+
+def season_totals(dynamodb, query, version=None):
+    """Returns `sum_season_votes` for `query`, cached per data version and filters."""
+    key = (version, query['year'], query['model'], query['team'], query['round_from'], query['round_to'])
+    totals = _season_totals.get(key) if version is not None else None
+    if totals is None:
+        totals = sum_season_votes(dynamodb.Table(VOTES_TABLE_NAME), query)
+        if version is not None:
+            _season_totals.set(key, totals)
+    return totals
+
+def leaderboard_page(dynamodb, query, version=None):
+    """Returns one page of the leaderboard for `query` and the cursor of the next page."""
+    cursor = query['cursor'] or {}
+    board = board_name(query)
+    if board is not None:
+        table = dynamodb.Table(LEADERBOARD_TABLE_NAME)
+        row = simulation_row if query.get('view') == 'simulation' else vote_row
+        start_key = _dynamodb_key(cursor['key']) if cursor.get('key') else None
+        leaderboard, last_key = read_board(table, board, limit=query['top'], start_key=start_key, row=row)
+        return leaderboard, ({'key': _plain(last_key)} if last_key else None)
+
+    totals = season_totals(dynamodb, query, version)
+    offset = cursor.get('offset', 0)
+    end = offset + query['top']
+    return totals[offset:end], ({'offset': end} if end < len(totals) else None)
+
+def _plain(key):
+    # Votes comes back from DynamoDB as a Decimal, which json cannot encode; expected
+    # votes on simulation boards are fractional and kept exact as strings
+    return {k: (int(v) if v == v.to_integral_value() else str(v)) if k == 'Votes' else v for k, v in key.items()}
+
+def _dynamodb_key(key):
+    return {k: Decimal(str(v)) if k == 'Votes' else v for k, v in key.items()}
+
+def get_dynamodb():
+    global _dynamodb
+    if _dynamodb is None:
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb
+
+def data_version(dynamodb):
+    """Returns the version marker, re-reading it at most every VERSION_CHECK_SECONDS."""
+    now = clock()
+    if now - _version['checked'] >= VERSION_CHECK_SECONDS:
+        item = dynamodb.Table(LEADERBOARD_TABLE_NAME).get_item(Key=VERSION_KEY).get('Item', {})
+        _version['value'] = int(item.get('Version', 0))
+        _version['checked'] = now
+    return _version['value']
+
+def response(status_code, body, headers=None):
+    return {
+        'statusCode': status_code,
+        'headers': {'Content-Type': 'application/json', **(headers or {})},
+        'body': json.dumps(body),
+    }
+
+def if_none_match(event):
+    headers = (event or {}).get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == 'if-none-match':
+            return {tag.strip() for tag in value.split(',')}
+    return set()
+
+def handler(event, context):
+    params = (event or {}).get('queryStringParameters') or {}
+    try:
+        query = parse_query(params)
+    except BadRequest as e:
+        return response(400, {'Error': str(e)})
+
+    dynamodb = get_dynamodb()
+    version = data_version(dynamodb)
+    cache_key = (version, tuple(sorted(params.items())))
+    cached = _responses.get(cache_key)
+    if cached is None:
+        leaderboard, next_cursor = leaderboard_page(dynamodb, query, version)
+        body = {'Simulation' if query['view'] == 'simulation' else 'Leaderboard': leaderboard}
+        if next_cursor is not None:
+            body['NextCursor'] = encode_cursor(next_cursor)
+        body = json.dumps(body)
+        etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+        cached = (body, etag)
+        _responses.set(cache_key, cached)
+
+    body, etag = cached
+    headers = {'Content-Type': 'application/json', 'Cache-Control': CACHE_CONTROL, 'ETag': etag}
+    if if_none_match(event) & {etag, '*'}:
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
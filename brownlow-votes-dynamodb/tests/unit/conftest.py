@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The Lambda sources live in lambda/, which is not an importable package name
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "lambda"))
@@ -13,3 +13,35 @@ def test_sqs_queue_created():
 #     template.has_resource_properties("AWS::SQS::Queue", {
 #         "VisibilityTimeout": 300
 #     })
+
+def test_progress_table_created():
+    app = core.App()
+    stack = BrownlowVotesDynamodbStack(app, "brownlow-votes-dynamodb")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "afl-brownlow-inference-progress",
+        "KeySchema": [
+            {"AttributeName": "Year", "KeyType": "HASH"},
+            {"AttributeName": "Model", "KeyType": "RANGE"},
+        ],
+    })
+
+def test_leaderboard_aggregated_from_stream():
+    app = core.App()
+    stack = BrownlowVotesDynamodbStack(app, "brownlow-votes-dynamodb")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "afl-brownlow-vote-predictions",
+        "StreamSpecification": {"StreamViewType": "NEW_AND_OLD_IMAGES"},
+    })
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "afl-brownlow-leaderboard",
+        "LocalSecondaryIndexes": [assertions.Match.object_like({"IndexName": "votesLSI"})],
+        "TimeToLiveSpecification": {"AttributeName": "ExpiresAt", "Enabled": True},
+    })
+    template.has_resource_properties("AWS::Lambda::EventSourceMapping", {
+        "StartingPosition": "TRIM_HORIZON",
+        "BisectBatchOnFunctionError": True,
+    })
@@ -0,0 +1,294 @@
+import itertools
+import json
+import time
+from decimal import Decimal
+
+import boto3
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from moto import mock_aws
+
+import leaderboard_aggregator
+import leaderboard_lambda
+
+MODEL = "models/model.onnx"
+
+serializer = TypeSerializer()
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(leaderboard_lambda, "clock", clock)
+    return clock
+
+@pytest.fixture
+def tables(monkeypatch, clock):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+    monkeypatch.setattr(leaderboard_lambda, "_dynamodb", None)
+    monkeypatch.setattr(leaderboard_lambda, "_responses", leaderboard_lambda.TTLCache(60, 4, clock))
+    monkeypatch.setattr(leaderboard_lambda, "_season_totals", leaderboard_lambda.TTLCache(60, 4, clock))
+    monkeypatch.setattr(leaderboard_lambda, "_version", {"value": None, "checked": float("-inf")})
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        votes = dynamodb.create_table(
+            TableName="afl-brownlow-vote-predictions",
+            KeySchema=[{"AttributeName": "HashKey", "KeyType": "HASH"}, {"AttributeName": "Model", "KeyType": "RANGE"}],
+            AttributeDefinitions=[
+                {"AttributeName": "HashKey", "AttributeType": "S"},
+                {"AttributeName": "Model", "AttributeType": "S"},
+                {"AttributeName": "Year", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "yearGSI",
+                "KeySchema": [{"AttributeName": "Year", "KeyType": "HASH"}, {"AttributeName": "Model", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["Player", "Team", "Round", "Votes"]},
+                "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+            }],
+            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        )
+        leaderboard = dynamodb.create_table(
+            TableName="afl-brownlow-leaderboard",
+            KeySchema=[{"AttributeName": "Board", "KeyType": "HASH"}, {"AttributeName": "Player", "KeyType": "RANGE"}],
+            AttributeDefinitions=[
+                {"AttributeName": "Board", "AttributeType": "S"},
+                {"AttributeName": "Player", "AttributeType": "S"},
+                {"AttributeName": "Votes", "AttributeType": "N"},
+            ],
+            LocalSecondaryIndexes=[{
+                "IndexName": "votesLSI",
+                "KeySchema": [{"AttributeName": "Board", "KeyType": "HASH"}, {"AttributeName": "Votes", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        )
+        yield votes, leaderboard
+
+def vote(hash_key, player, votes, year="2024", model=MODEL, team="adelaide", round_number=0):
+    return {
+        "HashKey": hash_key,
+        "Model": model,
+        "Player": player,
+        "Votes": str(votes),
+        "Year": year,
+        "Team": team,
+        "Round": str(round_number),
+    }
+
+_event_ids = itertools.count()
+
+def record(event_name, old=None, new=None, created=None):
+    images = {"ApproximateCreationDateTime": time.time() if created is None else created}
+    if old:
+        images["OldImage"] = {k: serializer.serialize(v) for k, v in old.items()}
+    if new:
+        images["NewImage"] = {k: serializer.serialize(v) for k, v in new.items()}
+    return {"eventID": f"event-{next(_event_ids)}", "eventName": event_name, "dynamodb": images}
+
+def get(headers=None, **params):
+    result = leaderboard_lambda.handler({"queryStringParameters": params or None, "headers": headers}, None)
+    return result["statusCode"], json.loads(result["body"]), result["headers"]
+
+def leaderboard_body(**params):
+    return get(**params)[1]["Leaderboard"]
+
+def store(votes, leaderboard, items):
+    """Writes votes and feeds them to the aggregator as the stream would."""
+    for item in items:
+        votes.put_item(Item=item)
+    leaderboard_aggregator.handler({"Records": [record("INSERT", new=item) for item in items]}, None)
+
+def test_stream_records_maintain_sorted_totals(tables):
+    _, leaderboard = tables
+    leaderboard_aggregator.handler({"Records": [
+        record("INSERT", new=vote("a", "Bontempelli, Marcus", 3)),
+        record("INSERT", new=vote("b", "Daicos, Nick", 2)),
+        record("INSERT", new=vote("c", "Bontempelli, Marcus", 1, year="2023")),
+    ]}, None)
+    leaderboard_aggregator.handler({"Records": [
+        # A re-inferred game moves votes from one player to another
+        record("MODIFY", old=vote("a", "Bontempelli, Marcus", 3), new=vote("a", "Bontempelli, Marcus", 1)),
+        record("INSERT", new=vote("d", "Daicos, Nick", 3)),
+        record("REMOVE", old=vote("c", "Bontempelli, Marcus", 1, year="2023")),
+    ]}, None)
+
+    assert leaderboard_body() == [["Daicos, Nick", 5], ["Bontempelli, Marcus", 1]]
+    year_board, _ = leaderboard_lambda.read_board(leaderboard, f"2024#{MODEL}")
+    assert year_board == [("Daicos, Nick", 5), ("Bontempelli, Marcus", 1)]
+    assert leaderboard_lambda.read_board(leaderboard, f"2023#{MODEL}") == ([], None)
+
+def test_rebuild_matches_a_full_scan(tables):
+    votes, leaderboard = tables
+    for i, (player, n) in enumerate([("Cripps, Patrick", 3), ("Petracca, Christian", 2), ("Cripps, Patrick", 2)]):
+        votes.put_item(Item=vote(str(i), player, n))
+
+    assert leaderboard_aggregator.handler({"rebuild": True}, None) == {"rebuilt": 4}
+    assert leaderboard_body() == [["Cripps, Patrick", 5], ["Petracca, Christian", 2]]
+
+def test_retried_batches_apply_each_record_once(tables):
+    first = record("INSERT", new=vote("a", "Bontempelli, Marcus", 3))
+    second = record("INSERT", new=vote("b", "Daicos, Nick", 2))
+    leaderboard_aggregator.handler({"Records": [first]}, None)
+
+    # The stream redelivers the whole batch after a failure part-way, then bisects it
+    leaderboard_aggregator.handler({"Records": [first, second]}, None)
+    leaderboard_aggregator.handler({"Records": [first, second]}, None)
+    leaderboard_aggregator.handler({"Records": [second]}, None)
+
+    assert leaderboard_body() == [["Bontempelli, Marcus", 3], ["Daicos, Nick", 2]]
+
+def test_records_from_before_a_rebuild_are_not_counted_twice(tables):
+    votes, _ = tables
+    item = vote("a", "Cripps, Patrick", 3)
+    votes.put_item(Item=item)
+    old = record("INSERT", new=item, created=time.time() - 60)
+    leaderboard_aggregator.handler({"rebuild": True}, None)
+
+    leaderboard_aggregator.handler({"Records": [old, record("INSERT", new=vote("b", "Cripps, Patrick", 1))]}, None)
+
+    assert leaderboard_body() == [["Cripps, Patrick", 4]]
+
+SEASON = [
+    vote("1", "Cripps, Patrick", 3, team="carlton", round_number=2),
+    vote("2", "Petracca, Christian", 2, team="melbourne", round_number=2),
+    vote("3", "Cripps, Patrick", 3, team="carlton", round_number=10),
+    vote("4", "Oliver, Clayton", 3, team="melbourne", round_number=11),
+    vote("5", "Oliver, Clayton", 1, team="melbourne", round_number=11, model="models/other.onnx"),
+    vote("6", "Neale, Lachie", 3, year="2023", team="brisbanel", round_number=2),
+]
+
+def test_season_and_model_board(tables):
+    store(*tables, SEASON)
+
+    status, body, headers = get(year="2024", model=MODEL)
+
+    assert status == 200
+    assert body == {"Leaderboard": [["Cripps, Patrick", 6], ["Oliver, Clayton", 3], ["Petracca, Christian", 2]]}
+    assert headers["Cache-Control"] == leaderboard_lambda.CACHE_CONTROL
+
+@pytest.mark.parametrize("params, expected", [
+    ({"year": "2024"}, [["Cripps, Patrick", 6], ["Oliver, Clayton", 4], ["Petracca, Christian", 2]]),
+    ({"year": "2024", "model": MODEL, "team": "melbourne"}, [["Oliver, Clayton", 3], ["Petracca, Christian", 2]]),
+    ({"year": "2024", "model": MODEL, "round_from": "3", "round_to": "10"}, [["Cripps, Patrick", 3]]),
+    ({"year": "2024", "round_from": "10"}, [["Oliver, Clayton", 4], ["Cripps, Patrick", 3]]),
+    ({"year": "2023"}, [["Neale, Lachie", 3]]),
+])
+def test_filtered_leaderboards(tables, params, expected):
+    store(*tables, SEASON)
+
+    assert leaderboard_body(**params) == expected
+
+@pytest.mark.parametrize("params", [{}, {"year": "2024"}, {"year": "2024", "model": MODEL}])
+def test_cursor_pagination_walks_every_player(tables, params):
+    store(*tables, SEASON)
+    expected = leaderboard_body(**params)
+
+    pages, cursor = [], None
+    while True:
+        page_params = dict(params, top="1", **({"cursor": cursor} if cursor else {}))
+        _, body, _ = get(**page_params)
+        pages.extend(body["Leaderboard"])
+        cursor = body.get("NextCursor")
+        if cursor is None:
+            break
+
+    assert pages == expected
+
+@pytest.mark.parametrize("params", [
+    {"team": "carlton"},
+    {"year": "twenty"},
+    {"year": "2024", "round_from": "5", "round_to": "4"},
+    {"top": "0"},
+    {"cursor": "not-a-cursor"},
+    {"year": "2024", "cursor": leaderboard_lambda.encode_cursor({"offset": "10"})},
+    {"year": "2024", "cursor": leaderboard_lambda.encode_cursor({"offset": -1})},
+    {"cursor": leaderboard_lambda.encode_cursor({"key": ["ALL"]})},
+    {"cursor": leaderboard_lambda.encode_cursor({"key": {"Board": "ALL", "Player": "Smith, Jack"}})},
+    {"cursor": leaderboard_lambda.encode_cursor({"key": {"Board": "ALL", "Player": "Smith, Jack", "Votes": "many"}})},
+    {"cursor": leaderboard_lambda.encode_cursor({"offset": 1})},
+    {"year": "2024", "model": MODEL, "cursor": leaderboard_lambda.encode_cursor({"key": {"Board": "ALL", "Player": "Smith, Jack", "Votes": 3}})},
+    {"view": "odds"},
+    {"view": "simulation", "year": "2024"},
+    {"view": "simulation", "year": "2024", "model": MODEL, "team": "carlton"},
+])
+def test_bad_requests(tables, params):
+    status, body, _ = get(**params)
+
+    assert status == 400
+    assert "Error" in body
+
+def test_simulation_view_pages_through_expected_votes(tables):
+    _, leaderboard = tables
+    for player, expected, win in [("Smith, Jack", "12.3456", "0.61"), ("Ward, Tom", "12.3455", "0.38"), ("Dunn, Sam", "0.5", "0")]:
+        leaderboard.put_item(Item={
+            "Board": f"sim#2024#{MODEL}",
+            "Player": player,
+            "Votes": Decimal(expected),
+            "WinProbability": Decimal(win),
+            "RankProbabilities": [Decimal(win), Decimal("0.2")],
+        })
+
+    pages, cursor = [], None
+    while True:
+        _, body, _ = get(view="simulation", year="2024", model=MODEL, top="1", **({"cursor": cursor} if cursor else {}))
+        pages.extend(body["Simulation"])
+        cursor = body.get("NextCursor")
+        if cursor is None:
+            break
+
+    assert [row["Player"] for row in pages] == ["Smith, Jack", "Ward, Tom", "Dunn, Sam"]
+    assert pages[0] == {"Player": "Smith, Jack", "ExpectedVotes": 12.3456, "WinProbability": 0.61, "RankProbabilities": [0.61, 0.2]}
+
+def test_warm_requests_are_served_from_memory(tables, monkeypatch):
+    store(*tables, SEASON)
+    first = get(year="2024")
+
+    monkeypatch.setattr(leaderboard_lambda, "leaderboard_page", lambda *args: pytest.fail("read DynamoDB"))
+
+    assert get(year="2024") == first
+
+def test_later_season_pages_reuse_the_summed_totals(tables, monkeypatch):
+    store(*tables, SEASON)
+    _, first, _ = get(year="2024", top="1")
+
+    monkeypatch.setattr(leaderboard_lambda, "sum_season_votes", lambda *args: pytest.fail("re-summed the season"))
+    _, second, _ = get(year="2024", top="1", cursor=first["NextCursor"])
+
+    assert first["Leaderboard"] + second["Leaderboard"] == [["Cripps, Patrick", 6], ["Oliver, Clayton", 4]]
+
+def test_version_bump_invalidates_cached_responses(tables, clock):
+    store(*tables, SEASON[:2])
+    assert leaderboard_body(year="2024", model=MODEL) == [["Cripps, Patrick", 3], ["Petracca, Christian", 2]]
+
+    store(*tables, SEASON[2:4])
+    clock.now += leaderboard_lambda.VERSION_CHECK_SECONDS
+
+    assert leaderboard_body(year="2024", model=MODEL) == [["Cripps, Patrick", 6], ["Oliver, Clayton", 3], ["Petracca, Christian", 2]]
+
+def test_matching_etag_gets_not_modified(tables):
+    store(*tables, SEASON)
+    _, _, headers = get()
+
+    result = leaderboard_lambda.handler({"queryStringParameters": None, "headers": {"If-None-Match": headers["ETag"]}}, None)
+
+    assert result["statusCode"] == 304
+    assert result["body"] == ""
+    assert result["headers"]["ETag"] == headers["ETag"]
+
+def test_ttl_cache_expires_and_evicts(clock):
+    cache = leaderboard_lambda.TTLCache(ttl=10, max_entries=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    clock.now += 10
+    assert cache.get("c") is None
@@ -0,0 +1,162 @@
+"""Per-stage timing and memory metrics for the Docker Lambdas, as CloudWatch Embedded Metric Format.
+
+Instrumented code wraps each stage in `metrics.stage(name)` and sets `rows` on the
+record it yields. Stages nest: a stage's duration excludes the time spent in the stages
+inside it. `flush` prints one EMF document per stage, which CloudWatch Logs turns into
+`Duration`, `PeakRSS` and `Rows` metrics dimensioned by service and stage.
+
+Metrics are off unless `METRICS_ENABLED` is set, and `stage` then does nothing.
+
+Stages and totals are kept per thread, so invocations run side by side in one process,
+like the round tasks of a local fan-out, each report only their own stages.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'BrownlowPipeline')
+
+def env_enabled() -> bool:
+    return os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes', 'on')
+
+def _status_mb(field: str) -> Optional[float]:
+    """Reads a memory figure (VmRSS, VmHWM) of this process from /proc, in MB."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss() -> bool:
+    """Resets the kernel's peak RSS counter so the next reading covers one stage only."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+class StageRecord:
+    __slots__ = ('name', 'rows', 'start', 'children')
+
+    def __init__(self, name: str, rows: Optional[int] = None):
+        self.name = name
+        self.rows = rows
+        self.start = 0.0
+        self.children = 0.0
+
+class _Disabled:
+    """Stands in for a stage when metrics are off; `rows` can still be set on it."""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_DISABLED = _Disabled()
+
+class Metrics:
+    def __init__(self, service: str, enabled: Optional[bool] = None, namespace: str = NAMESPACE, stream=None):
+        self.service = service
+        self.enabled = env_enabled() if enabled is None else enabled
+        self.namespace = namespace
+        self.stream = stream
+        self._local = threading.local()
+
+    @property
+    def totals(self) -> Dict[str, dict]:
+        if not hasattr(self._local, 'totals'):
+            self._local.totals = {}
+        return self._local.totals
+
+    @totals.setter
+    def totals(self, totals: Dict[str, dict]):
+        self._local.totals = totals
+
+    @property
+    def stack(self) -> List[StageRecord]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @stack.setter
+    def stack(self, stack: List[StageRecord]):
+        self._local.stack = stack
+
+    def reset(self, enabled: Optional[bool] = None):
+        """Starts a new invocation, re-reading the toggle unless `enabled` is given."""
+        self.enabled = env_enabled() if enabled is None else enabled
+        self.totals = {}
+        self.stack = []
+
+    def stage(self, name: str, rows: Optional[int] = None):
+        if not self.enabled:
+            return _DISABLED
+        return self._stage(name, rows)
+
+    @contextmanager
+    def _stage(self, name: str, rows: Optional[int]):
+        record = StageRecord(name, rows)
+        peak_reset = _reset_peak_rss()
+        self.stack.append(record)
+        record.start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - record.start
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1].children += elapsed
+            peak = _status_mb('VmHWM')
+            total = self.totals.setdefault(name, {'seconds': 0.0, 'rows': None, 'peak_rss_mb': None, 'calls': 0})
+            total['seconds'] += elapsed - record.children
+            total['calls'] += 1
+            if record.rows is not None:
+                total['rows'] = (total['rows'] or 0) + record.rows
+            if peak is not None:
+                # Without the reset the reading is the process peak so far, still an upper bound
+                total['peak_rss_mb'] = max(total['peak_rss_mb'] or 0, peak)
+                total['peak_reset'] = peak_reset
+
+    def documents(self) -> List[dict]:
+        """Returns one EMF document per recorded stage."""
+        timestamp = int(time.time() * 1000)
+        documents = []
+        for name, total in self.totals.items():
+            metrics = [{'Name': 'Duration', 'Unit': 'Milliseconds'}]
+            document = {'Service': self.service, 'Stage': name, 'Duration': round(total['seconds'] * 1000, 3), 'Calls': total['calls']}
+            if total['peak_rss_mb'] is not None:
+                metrics.append({'Name': 'PeakRSS', 'Unit': 'Megabytes'})
+                document['PeakRSS'] = round(total['peak_rss_mb'], 1)
+            if total['rows'] is not None:
+                metrics.append({'Name': 'Rows', 'Unit': 'Count'})
+                document['Rows'] = total['rows']
+            document['_aws'] = {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [['Service', 'Stage']],
+                    'Metrics': metrics,
+                }],
+            }
+            documents.append(document)
+        return documents
+
+    def flush(self):
+        """Prints the recorded stages as EMF log lines and clears them."""
+        if not self.enabled:
+            return
+        stream = self.stream or sys.stdout
+        for document in self.documents():
+            stream.write(json.dumps(document) + '\n')
+        stream.flush()
+        self.totals = {}
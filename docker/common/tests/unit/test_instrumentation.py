@@ -0,0 +1,71 @@
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import Metrics
+
+def test_disabled_metrics_record_nothing():
+    stream = io.StringIO()
+    metrics = Metrics("svc", enabled=False, stream=stream)
+
+    with metrics.stage("fetch") as stage:
+        stage.rows = 10
+    metrics.flush()
+
+    assert metrics.totals == {}
+    assert stream.getvalue() == ""
+
+def test_nested_stages_exclude_inner_time():
+    stream = io.StringIO()
+    metrics = Metrics("svc", enabled=True, namespace="Test", stream=stream)
+
+    with metrics.stage("write") as write:
+        for _ in range(2):
+            with metrics.stage("assemble", rows=5):
+                time.sleep(0.02)
+        write.rows = 10
+    metrics.flush()
+
+    documents = {d["Stage"]: d for d in map(json.loads, stream.getvalue().splitlines())}
+    assert documents["assemble"]["Rows"] == 10
+    assert documents["assemble"]["Calls"] == 2
+    assert documents["assemble"]["Duration"] >= 40
+    assert documents["write"]["Duration"] < documents["assemble"]["Duration"]
+    assert documents["write"]["Service"] == "svc"
+    emf = documents["write"]["_aws"]["CloudWatchMetrics"][0]
+    assert emf["Namespace"] == "Test"
+    assert emf["Dimensions"] == [["Service", "Stage"]]
+    assert {m["Name"] for m in emf["Metrics"]} >= {"Duration", "Rows"}
+    assert metrics.totals == {}
+
+def test_threads_record_their_own_stages():
+    metrics = Metrics("svc", enabled=True)
+    both_started = threading.Barrier(2)
+
+    def invoke(name):
+        metrics.reset(enabled=True)
+        with metrics.stage(name, rows=1):
+            both_started.wait()
+            with metrics.stage("inner"):
+                pass
+        totals = dict(metrics.totals)
+        metrics.flush()
+        return totals
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first, second = executor.map(invoke, ["first", "second"])
+
+    assert set(first) == {"first", "inner"}
+    assert set(second) == {"second", "inner"}
+    assert first["inner"]["calls"] == second["inner"]["calls"] == 1
+
+def test_toggle_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    metrics = Metrics("svc")
+    assert metrics.enabled
+
+    monkeypatch.setenv("METRICS_ENABLED", "0")
+    metrics.reset()
+    assert not metrics.enabled
@@ -0,0 +1,159 @@
+"""Backfills game-by-game stats for a range of seasons, one Parquet file per year.
+
+With a dataset path, each season is written to the partitioned season dataset instead,
+the layout the scrape Lambda writes and inference reads with `dataset_path` set.
+
+Runs on Lambda through `lambda_handler` (the scrape image with its command set to
+`backfill.lambda_handler`), or locally against a directory or an S3 bucket:
+
+    python backfill.py 2012 2023 --target ./data --workers 4
+    python backfill.py 2012 2023 --target ./data --dataset-path data/player-gamebygame/dataset/
+"""
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Iterable, List, Optional
+
+from lambda_function import MAX_YEAR, MIN_YEAR, scrape_season
+from storage import open_storage
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DATA_PATH = "data/player-gamebygame/AFL-Tables_game-by-game-stats_"
+YEAR_WORKERS = 4
+# Seasons run side by side, so each fetches fewer team pages at once than a single scrape.
+FETCH_WORKERS = 5
+# Written under a season's partitions once every team is, so a resumed backfill skips it
+DATASET_MARKER = "_SUCCESS"
+
+def backfill_year(
+    year: int,
+    target: str,
+    data_path: str = DATA_PATH,
+    fetch_workers: int = FETCH_WORKERS,
+    overwrite: bool = False,
+    dataset_path: Optional[str] = None,
+) -> dict:
+    """Scrapes one season, unless it is already there.
+
+    The season goes to `{data_path}{year}.parquet`, or with `dataset_path` to its team
+    partitions under `{dataset_path}year={year}/`, followed by a `_SUCCESS` marker.
+    """
+    start = time.perf_counter()
+    storage = open_storage(target)
+    key = f"{data_path}{year}.parquet"
+    done_key = key
+    if dataset_path:
+        key = f"{dataset_path}year={year}/"
+        done_key = key + DATASET_MARKER
+    if not overwrite and storage.exists(done_key):
+        return {"year": year, "status": "skipped", "uri": storage.uri(key), "rows": None, "seconds": 0.0}
+
+    result = scrape_season(year, storage, key, max_workers=fetch_workers, dataset_path=dataset_path)
+    if dataset_path:
+        storage.put(done_key, b"")
+    return {
+        "year": year,
+        "status": "written",
+        "uri": storage.uri(key),
+        "rows": result["rows"],
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+def run_backfill(
+    years: Iterable[int],
+    target: str,
+    data_path: str = DATA_PATH,
+    year_workers: int = YEAR_WORKERS,
+    fetch_workers: int = FETCH_WORKERS,
+    overwrite: bool = False,
+    use_processes: bool = True,
+    dataset_path: Optional[str] = None,
+) -> List[dict]:
+    """Backfills `years` with at most `year_workers` seasons in flight.
+
+    Seasons run in a process pool so parsing uses every core. Lambda has no /dev/shm for
+    the pool's semaphores, so it runs them on threads instead (`use_processes=False`).
+    Years whose file, or dataset marker, already exists are skipped, so an interrupted
+    backfill resumes where it stopped. Returns one result per year, with its status and timing.
+    """
+    years = sorted(set(years))
+    for year in years:
+        if not (MIN_YEAR <= year <= MAX_YEAR):
+            raise ValueError(f"{year=} is not in range: {MIN_YEAR}-{MAX_YEAR}")
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    results = []
+    with executor_class(max_workers=year_workers) as executor:
+        futures = {
+            executor.submit(backfill_year, year, target, data_path, fetch_workers, overwrite, dataset_path): year
+            for year in years
+        }
+        for future in as_completed(futures):
+            year = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Backfill of {year} failed: {e}")
+                result = {"year": year, "status": "failed", "error": str(e), "seconds": None}
+            logger.info(f"Backfill of {year}: {json.dumps(result)}")
+            results.append(result)
+
+    return sorted(results, key=lambda result: result["year"])
+
+def lambda_handler(event, context):
+    year_from = event['year_from']
+    year_to = event['year_to']
+    bucket_name = event['bucket_to_save']
+    data_path = event.get('data_path', DATA_PATH)
+
+    results = run_backfill(
+        range(year_from, year_to + 1),
+        f"s3://{bucket_name}",
+        data_path=data_path,
+        year_workers=event.get('year_workers', YEAR_WORKERS),
+        fetch_workers=event.get('fetch_workers', FETCH_WORKERS),
+        overwrite=event.get('overwrite', False),
+        use_processes=False,
+        dataset_path=event.get('dataset_path'),
+    )
+
+    failed = [result["year"] for result in results if result["status"] == "failed"]
+    return {
+        'statusCode': 500 if failed else 200,
+        'body': json.dumps({'failed': failed, 'years': results})
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill game-by-game stats for a range of seasons.")
+    parser.add_argument("year_from", type=int)
+    parser.add_argument("year_to", type=int)
+    parser.add_argument("--target", default=".", help="Output directory, or s3://bucket")
+    parser.add_argument("--data-path", default=DATA_PATH, help="Key prefix of each season's file")
+    parser.add_argument("--dataset-path", help="Key prefix of the partitioned dataset, written instead of season files")
+    parser.add_argument("--workers", type=int, default=YEAR_WORKERS, help="Seasons scraped at once")
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS, help="Team pages fetched at once per season")
+    parser.add_argument("--overwrite", action="store_true", help="Re-scrape seasons that already exist")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    results = run_backfill(
+        range(args.year_from, args.year_to + 1),
+        args.target,
+        data_path=args.data_path,
+        year_workers=args.workers,
+        fetch_workers=args.fetch_workers,
+        overwrite=args.overwrite,
+        dataset_path=args.dataset_path,
+    )
+
+    for result in results:
+        seconds = "" if result["seconds"] is None else f"{result['seconds']:8.2f}s"
+        print(f"{result['year']}  {result['status']:8} {seconds:>9}  {result.get('uri') or result.get('error')}")
+    return 1 if any(result["status"] == "failed" for result in results) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
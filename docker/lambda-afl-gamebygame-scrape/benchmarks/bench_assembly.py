@@ -0,0 +1,61 @@
+"""Benchmarks long-format assembly of a parsed season against the per-player concat loop.
+
+Run from the function folder, on a synthetic season or a saved one:
+
+    python -m benchmarks.bench_assembly [--fixtures DIR] [--year 2023] [--repeat 3]
+"""
+import argparse
+import timeit
+
+import pandas as pd
+
+from benchmarks.gbg_fixtures import load_season_fixture, season_fixture
+from lambda_function import assemble_game_by_game_stats, logger, parse_team_page
+
+def legacy_assemble(gbg_content: dict) -> pd.DataFrame:
+    """The previous assembly: one frame per player, concatenated onto the running frame."""
+    for key, values in gbg_content.items():
+        if "df" not in locals():
+            df = pd.DataFrame.from_dict(values)
+            df["player"] = key
+            df["round"] = df.index.values
+        else:
+            try:
+                dat = pd.DataFrame.from_dict(values)
+            except ValueError as ve:
+                logger.error(f"Unable to parse values for {key}: {ve}")
+                continue
+            dat["player"] = key
+            dat["round"] = dat.index.values
+            df = pd.concat([df, dat], axis=0)
+
+    return df.melt(
+        id_vars=["player", "team", "round", "opponents"],
+        value_name="value",
+        var_name="stat",
+    ).reset_index()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", help="Saved season laid out as {team}/{year}_gbg.html")
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    pages = load_season_fixture(args.fixtures, args.year) if args.fixtures else season_fixture(args.year)
+    gbg_content = {}
+    for team, content in pages.items():
+        parse_team_page(content, team, gbg_content)
+
+    expected = legacy_assemble(gbg_content)
+    pd.testing.assert_frame_equal(assemble_game_by_game_stats(gbg_content), expected)
+
+    legacy = min(timeit.repeat(lambda: legacy_assemble(gbg_content), number=1, repeat=args.repeat))
+    columnar = min(timeit.repeat(lambda: assemble_game_by_game_stats(gbg_content), number=1, repeat=args.repeat))
+
+    print(f"{len(pages)} teams, {len(gbg_content)} players, {len(expected)} rows")
+    print(f"concat loop: {legacy * 1000:9.1f} ms")
+    print(f"columnar:    {columnar * 1000:9.1f} ms  ({legacy / columnar:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
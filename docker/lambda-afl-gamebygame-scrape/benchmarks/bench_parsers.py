@@ -0,0 +1,39 @@
+"""Benchmarks the game-by-game page parser backends on a season of team pages.
+
+Run from the function folder, on a synthetic season or a saved one:
+
+    python -m benchmarks.bench_parsers [--fixtures DIR] [--year 2023] [--repeat 3]
+"""
+import argparse
+import timeit
+
+from benchmarks.gbg_fixtures import load_season_fixture, season_fixture
+from lambda_function import PARSERS
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", help="Saved season laid out as {team}/{year}_gbg.html")
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    pages = load_season_fixture(args.fixtures, args.year) if args.fixtures else season_fixture(args.year)
+    reference = {team: PARSERS["html.parser"](content) for team, content in pages.items()}
+
+    print(f"{len(pages)} teams, {sum(map(len, pages.values())) / 1e6:.1f} MB of HTML")
+    baseline = None
+    for name, parse in PARSERS.items():
+        for team, content in pages.items():
+            if parse(content) != reference[team]:
+                raise AssertionError(f"{name} disagrees with html.parser on {team}")
+
+        def parse_season():
+            for content in pages.values():
+                parse(content)
+
+        elapsed = min(timeit.repeat(parse_season, number=1, repeat=args.repeat))
+        baseline = baseline or elapsed
+        print(f"{name:12} {elapsed * 1000:9.1f} ms  ({baseline / elapsed:.1f}x)")
+
+if __name__ == "__main__":
+    main()
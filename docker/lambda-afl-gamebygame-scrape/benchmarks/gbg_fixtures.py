@@ -0,0 +1,142 @@
+"""Recorded and synthetic AFL Tables game-by-game pages for benchmarks.
+
+A season fixture is a directory laid out like the AFL Tables site,
+``{team}/{year}_gbg.html``, so pages saved from a real scrape can be dropped in
+place of the synthetic ones written by `write_season_fixture`.
+"""
+import random
+from html import escape
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from lambda_function import TEAMS
+
+TEAM_CODES = {
+    "adelaide": "AD", "brisbaneb": "BB", "brisbanel": "BL", "carlton": "CA", "collingwood": "CW",
+    "essendon": "ES", "fitzroy": "FI", "fremantle": "FR", "geelong": "GE", "goldcoast": "GC",
+    "gws": "GW", "hawthorn": "HW", "melbourne": "ME", "kangaroos": "NM", "padelaide": "PA",
+    "richmond": "RI", "stkilda": "SK", "swans": "SY", "westcoast": "WC", "bullldogs": "WB",
+}
+
+STAT_TABLES = [
+    "Disposals", "Kicks", "Marks", "Handballs", "Goals", "Behinds", "Hit Outs", "Tackles",
+    "Rebounds", "Inside 50s", "Clearances", "Clangers", "Frees", "Frees Against", "Brownlow Votes",
+    "Contested Possessions", "Uncontested Possessions", "Contested Marks", "Marks Inside 50",
+    "One Percenters", "Bounces", "Goal Assists", "% Played", "Subs",
+]
+
+SURNAMES = [
+    "Smith", "Jones", "Brown", "Wilson", "Taylor", "Martin", "Walker", "Kelly", "Ryan", "Murphy",
+    "Cripps", "Daicos", "Petracca", "Oliver", "Bontempelli", "Neale", "Steele", "Heeney", "Gawn",
+    "Serong", "Rowell", "Butters", "Dangerfield", "Cameron", "Macrae", "Merrett", "Parish", "Ward",
+    "Sicily", "Mitchell", "Fyfe", "Lyons", "Hewett", "Jacobs", "Bailey", "Rioli", "Pickett",
+    "Holmes", "Sinclair", "Yeo", "Gulden",
+]
+FIRST_NAMES = [
+    "Jack", "Tom", "Sam", "Josh", "Marcus", "Lachie", "Patrick", "Nick", "Zak", "Harry",
+    "Jordan", "Connor", "Callum", "Max", "Tim", "Clayton", "Christian", "Errol", "Darcy",
+]
+
+def season_opponents(teams: Sequence[str], rounds: int, rng: random.Random) -> Dict[str, List[str]]:
+    """Draws a round-by-round fixture, pairing teams at random each round."""
+    opponents = {team: [] for team in teams}
+    for _ in range(rounds):
+        order = list(teams)
+        rng.shuffle(order)
+        for home, away in zip(order[::2], order[1::2]):
+            opponents[home].append(TEAM_CODES[away])
+            opponents[away].append(TEAM_CODES[home])
+        if len(order) % 2:
+            opponents[order[-1]].append(TEAM_CODES[order[0]])
+    return opponents
+
+def stat_cell(table: str, played: bool, rng: random.Random) -> str:
+    if not played:
+        return "&nbsp;"
+    if table == "Subs":
+        return rng.choice(["&nbsp;"] * 8 + ["On", "Off"])
+    if table == "Brownlow Votes":
+        return rng.choice(["&nbsp;"] * 9 + ["1", "2", "3"])
+    if table == "% Played":
+        return str(rng.randint(60, 100))
+    if table in ("Bounces", "Goal Assists") and rng.random() < 0.05:
+        return "-"
+    return str(rng.randint(0, 30))
+
+def render_team_page(team: str, year: int, opponents: Sequence[str], players: Sequence[str], rng: random.Random) -> bytes:
+    """Renders one team's season page with the table layout used by AFL Tables."""
+    rounds = len(opponents)
+    played = {player: [rng.random() < 0.8 for _ in range(rounds)] for player in players}
+    round_headers = "".join(f"<th>R{r + 1}</th>" for r in range(rounds))
+
+    tables = []
+    for table in STAT_TABLES:
+        rows = []
+        for player in players:
+            cells = [stat_cell(table, p, rng) for p in played[player]]
+            total = sum(int(c) for c in cells if c.isdigit())
+            slug = player.replace(", ", "_").replace(" ", "_")
+            rows.append(
+                f'<tr><td align="left"><a href="../../players/{slug[0]}/{slug}.html">{escape(player)}</a></td>'
+                + "".join(f"<td>{c}</td>" for c in cells)
+                + f"<td>{total}</td></tr>"
+            )
+        tables.append(
+            f'<table class="sortable" width="100%"><thead>'
+            f'<tr><th colspan="{rounds + 2}" class="ccc">{escape(table)}</th></tr>'
+            f"<tr><th>Player</th>{round_headers}<th>Tot</th></tr></thead>"
+            f"<tbody>{''.join(rows)}</tbody>"
+            f"<tfoot><tr><th>Totals</th>{''.join('<th>0</th>' for _ in range(rounds))}<th>0</th></tr>"
+            f"<tr><th>Opponent</th>{''.join(f'<th>{o}</th>' for o in opponents)}<th>&nbsp;</th></tr>"
+            f"</tfoot></table>"
+        )
+
+    html = (
+        f"<!DOCTYPE HTML PUBLIC \"-//W3C//DTD HTML 4.01 Transitional//EN\">\n"
+        f"<html><head><title>AFL Tables - {team} - {year} Game by Game</title>"
+        f'<meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1"></head>\n'
+        f"<body><center><h1>{team} - {year} Game by Game</h1>\n"
+        + "\n<br>\n".join(tables)
+        + "\n</center></body></html>\n"
+    )
+    return html.encode("iso-8859-1")
+
+def season_fixture(
+    year: int,
+    teams: Sequence[str] = TEAMS,
+    rounds: int = 23,
+    players_per_team: int = 32,
+    seed: int = 0,
+) -> Dict[str, bytes]:
+    """Generates a synthetic season of team pages, keyed by team."""
+    rng = random.Random(seed)
+    names = [f"{surname}, {first}" for surname in SURNAMES for first in FIRST_NAMES]
+    if len(teams) * players_per_team > len(names):
+        raise ValueError(f"Cannot draw {players_per_team} unique players for {len(teams)} teams")
+    rng.shuffle(names)
+    opponents = season_opponents(teams, rounds, rng)
+
+    pages = {}
+    for i, team in enumerate(teams):
+        players = names[i * players_per_team:(i + 1) * players_per_team]
+        pages[team] = render_team_page(team, year, opponents[team], players, rng)
+    return pages
+
+def write_season_fixture(directory: Path, year: int, **kwargs) -> Path:
+    """Writes a synthetic season fixture to `directory` and returns it."""
+    directory = Path(directory)
+    for team, page in season_fixture(year, **kwargs).items():
+        path = directory / team / f"{year}_gbg.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(page)
+    return directory
+
+def load_season_fixture(directory: Path, year: int) -> Dict[str, bytes]:
+    """Loads the team pages of a saved season, in `TEAMS` order."""
+    directory = Path(directory)
+    pages = {}
+    for team in TEAMS:
+        path = directory / team / f"{year}_gbg.html"
+        if path.exists():
+            pages[team] = path.read_bytes()
+    return pages
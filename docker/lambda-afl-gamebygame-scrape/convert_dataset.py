@@ -0,0 +1,61 @@
+"""Converts season files written as one object per year into the partitioned season dataset.
+
+Each `{data_path}{year}.parquet` is split into one file per team under
+`{dataset_path}year={year}/team={team}/`, one row group per round. Files from before the
+typed schema are converted on the way. The season files are left in place.
+
+    python convert_dataset.py 2012 2023 --target ./data
+    python convert_dataset.py 1965 2023 --target s3://afl-game-data
+"""
+import argparse
+import logging
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from backfill import DATA_PATH
+from lambda_function import to_season_table, write_team_partition
+from storage import open_storage
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DATASET_PATH = "data/player-gamebygame/dataset/"
+
+def convert_year(storage, year: int, data_path: str = DATA_PATH, dataset_path: str = DATASET_PATH) -> dict:
+    """Splits one season file into its team partitions."""
+    start = time.perf_counter()
+    data = storage.get(f"{data_path}{year}.parquet")
+    if data is None:
+        return {"year": year, "status": "missing", "teams": 0, "rows": 0, "seconds": 0.0}
+
+    table = pq.read_table(pa.BufferReader(data))
+    if table.schema.field("value").type == pa.string():
+        table = to_season_table(table.to_pandas())
+    teams = table["team"].cast(pa.string())
+
+    rows = 0
+    names = sorted(pc.unique(teams).to_pylist())
+    for team in names:
+        rows += write_team_partition(storage, dataset_path, year, team, table.filter(pc.equal(teams, team)))
+    return {"year": year, "status": "converted", "teams": len(names), "rows": rows, "seconds": round(time.perf_counter() - start, 2)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("year_from", type=int)
+    parser.add_argument("year_to", type=int)
+    parser.add_argument("--target", default=".", help="Directory, or s3://bucket, holding the season files")
+    parser.add_argument("--data-path", default=DATA_PATH, help="Key prefix of each season's file")
+    parser.add_argument("--dataset-path", default=DATASET_PATH, help="Key prefix of the partitioned dataset")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    storage = open_storage(args.target)
+    for year in range(args.year_from, args.year_to + 1):
+        result = convert_year(storage, year, args.data_path, args.dataset_path)
+        print(f"{year}  {result['status']:9} {result['teams']:3d} teams {result['rows']:8d} rows {result['seconds']:8.2f}s")
+
+if __name__ == "__main__":
+    main()
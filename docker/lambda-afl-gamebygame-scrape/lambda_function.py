@@ -1,107 +1,678 @@
+import hashlib
+import json
 import logging
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Union
+import boto3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
-import boto3
 from bs4 import BeautifulSoup
+import lxml.html
+
+from instrumentation import Metrics
+from storage import S3Storage
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def get_game_by_game_stats(year: int = 2021) -> pd.DataFrame:
-    """Retrieves the detailed game-by-game AFL player statistics for a year."""
-    min_year, max_year = 1965, 2025
-    if not (min_year <= year <= max_year):
-        raise ValueError(f"{year=} is not in range: {min_year}-{max_year}")
-
-    teams = [
-        "adelaide", "brisbaneb", "brisbanel", "carlton", "collingwood", "essendon", "fitzroy", "fremantle",
-        "geelong", "goldcoast", "gws", "hawthorn", "melbourne", "kangaroos", "padelaide", "richmond",
-        "stkilda", "swans", "westcoast", "bullldogs"
-    ]
+metrics = Metrics("afl-gamebygame-scrape")
 
-    URL = "https://afltables.com/afl/stats/teams/"
+TEAMS = [
+    "adelaide", "brisbaneb", "brisbanel", "carlton", "collingwood", "essendon", "fitzroy", "fremantle",
+    "geelong", "goldcoast", "gws", "hawthorn", "melbourne", "kangaroos", "padelaide", "richmond",
+    "stkilda", "swans", "westcoast", "bullldogs"
+]
 
-    def url_func(team):
-        return f"{URL}{team}/{year}_gbg.html"
+URL = "https://afltables.com/afl/stats/teams/"
 
-    gbg_content = {}
-    for team in teams:
-        r = requests.get(url_func(team))
-        if r.status_code != 200:
+MIN_YEAR, MAX_YEAR = 1965, 2025
+
+# Fetch defaults: enough workers to request every team at once, a (connect, read) timeout
+# and retries with exponential backoff on transient HTTP errors.
+MAX_WORKERS = len(TEAMS)
+REQUEST_TIMEOUT = (3.05, 30)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+Timeout = Union[float, Tuple[float, float]]
+
+# A parsed page: the opponent of each round, and every stat table as (name, rows of cells).
+ParsedPage = Tuple[List[Optional[str]], List[Tuple[str, List[List[str]]]]]
+
+def build_session(
+    max_workers: int = MAX_WORKERS,
+    max_retries: int = MAX_RETRIES,
+    backoff_factor: float = BACKOFF_FACTOR,
+) -> requests.Session:
+    """Creates a pooled HTTP session that retries transient failures with backoff."""
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_team_pages(
+    year: int,
+    teams: Sequence[str] = TEAMS,
+    max_workers: int = MAX_WORKERS,
+    timeout: Timeout = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    session: Optional[requests.Session] = None,
+    headers: Optional[Dict[str, Dict[str, str]]] = None,
+) -> Dict[str, requests.Response]:
+    """Fetches the game-by-game page of each team concurrently.
+
+    `headers` holds extra request headers per team, such as conditional GET validators.
+    Responses (200, or 304 for a conditional request) are returned in `teams` order;
+    teams whose page could not be retrieved are logged and left out.
+    """
+    headers = headers or {}
+    owns_session = session is None
+    if owns_session:
+        session = build_session(max_workers=max_workers, max_retries=max_retries)
+
+    def fetch(team: str) -> Optional[requests.Response]:
+        try:
+            r = session.get(f"{URL}{team}/{year}_gbg.html", timeout=timeout, headers=headers.get(team))
+        except requests.RequestException as e:
+            logger.error(f"Failed to retrieve data for {team}: {e}")
+            return None
+        if r.status_code not in (200, 304):
             logger.error(f"Failed to retrieve data for {team}. HTTP Status Code: {r.status_code}")
-            continue
+            return None
+        return r
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(fetch, teams))
+    finally:
+        if owns_session:
+            session.close()
+
+    return {team: r for team, r in zip(teams, responses) if r is not None}
+
+def normalise_cell(cell: str) -> str:
+    return cell.replace("\xa0", "NA").replace("-", "NA")
 
-        html_content = BeautifulSoup(r.content, features="html.parser")
-        opponents = [
-            s.string
-            for s in html_content.find("tfoot").find_all("tr")[1].find_all("th")
+def parse_page_html_parser(content: bytes) -> ParsedPage:
+    """Parses a game-by-game page with BeautifulSoup and the stdlib html.parser."""
+    html_content = BeautifulSoup(content, features="html.parser")
+    opponents = [
+        s.string
+        for s in html_content.find("tfoot").find_all("tr")[1].find_all("th")
+    ]
+
+    tables = []
+    for body, header in zip(
+            html_content.find_all("tbody"), html_content.find_all("thead")):
+        table_name = header.find("tr").find("th").string
+        rows = [
+            [normalise_cell(s.string) for s in table_row.find_all("td")]
+            for table_row in body.find_all("tr")
         ]
-        opponents = opponents[1:-1]
-
-        for body, header in zip(
-                html_content.find_all("tbody"), html_content.find_all("thead")):
-            table_name = header.find("tr").find("th").string
-            table_name = table_name.lower().replace(" ", "_")
-            for table_row in body.find_all("tr"):
-                table_content = [
-                    s.string.replace("\xa0", "NA").replace("-", "NA")
-                    for s in table_row.find_all("td")
-                ]
-
-                if table_content[0] not in gbg_content.keys():
-                    gbg_content[table_content[0]] = {table_name: table_content[1:-1]}
-                    gbg_content[table_content[0]]["opponents"] = opponents
-                    gbg_content[table_content[0]]["team"] = [team for _ in range(len(opponents))]
-                else:
-                    gbg_content[table_content[0]][table_name] = table_content[1:-1]
+        tables.append((table_name, rows))
 
-    for key, values in gbg_content.items():
-        if "df" not in locals():
-            df = pd.DataFrame.from_dict(values)
-            df["player"] = key
-            df["round"] = df.index.values
-        else:
-            try:
-                dat = pd.DataFrame.from_dict(values)
-            except ValueError as ve:
-                logger.error(f"Unable to parse values for {key}: {ve}")
+    return opponents[1:-1], tables
+
+def _lxml_string(element) -> Optional[str]:
+    """Mirrors BeautifulSoup's `.string`: the text of an element with a single text descendant."""
+    children = list(element)
+    if not children:
+        return element.text
+    if len(children) == 1 and not element.text and not children[0].tail:
+        return _lxml_string(children[0])
+    return None
+
+def parse_page_lxml(content: bytes) -> ParsedPage:
+    """Parses a game-by-game page with lxml's libxml2 HTML parser."""
+    document = lxml.html.fromstring(content)
+    footer_rows = list(next(document.iter("tfoot")).iter("tr"))
+    opponents = [_lxml_string(th) for th in footer_rows[1].iter("th")]
+
+    tables = []
+    for body, header in zip(document.iter("tbody"), document.iter("thead")):
+        table_name = _lxml_string(next(next(header.iter("tr")).iter("th")))
+        rows = [
+            [normalise_cell(_lxml_string(td)) for td in table_row.iter("td")]
+            for table_row in body.iter("tr")
+        ]
+        tables.append((table_name, rows))
+
+    return opponents[1:-1], tables
+
+PARSERS = {
+    "html.parser": parse_page_html_parser,
+    "lxml": parse_page_lxml,
+}
+DEFAULT_PARSER = "lxml"
+
+def parse_team_page(content: bytes, team: str, gbg_content: dict, parser: str = DEFAULT_PARSER) -> None:
+    """Parses one team's game-by-game page into `gbg_content`, keyed by player."""
+    merge_team_page(PARSERS[parser](content), team, gbg_content)
+
+def merge_team_page(page: ParsedPage, team: str, gbg_content: dict) -> None:
+    """Adds a parsed team page to `gbg_content`, keyed by player."""
+    opponents, tables = page
+
+    for table_name, rows in tables:
+        table_name = table_name.lower().replace(" ", "_")
+        for table_content in rows:
+            if table_content[0] not in gbg_content.keys():
+                gbg_content[table_content[0]] = {table_name: table_content[1:-1]}
+                gbg_content[table_content[0]]["opponents"] = opponents
+                gbg_content[table_content[0]]["team"] = [team for _ in range(len(opponents))]
+            else:
+                gbg_content[table_content[0]][table_name] = table_content[1:-1]
+
+class PageCache:
+    """Validators, content hash and parsed tables of each team page, stored as JSON per team/year.
+
+    Entries are held in memory until `flush`, so a run that fails before the season file
+    is written leaves the stored cache untouched.
+    """
+
+    def __init__(self, storage, prefix: str):
+        self.storage = storage
+        self.prefix = prefix
+        self._entries = {}
+        self._dirty = set()
+
+    def key(self, team: str, year: int) -> str:
+        return f"{self.prefix}{year}/{team}.json"
+
+    def get(self, team: str, year: int) -> Optional[dict]:
+        key = self.key(team, year)
+        if key not in self._entries:
+            data = self.storage.get(key)
+            self._entries[key] = json.loads(data) if data is not None else None
+        return self._entries[key]
+
+    def put(self, team: str, year: int, entry: dict) -> None:
+        key = self.key(team, year)
+        self._entries[key] = entry
+        self._dirty.add(key)
+
+    def flush(self) -> None:
+        for key in sorted(self._dirty):
+            self.storage.put(key, json.dumps(self._entries[key]).encode())
+        self._dirty.clear()
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> Dict[str, str]:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+class FetchedPage(NamedTuple):
+    """A team page that is either new `content` to parse or the cached `entry` of an unchanged page."""
+    content: Optional[bytes]
+    headers: Mapping[str, str]
+    entry: Optional[dict]
+
+def fetch_season_pages(
+    year: int,
+    max_workers: int = MAX_WORKERS,
+    timeout: Timeout = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    session: Optional[requests.Session] = None,
+    cache: Optional[PageCache] = None,
+) -> Tuple[Dict[str, FetchedPage], List[str]]:
+    """Fetches every team's page for a year, without parsing it.
+
+    With a cache, pages are requested conditionally; a page that comes back 304, or whose
+    content hash is unchanged, carries its cached entry instead of content.
+    Returns the page of each team, in `TEAMS` order, and the teams whose page changed.
+    """
+    if not (MIN_YEAR <= year <= MAX_YEAR):
+        raise ValueError(f"{year=} is not in range: {MIN_YEAR}-{MAX_YEAR}")
+
+    entries = {}
+    if cache is not None:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            entries = dict(zip(TEAMS, executor.map(lambda team: cache.get(team, year), TEAMS)))
+    headers = {team: PageCache.conditional_headers(entry) for team, entry in entries.items() if entry}
+
+    with metrics.stage("fetch") as stage:
+        responses = fetch_team_pages(
+            year, max_workers=max_workers, timeout=timeout, max_retries=max_retries, session=session,
+            headers=headers,
+        )
+        stage.rows = len(responses)
+
+    pages, changed = {}, []
+    for team, r in responses.items():
+        entry = entries.get(team)
+        if r.status_code == 304:
+            if entry is None:
+                logger.error(f"Received 304 for {team} without a cached page")
                 continue
-            dat["player"] = key
-            dat["round"] = dat.index.values
-            df = pd.concat([df, dat], axis=0)
+            pages[team] = FetchedPage(None, r.headers, entry)
+        elif entry is not None and entry["sha256"] == hashlib.sha256(r.content).hexdigest():
+            pages[team] = FetchedPage(None, r.headers, entry)
+        else:
+            pages[team] = FetchedPage(r.content, r.headers, None)
+            changed.append(team)
 
-    return df.melt(
-        id_vars=["player", "team", "round", "opponents"],
-        value_name="value",
-        var_name="stat",
-    ).reset_index()
+    return pages, changed
+
+def parse_fetched_page(
+    page: FetchedPage,
+    team: str,
+    year: int,
+    parser: str = DEFAULT_PARSER,
+    cache: Optional[PageCache] = None,
+) -> ParsedPage:
+    """Parses a fetched page, or returns the cached tables of an unchanged one."""
+    if page.content is None:
+        return page.entry["opponents"], page.entry["tables"]
+
+    with metrics.stage("parse", rows=1):
+        opponents, tables = PARSERS[parser](page.content)
+    if cache is not None:
+        cache.put(team, year, {
+            "etag": page.headers.get("ETag"),
+            "last_modified": page.headers.get("Last-Modified"),
+            "sha256": hashlib.sha256(page.content).hexdigest(),
+            "opponents": opponents,
+            "tables": tables,
+        })
+    return opponents, tables
+
+def scrape_team_pages(
+    year: int,
+    max_workers: int = MAX_WORKERS,
+    timeout: Timeout = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    session: Optional[requests.Session] = None,
+    parser: str = DEFAULT_PARSER,
+    cache: Optional[PageCache] = None,
+) -> Tuple[Dict[str, ParsedPage], List[str]]:
+    """Fetches and parses every team's page for a year.
+
+    Returns the parsed page of each team, in `TEAMS` order, and the teams whose page changed.
+    """
+    fetched, changed = fetch_season_pages(
+        year, max_workers=max_workers, timeout=timeout, max_retries=max_retries, session=session,
+        cache=cache,
+    )
+    pages = {team: parse_fetched_page(page, team, year, parser, cache) for team, page in fetched.items()}
+    return pages, changed
+
+def get_game_by_game_stats(
+    year: int = 2021,
+    max_workers: int = MAX_WORKERS,
+    timeout: Timeout = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    session: Optional[requests.Session] = None,
+    parser: str = DEFAULT_PARSER,
+    cache: Optional[PageCache] = None,
+) -> pd.DataFrame:
+    """Retrieves the detailed game-by-game AFL player statistics for a year."""
+    pages, _ = scrape_team_pages(
+        year, max_workers=max_workers, timeout=timeout, max_retries=max_retries, session=session,
+        parser=parser, cache=cache,
+    )
+    return assemble_team_pages(pages)
+
+def assemble_team_pages(pages: Dict[str, ParsedPage]) -> pd.DataFrame:
+    gbg_content = {}
+    for team, page in pages.items():
+        merge_team_page(page, team, gbg_content)
+
+    return assemble_game_by_game_stats(gbg_content)
+
+def assemble_game_by_game_stats(gbg_content: dict) -> pd.DataFrame:
+    """Builds the long-format stats frame from parsed player tables in one pass.
+
+    Cells are collected into flat column buffers and the frame is allocated once, with
+    rows in the same order as melting the per-player frames: stat by stat, then player
+    by player, then round by round.
+    """
+    players, teams, opponents, rounds = [], [], [], []
+    stats: Dict[str, list] = {}
+    n_rows = 0
+    for key, values in gbg_content.items():
+        lengths = {len(column) for column in values.values()}
+        if len(lengths) != 1:
+            logger.error(f"Unable to parse values for {key}: All arrays must be of the same length")
+            continue
+        n_rounds = lengths.pop()
+
+        players.extend([key] * n_rounds)
+        teams.extend(values["team"])
+        opponents.extend(values["opponents"])
+        rounds.extend(range(n_rounds))
+        for stat, column in values.items():
+            if stat not in ("opponents", "team"):
+                stats.setdefault(stat, []).append((n_rows, column))
+        n_rows += n_rounds
+
+    if not n_rows:
+        raise ValueError("No game-by-game stats were retrieved")
+
+    n_stats = len(stats)
+    value = np.full(n_rows * n_stats, np.nan, dtype=object)
+    for i, chunks in enumerate(stats.values()):
+        for start, column in chunks:
+            offset = i * n_rows + start
+            value[offset:offset + len(column)] = column
+
+    return pd.DataFrame({
+        "index": np.arange(n_rows * n_stats),
+        "player": np.tile(np.array(players, dtype=object), n_stats),
+        "team": np.tile(np.array(teams, dtype=object), n_stats),
+        "round": np.tile(np.array(rounds, dtype=np.int64), n_stats),
+        "opponents": np.tile(np.array(opponents, dtype=object), n_stats),
+        "stat": np.repeat(np.array(list(stats), dtype=object), n_rows),
+        "value": value,
+    })
+
+# Season files store typed, dictionary-encoded columns: missing stats are nulls rather than
+# "NA", and the substitute markers of the `subs` table are a column of their own.
+DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+SEASON_SCHEMA = pa.schema(
+    [
+        ("player", DICTIONARY),
+        ("team", DICTIONARY),
+        ("round", pa.int16()),
+        ("opponents", DICTIONARY),
+        ("stat", DICTIONARY),
+        ("value", pa.float32()),
+        ("sub", DICTIONARY),
+    ],
+    metadata={b"schema_version": b"2"},
+)
+SUBS_STAT = "subs"
+SUB_MARKERS = ["Off", "On"]
+
+def to_season_table(df: pd.DataFrame) -> pa.Table:
+    """Converts long-format string stats into a table with the typed season schema."""
+    keys = ["player", "team", "round"]
+    is_sub = (df["stat"] == SUBS_STAT).to_numpy()
+    stats = df.loc[~is_sub]
+    subs = df.loc[is_sub & df["value"].isin(SUB_MARKERS).to_numpy()].drop_duplicates(keys)
+    sub = subs.set_index(keys)["value"].reindex(pd.MultiIndex.from_frame(stats[keys])).to_numpy()
+
+    typed = pd.DataFrame({
+        "player": pd.Categorical(stats["player"]),
+        "team": pd.Categorical(stats["team"]),
+        "round": stats["round"].to_numpy(dtype=np.int16),
+        "opponents": pd.Categorical(stats["opponents"]),
+        "stat": pd.Categorical(stats["stat"]),
+        "value": pd.to_numeric(stats["value"], errors="coerce").to_numpy(dtype=np.float32),
+        "sub": pd.Categorical(sub, categories=SUB_MARKERS),
+    })
+    return pa.Table.from_pandas(typed, schema=SEASON_SCHEMA, preserve_index=False)
+
+def _round_rows(table: pa.Table) -> Dict[int, pd.DataFrame]:
+    """Splits one team's rows by round, with plain values and a fixed row order for comparing."""
+    df = table.drop([name for name in ["team"] if name in table.column_names]).to_pandas()
+    df = df.astype({name: object for name in df.columns if isinstance(df[name].dtype, pd.CategoricalDtype)})
+    df = df.sort_values(["round", "player", "stat"], kind="stable", ignore_index=True)
+    return {int(r): rows.reset_index(drop=True) for r, rows in df.groupby("round", sort=False)}
+
+def diff_rounds(previous: Optional[pa.Table], table: pa.Table) -> Set[int]:
+    """Returns the rounds whose rows differ between two versions of one team's season."""
+    new = _round_rows(table)
+    if previous is None:
+        return set(new)
+    old = _round_rows(previous)
+    return {r for r in new.keys() | old.keys() if r not in new or r not in old or not new[r].equals(old[r])}
+
+def _write_rows(writer: pq.ParquetWriter, table: pa.Table) -> int:
+    """Writes `table` as one row group."""
+    if not table.num_rows:
+        return 0
+    writer.write_table(table)
+    return table.num_rows
+
+def write_season(
+    storage,
+    key: str,
+    pages: Iterable[Tuple[str, ParsedPage]],
+    existing: Optional[bytes] = None,
+    replaced_teams: Sequence[str] = (),
+    changed_rounds: Optional[Set[int]] = None,
+) -> int:
+    """Streams a season to `key` as Parquet, one row group per team page.
+
+    Each page is assembled and written as it is parsed, so only one team's rows are held
+    in memory. Rows of `existing`, a season file written earlier, are carried over one
+    row group at a time, except those of `replaced_teams`. Files from before the typed
+    schema are converted whole, as a player's `subs` rows may sit in a different row
+    group from their stats. Returns the number of rows written.
+    The rounds whose rows differ from `existing` are added to `changed_rounds`.
+    """
+    n_rows = 0
+    replaced_rows = []
+    with metrics.stage("write") as stage, storage.open_writer(key) as sink, pq.ParquetWriter(sink, SEASON_SCHEMA) as writer:
+        if existing is not None:
+            previous = pq.ParquetFile(pa.BufferReader(existing))
+            legacy = previous.schema_arrow.field("value").type == pa.string()
+            replaced = pa.array(list(replaced_teams), type=pa.string())
+            if legacy:
+                tables = [to_season_table(previous.read().to_pandas())]
+            else:
+                tables = (previous.read_row_group(i) for i in range(previous.num_row_groups))
+            for table in tables:
+                keep = pc.invert(pc.is_in(table["team"].cast(pa.string()), value_set=replaced))
+                n_rows += _write_rows(writer, table.filter(keep))
+                if changed_rounds is not None:
+                    replaced_rows.append(table.filter(pc.invert(keep)))
+        previous = pa.concat_tables(replaced_rows) if replaced_rows else None
+
+        for team, page in pages:
+            with metrics.stage("assemble") as assembled:
+                try:
+                    df = assemble_team_pages({team: page})
+                except ValueError:
+                    logger.warning(f"No game-by-game stats found for {team}")
+                    continue
+                table = to_season_table(df)
+                assembled.rows = table.num_rows
+            if changed_rounds is not None:
+                old = None
+                if previous is not None:
+                    old = previous.filter(pc.equal(previous["team"].cast(pa.string()), team))
+                changed_rounds |= diff_rounds(old, table)
+            n_rows += _write_rows(writer, table)
+
+        if not n_rows:
+            raise ValueError("No game-by-game stats were retrieved")
+        stage.rows = n_rows
+
+    return n_rows
+
+# The partitioned layout keeps one file per season and team under
+# `{dataset_path}year={year}/team={team}/`, with one row group per round. The year and
+# team come from the path, so the files do not repeat the team column.
+DATASET_SCHEMA = SEASON_SCHEMA.remove(SEASON_SCHEMA.get_field_index("team"))
+
+def partition_key(dataset_path: str, year: int, team: str) -> str:
+    return f"{dataset_path}year={year}/team={team}/part-0.parquet"
+
+def write_team_partition(storage, dataset_path: str, year: int, team: str, table: pa.Table) -> int:
+    """Writes one team's season to its partition, one row group per round, replacing any earlier file.
+
+    Each row group's statistics then cover a single round, so readers filtering on the
+    round skip every other row group.
+    """
+    table = table.drop(["team"]).sort_by("round")
+    rounds = table["round"].to_numpy()
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(rounds)) + 1, [len(rounds)]])
+    with storage.open_writer(partition_key(dataset_path, year, team)) as sink, pq.ParquetWriter(sink, DATASET_SCHEMA) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, end - start))
+    return table.num_rows
+
+def write_season_dataset(
+    storage,
+    dataset_path: str,
+    year: int,
+    pages: Iterable[Tuple[str, ParsedPage]],
+    changed_rounds: Optional[Set[int]] = None,
+) -> int:
+    """Writes each team page to its own partition of the season dataset. Returns the rows written.
+
+    The rounds whose rows differ from the partitions they replace are added to `changed_rounds`.
+    """
+    n_rows = 0
+    with metrics.stage("write") as stage:
+        for team, page in pages:
+            with metrics.stage("assemble") as assembled:
+                try:
+                    df = assemble_team_pages({team: page})
+                except ValueError:
+                    logger.warning(f"No game-by-game stats found for {team}")
+                    continue
+                table = to_season_table(df)
+                assembled.rows = table.num_rows
+            if changed_rounds is not None:
+                previous = storage.get(partition_key(dataset_path, year, team))
+                if previous is not None:
+                    previous = pq.read_table(pa.BufferReader(previous))
+                changed_rounds |= diff_rounds(previous, table)
+            n_rows += write_team_partition(storage, dataset_path, year, team, table)
+
+        if not n_rows:
+            raise ValueError("No game-by-game stats were retrieved")
+        stage.rows = n_rows
+    return n_rows
+
+def scrape_season(
+    year: int,
+    storage,
+    key: str,
+    max_workers: int = MAX_WORKERS,
+    timeout: Timeout = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    session: Optional[requests.Session] = None,
+    parser: str = DEFAULT_PARSER,
+    cache: Optional[PageCache] = None,
+    dataset_path: Optional[str] = None,
+) -> dict:
+    """Scrapes a season and streams it to `key` in `storage`.
+
+    With a cache, only the changed teams' pages are parsed and merged into the existing
+    season file, and nothing is written when no page changed. With `dataset_path`, the
+    season goes to the partitioned dataset under it instead of `key`, and only the
+    changed teams' partitions (and any that are missing) are rewritten.
+
+    Returns whether anything was written, the rows written, the teams whose page changed
+    and the rounds whose rows changed, for triggering inference on just those rounds.
+    """
+    fetched, changed = fetch_season_pages(
+        year, max_workers=max_workers, timeout=timeout, max_retries=max_retries, session=session,
+        cache=cache,
+    )
+
+    if dataset_path is not None:
+        teams = list(fetched)
+        if cache is not None:
+            teams = [t for t in fetched if t in changed or not storage.exists(partition_key(dataset_path, year, t))]
+        if not teams:
+            return {"written": False, "rows": None, "changed": changed, "rounds": []}
+        pages = ((team, parse_fetched_page(fetched[team], team, year, parser, cache)) for team in teams)
+        rounds = set()
+        n_rows = write_season_dataset(storage, dataset_path, year, pages, changed_rounds=rounds)
+        if cache is not None:
+            cache.flush()
+        return {"written": True, "rows": n_rows, "changed": changed, "rounds": sorted(rounds)}
+
+    existing = storage.get(key) if cache is not None else None
+    if existing is not None and not changed:
+        return {"written": False, "rows": None, "changed": changed, "rounds": []}
+
+    teams = changed if existing is not None else list(fetched)
+    if existing is not None:
+        logger.info(f"Merging updated pages for {changed} into {storage.uri(key)}")
+    pages = ((team, parse_fetched_page(fetched[team], team, year, parser, cache)) for team in teams)
+    rounds = set()
+    n_rows = write_season(storage, key, pages, existing=existing, replaced_teams=changed, changed_rounds=rounds)
+
+    if cache is not None:
+        cache.flush()
+    return {"written": True, "rows": n_rows, "changed": changed, "rounds": sorted(rounds)}
+
+# Inference subscribes to this event rather than running at a fixed time after the scrape
+EVENT_SOURCE = "brownlow.scrape"
+EVENT_DETAIL_TYPE = "Season scraped"
+
+def emit_scrape_event(events_client, event_bus_name: str, year: int, rounds: List[int], event) -> None:
+    """Announces the rounds of `year` whose rows changed, and where the season is stored."""
+    detail = {"year": year, "rounds": rounds, "bucket": event["bucket_to_save"]}
+    if event.get("dataset_path"):
+        detail["dataset_path"] = event["dataset_path"]
+    else:
+        detail["data_path"] = event["data_path"]
+    response = events_client.put_events(Entries=[{
+        "Source": EVENT_SOURCE,
+        "DetailType": EVENT_DETAIL_TYPE,
+        "Detail": json.dumps(detail),
+        "EventBusName": event_bus_name,
+    }])
+    if response.get("FailedEntryCount"):
+        raise RuntimeError(f"Failed to emit the scrape event: {response['Entries']}")
+    logger.info(f"Emitted {EVENT_DETAIL_TYPE} for {year} rounds {rounds} to {event_bus_name}")
 
 def lambda_handler(event, context):
+    metrics.reset()
     try:
         year_to_query = event['year_to_query']
         bucket_name = event['bucket_to_save']
-        data_path = event['data_path']
-        data_path = f'{data_path}{str(year_to_query)}.parquet'
+        # A partitioned dataset under dataset_path takes the place of the season file
+        dataset_path = event.get('dataset_path')
+        data_path = f"{dataset_path}year={year_to_query}/" if dataset_path else f"{event['data_path']}{year_to_query}.parquet"
 
         logger.info(f"Fetching game-by-game stats for year {year_to_query}")
 
-        df = get_game_by_game_stats(year=year_to_query)
+        max_workers = event.get('max_workers', MAX_WORKERS)
+        max_retries = event.get('max_retries', MAX_RETRIES)
+        timeout = event.get('request_timeout', REQUEST_TIMEOUT)
+        if isinstance(timeout, list):
+            timeout = tuple(timeout)
 
-        buffer = BytesIO()
-        pq.write_table(pa.Table.from_pandas(df), buffer)
+        parser = event.get('parser', DEFAULT_PARSER)
 
-        s3_client = boto3.client('s3')
+        storage = S3Storage(bucket_name)
+        cache_path = event.get('cache_path')
+        cache = PageCache(storage, cache_path) if cache_path else None
 
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=data_path,
-            Body=buffer.getvalue()
+        result = scrape_season(
+            year_to_query, storage, data_path, max_workers=max_workers, timeout=timeout,
+            max_retries=max_retries, parser=parser, cache=cache, dataset_path=dataset_path,
         )
 
-        logger.info(f"File uploaded to S3: s3://{bucket_name}/{data_path}")
+        if not result['written']:
+            logger.info(f"No team pages changed since the last scrape of {year_to_query}")
+            return {
+                'statusCode': 200,
+                'body': f'No changes; s3://{bucket_name}/{data_path} is up to date'
+            }
+
+        logger.info(f"File uploaded to S3: s3://{bucket_name}/{data_path}; changed rounds: {result['rounds']}")
+
+        # With an event bus, inference is triggered for just the changed rounds
+        event_bus_name = event.get('event_bus_name')
+        if event_bus_name and result['rounds']:
+            emit_scrape_event(boto3.client('events'), event_bus_name, year_to_query, result['rounds'], event)
 
         return {
             'statusCode': 200,
@@ -114,3 +685,5 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': f"Error: {str(e)}"
         }
+    finally:
+        metrics.flush()
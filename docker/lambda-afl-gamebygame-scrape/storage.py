@@ -0,0 +1,155 @@
+import io
+from contextlib import contextmanager
+from pathlib import Path
+
+import boto3
+from botocore.exceptions import ClientError
+
+# S3 multipart parts must be at least 5 MiB, except the last.
+PART_SIZE = 8 * 1024 * 1024
+
+class S3MultipartWriter(io.RawIOBase):
+    """A writable stream that uploads to S3 in parts as data arrives.
+
+    At most one part is buffered at a time. Nothing is visible in the bucket until
+    `commit`; `abort` discards the parts uploaded so far. Output smaller than one part
+    is sent with a single PutObject instead.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = PART_SIZE):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.upload_id = None
+        self.parts = []
+        self.buffer = bytearray()
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.position += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, body: bytes) -> None:
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)['UploadId']
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=part_number, Body=body
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+    def commit(self) -> None:
+        if self.upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer))
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts},
+            )
+        self.buffer = bytearray()
+        self.close()
+
+    def abort(self) -> None:
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        self.buffer = bytearray()
+        self.close()
+
+class S3Storage:
+    """Reads and writes whole objects under keys in an S3 bucket."""
+
+    def __init__(self, bucket: str, client=None, part_size: int = PART_SIZE):
+        self.bucket = bucket
+        self.client = client or boto3.client('s3')
+        self.part_size = part_size
+
+    def get(self, key: str):
+        """Returns the object's bytes, or None if it does not exist."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response['Body'].read()
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    @contextmanager
+    def open_writer(self, key: str):
+        """Streams an object to `key` with a multipart upload, completed when the block exits cleanly."""
+        writer = S3MultipartWriter(self.client, self.bucket, key, self.part_size)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return False
+            raise
+        return True
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+class LocalStorage:
+    """Reads and writes files under keys relative to a local directory."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def get(self, key: str):
+        """Returns the file's bytes, or None if it does not exist."""
+        path = self.root / key
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    @contextmanager
+    def open_writer(self, key: str):
+        """Streams a file to `key`, moved into place when the block exits cleanly."""
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            with tmp.open('wb') as f:
+                yield f
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        tmp.replace(path)
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).exists()
+
+    def uri(self, key: str) -> str:
+        return str(self.root / key)
+
+def open_storage(target: str):
+    """Opens `s3://bucket` as S3 storage and anything else as a local directory."""
+    if target.startswith('s3://'):
+        return S3Storage(target[len('s3://'):].split('/')[0])
+    return LocalStorage(target)
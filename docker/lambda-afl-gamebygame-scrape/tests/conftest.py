@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules shared by the Docker Lambdas are copied next to lambda_function.py in the image
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "common"))
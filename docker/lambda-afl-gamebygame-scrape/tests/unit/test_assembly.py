@@ -0,0 +1,37 @@
+import pandas as pd
+
+from benchmarks.bench_assembly import legacy_assemble
+from benchmarks.gbg_fixtures import season_fixture
+import lambda_function
+
+def parse_season(pages):
+    gbg_content = {}
+    for team, content in pages.items():
+        lambda_function.parse_team_page(content, team, gbg_content)
+    return gbg_content
+
+def test_assembly_matches_concat_loop_on_season_fixture():
+    pages = season_fixture(2023, teams=lambda_function.TEAMS[:4], rounds=5, players_per_team=6)
+    gbg_content = parse_season(pages)
+
+    pd.testing.assert_frame_equal(
+        lambda_function.assemble_game_by_game_stats(gbg_content),
+        legacy_assemble(gbg_content),
+    )
+
+def test_assembly_fills_missing_stats_and_skips_ragged_players():
+    gbg_content = {
+        "Smith, Jack": {"kicks": ["1", "NA"], "opponents": ["GE", "CA"], "team": ["adelaide", "adelaide"]},
+        "Ward, Tom": {"kicks": ["3"], "opponents": ["GE"], "team": ["gws"], "goals": ["2"]},
+        "Fyfe, Nat": {"kicks": ["1", "2"], "opponents": ["GE"], "team": ["fremantle"]},
+    }
+
+    df = lambda_function.assemble_game_by_game_stats(gbg_content)
+
+    assert list(df.columns) == ["index", "player", "team", "round", "opponents", "stat", "value"]
+    assert df["stat"].tolist() == ["kicks"] * 3 + ["goals"] * 3
+    assert df["player"].tolist() == ["Smith, Jack", "Smith, Jack", "Ward, Tom"] * 2
+    assert df["round"].tolist() == [0, 1, 0] * 2
+    assert df["value"].tolist()[:3] == ["1", "NA", "3"]
+    assert df["value"].iloc[3:5].isna().all()
+    assert df["value"].iloc[5] == "2"
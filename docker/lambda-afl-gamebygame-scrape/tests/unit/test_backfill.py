@@ -0,0 +1,49 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import backfill
+
+def fake_scrape(year, storage, key, max_workers, dataset_path=None):
+    if year == 2013:
+        raise ValueError("No game-by-game stats were retrieved")
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({"stat": ["kicks"], "value": [str(year)]}), buffer)
+    if dataset_path:
+        key = f"{dataset_path}year={year}/team=Carlton/part-0.parquet"
+    storage.put(key, buffer.getvalue())
+    return {"written": True, "rows": 1, "changed": []}
+
+def test_backfill_writes_one_file_per_year_and_skips_existing(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "scrape_season", fake_scrape)
+    existing = tmp_path / "stats_2011.parquet"
+    existing.write_bytes(b"already scraped")
+
+    results = backfill.run_backfill(
+        range(2011, 2015), str(tmp_path), data_path="stats_", year_workers=2, use_processes=False
+    )
+
+    assert [(r["year"], r["status"]) for r in results] == [
+        (2011, "skipped"), (2012, "written"), (2013, "failed"), (2014, "written"),
+    ]
+    assert existing.read_bytes() == b"already scraped"
+    assert pq.read_table(tmp_path / "stats_2014.parquet").column("value").to_pylist() == ["2014"]
+    assert not (tmp_path / "stats_2013.parquet").exists()
+    assert all(r["seconds"] >= 0 for r in results if r["status"] != "failed")
+
+def test_backfill_writes_the_partitioned_dataset_with_a_dataset_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "scrape_season", fake_scrape)
+    (tmp_path / "dataset" / "year=2011").mkdir(parents=True)
+    (tmp_path / "dataset" / "year=2011" / "_SUCCESS").write_bytes(b"")
+    (tmp_path / "dataset" / "year=2012" / "team=Carlton").mkdir(parents=True)
+
+    results = backfill.run_backfill(
+        range(2011, 2014), str(tmp_path), data_path="stats_", use_processes=False, dataset_path="dataset/"
+    )
+
+    assert [(r["year"], r["status"]) for r in results] == [(2011, "skipped"), (2012, "written"), (2013, "failed")]
+    assert pq.read_table(tmp_path / "dataset" / "year=2012" / "team=Carlton" / "part-0.parquet").column("value").to_pylist() == ["2012"]
+    assert (tmp_path / "dataset" / "year=2012" / "_SUCCESS").exists()
+    assert not (tmp_path / "dataset" / "year=2013" / "_SUCCESS").exists()
+    assert not list(tmp_path.glob("stats_*"))
@@ -0,0 +1,100 @@
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import convert_dataset
+import lambda_function
+from storage import LocalStorage
+from tests.unit.test_fetch import StubResponse
+from tests.unit.test_streaming import BUCKET, EVENT, KEY, PAGE, read_season, s3, serve  # noqa: F401
+
+DATASET_PATH = "data/player-gamebygame/dataset/"
+
+def read_partition(s3, team):
+    key = lambda_function.partition_key(DATASET_PATH, 2023, team)
+    return pq.ParquetFile(io.BytesIO(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()))
+
+def test_handler_writes_one_partition_per_team_with_a_row_group_per_round(s3, monkeypatch):
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": StubResponse(200, PAGE.replace(b"Bailey", b"Baker"))})
+
+    assert lambda_function.lambda_handler(dict(EVENT, dataset_path=DATASET_PATH), None)["statusCode"] == 200
+
+    partition = read_partition(s3, "carlton")
+    assert partition.schema_arrow == lambda_function.DATASET_SCHEMA
+    assert partition.num_row_groups == 3
+    for i in range(partition.num_row_groups):
+        stats = partition.metadata.row_group(i).column(1).statistics
+        assert stats.min == stats.max == i
+    assert read_partition(s3, "adelaide").metadata.num_rows == 18
+
+def test_incremental_run_rewrites_only_changed_partitions(s3, monkeypatch):
+    event = dict(EVENT, dataset_path=DATASET_PATH, cache_path="cache/")
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": StubResponse(200, PAGE.replace(b"Bailey", b"Baker"))})
+    lambda_function.lambda_handler(event, None)
+    before = {team: s3.head_object(Bucket=BUCKET, Key=lambda_function.partition_key(DATASET_PATH, 2023, team))["ETag"] for team in ["adelaide", "carlton"]}
+
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": StubResponse(200, PAGE.replace(b"Bailey", b"Brown"))})
+    lambda_function.lambda_handler(event, None)
+
+    after = {team: s3.head_object(Bucket=BUCKET, Key=lambda_function.partition_key(DATASET_PATH, 2023, team))["ETag"] for team in ["adelaide", "carlton"]}
+    assert after["adelaide"] == before["adelaide"]
+    assert after["carlton"] != before["carlton"]
+    assert "Brown, Jack" in read_partition(s3, "carlton").read().column("player").to_pylist()
+    assert "No changes" in lambda_function.lambda_handler(event, None)["body"]
+
+def test_converter_splits_season_files_into_the_dataset(s3, monkeypatch, tmp_path):
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": StubResponse(200, PAGE.replace(b"Bailey", b"Baker"))})
+    lambda_function.lambda_handler(EVENT, None)
+    storage = LocalStorage(tmp_path)
+    storage.put(KEY, s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read())
+
+    result = convert_dataset.convert_year(storage, 2023, data_path=EVENT["data_path"], dataset_path=DATASET_PATH)
+
+    assert (result["status"], result["teams"], result["rows"]) == ("converted", 2, 36)
+    partitioning = ds.partitioning(pa.schema([("year", pa.int16()), ("team", pa.string())]), flavor="hive")
+    dataset = ds.dataset(tmp_path / DATASET_PATH, format="parquet", partitioning=partitioning)
+    round_one = dataset.to_table(filter=(ds.field("year") == 2023) & (ds.field("round") == 1)).to_pandas()
+    season = read_season(s3).read().to_pandas()
+    assert len(round_one) == (season["round"] == 1).sum()
+    assert sorted(round_one["team"].unique()) == ["adelaide", "carlton"]
+    assert convert_dataset.convert_year(storage, 2022, data_path=EVENT["data_path"])["status"] == "missing"
+
+class RecordingEvents:
+    def __init__(self):
+        self.entries = []
+
+    def put_events(self, Entries):
+        self.entries += Entries
+        return {"FailedEntryCount": 0, "Entries": [{"EventId": str(i)} for i in range(len(Entries))]}
+
+def test_incremental_run_reports_only_the_changed_rounds(s3, monkeypatch):
+    storage = lambda_function.S3Storage(BUCKET, client=s3)
+    carlton = StubResponse(200, PAGE.replace(b"Bailey", b"Baker"))
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": carlton})
+    first = lambda_function.scrape_season(2023, storage, None, cache=lambda_function.PageCache(storage, "cache/"), dataset_path=DATASET_PATH)
+
+    # One stat of the second round (rounds are numbered from 0) is corrected
+    edited = PAGE.replace(b"<td>30</td><td>18</td>", b"<td>30</td><td>19</td>")
+    serve(monkeypatch, {"adelaide": StubResponse(200, edited), "carlton": carlton})
+    second = lambda_function.scrape_season(2023, storage, None, cache=lambda_function.PageCache(storage, "cache/"), dataset_path=DATASET_PATH)
+
+    assert first["rounds"] == [0, 1, 2]
+    assert (second["changed"], second["rounds"]) == (["adelaide"], [1])
+
+def test_handler_announces_changed_rounds_on_the_event_bus(s3, monkeypatch):
+    events = RecordingEvents()
+    client = lambda_function.boto3.client
+    monkeypatch.setattr(lambda_function.boto3, "client", lambda service, **kwargs: events if service == "events" else client(service, **kwargs))
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE)})
+    event = dict(EVENT, dataset_path=DATASET_PATH, cache_path="cache/", event_bus_name="default")
+
+    assert lambda_function.lambda_handler(event, None)["statusCode"] == 200
+    assert lambda_function.lambda_handler(event, None)["statusCode"] == 200
+
+    # The second run changes nothing, so only the first is announced
+    [entry] = events.entries
+    assert (entry["Source"], entry["DetailType"], entry["EventBusName"]) == (lambda_function.EVENT_SOURCE, lambda_function.EVENT_DETAIL_TYPE, "default")
+    assert json.loads(entry["Detail"]) == {"year": 2023, "rounds": [0, 1, 2], "bucket": BUCKET, "dataset_path": DATASET_PATH}
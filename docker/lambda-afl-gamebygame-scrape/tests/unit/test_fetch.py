@@ -0,0 +1,62 @@
+import requests
+
+import lambda_function
+
+
+class StubResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class StubSession:
+    """Serves canned responses per team and records the timeout and headers of every request."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.timeouts = []
+        self.headers = {}
+
+    def get(self, url, timeout=None, headers=None):
+        self.timeouts.append(timeout)
+        team = url[len(lambda_function.URL):].split("/")[0]
+        self.headers[team] = headers
+        response = self.responses.get(team, StubResponse(404))
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        pass
+
+
+def test_fetch_team_pages_skips_failed_teams_and_keeps_order():
+    session = StubSession({
+        "adelaide": StubResponse(200, b"adelaide"),
+        "brisbanel": StubResponse(404),
+        "carlton": requests.ConnectionError("reset"),
+        "collingwood": StubResponse(200, b"collingwood"),
+    })
+
+    pages = lambda_function.fetch_team_pages(
+        2023,
+        teams=["collingwood", "brisbanel", "carlton", "adelaide"],
+        max_workers=4,
+        timeout=5,
+        session=session,
+    )
+
+    assert list(pages) == ["collingwood", "adelaide"]
+    assert pages["adelaide"].content == b"adelaide"
+    assert session.timeouts == [5, 5, 5, 5]
+
+
+def test_build_session_pools_connections_and_retries():
+    session = lambda_function.build_session(max_workers=6, max_retries=2, backoff_factor=0.1)
+    adapter = session.get_adapter(lambda_function.URL)
+
+    assert adapter._pool_maxsize == 6
+    assert adapter.max_retries.total == 2
+    assert adapter.max_retries.backoff_factor == 0.1
+    assert 503 in adapter.max_retries.status_forcelist
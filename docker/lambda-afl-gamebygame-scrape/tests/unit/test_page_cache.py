@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pandas as pd
+
+import lambda_function
+from tests.unit.test_fetch import StubResponse, StubSession
+
+PAGE = (Path(__file__).parent.parent / "fixtures" / "adelaide_2023_gbg.html").read_bytes()
+
+class MemoryStorage:
+    def __init__(self):
+        self.objects = {}
+
+    def get(self, key):
+        return self.objects.get(key)
+
+    def put(self, key, data):
+        self.objects[key] = data
+
+def test_unchanged_pages_reuse_cached_tables():
+    storage = MemoryStorage()
+    cache = lambda_function.PageCache(storage, "cache/")
+    first = StubSession({
+        "adelaide": StubResponse(200, PAGE, {"ETag": '"a1"', "Last-Modified": "Sun, 01 Oct 2023 00:00:00 GMT"}),
+        "carlton": StubResponse(200, PAGE),
+        "collingwood": StubResponse(200, PAGE),
+    })
+    pages, changed = lambda_function.scrape_team_pages(2023, session=first, cache=cache)
+    cache.flush()
+
+    assert changed == ["adelaide", "carlton", "collingwood"]
+    assert sorted(storage.objects) == ["cache/2023/adelaide.json", "cache/2023/carlton.json", "cache/2023/collingwood.json"]
+
+    updated = PAGE.replace(b"<td>30</td>", b"<td>31</td>")
+    cache = lambda_function.PageCache(storage, "cache/")
+    second = StubSession({
+        "adelaide": StubResponse(304),
+        "carlton": StubResponse(200, PAGE),
+        "collingwood": StubResponse(200, updated),
+    })
+    cached_pages, changed = lambda_function.scrape_team_pages(2023, session=second, cache=cache)
+
+    assert changed == ["collingwood"]
+    assert second.headers["adelaide"] == {
+        "If-None-Match": '"a1"', "If-Modified-Since": "Sun, 01 Oct 2023 00:00:00 GMT",
+    }
+    assert second.headers["carlton"] == {}
+    pd.testing.assert_frame_equal(
+        lambda_function.assemble_team_pages({"adelaide": cached_pages["adelaide"]}),
+        lambda_function.assemble_team_pages({"adelaide": pages["adelaide"]}),
+    )
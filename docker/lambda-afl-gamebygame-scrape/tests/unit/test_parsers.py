@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.gbg_fixtures import season_fixture
+import lambda_function
+
+FIXTURE = Path(__file__).parent.parent / "fixtures" / "adelaide_2023_gbg.html"
+
+@pytest.mark.parametrize("parser", sorted(lambda_function.PARSERS))
+def test_parser_normalises_cells(parser):
+    opponents, tables = lambda_function.PARSERS[parser](FIXTURE.read_bytes())
+
+    assert opponents == ["GE", "CA", "CW"]
+    assert [name for name, _ in tables] == ["Disposals", "% Played", "Subs"]
+    assert tables[0][1] == [
+        ["SmithNAJones, Sam", "21", "NA", "NA", "21"],
+        ["Ren\xe9, Zo\xeb", "30", "18", "25", "73"],
+        ["Bailey, Jack", "NA", "12", "9", "21"],
+    ]
+    assert tables[2][1][2] == ["Bailey, Jack", "NA", "On", "NA", "NA"]
+
+def test_lxml_matches_html_parser_on_season_fixture():
+    pages = season_fixture(2023, teams=lambda_function.TEAMS[:4], rounds=8, players_per_team=10)
+
+    for content in pages.values():
+        assert lambda_function.parse_page_lxml(content) == lambda_function.parse_page_html_parser(content)
+
+def test_parse_team_page_is_independent_of_backend():
+    content = FIXTURE.read_bytes()
+    by_parser = {}
+    for parser in lambda_function.PARSERS:
+        gbg_content = {}
+        lambda_function.parse_team_page(content, "adelaide", gbg_content, parser=parser)
+        by_parser[parser] = gbg_content
+
+    assert by_parser["lxml"] == by_parser["html.parser"]
+    assert by_parser["lxml"]["Bailey, Jack"]["subs"] == ["NA", "On", "NA"]
+    assert by_parser["lxml"]["Bailey, Jack"]["team"] == ["adelaide"] * 3
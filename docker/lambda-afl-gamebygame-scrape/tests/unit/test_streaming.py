@@ -0,0 +1,118 @@
+import io
+import os
+from pathlib import Path
+
+import boto3
+import pyarrow
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+
+import lambda_function
+from storage import S3Storage
+from tests.unit.test_fetch import StubResponse, StubSession
+
+PAGE = (Path(__file__).parent.parent / "fixtures" / "adelaide_2023_gbg.html").read_bytes()
+BUCKET = "afl-game-data"
+EVENT = {
+    "bucket_to_save": BUCKET,
+    "data_path": "data/player-gamebygame/AFL-Tables_game-by-game-stats_",
+    "year_to_query": 2023,
+}
+KEY = "data/player-gamebygame/AFL-Tables_game-by-game-stats_2023.parquet"
+
+@pytest.fixture
+def s3():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-2")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"})
+        yield client
+
+def read_season(s3):
+    return pq.ParquetFile(io.BytesIO(s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read()))
+
+def serve(monkeypatch, responses):
+    monkeypatch.setattr(lambda_function, "build_session", lambda **kwargs: StubSession(responses))
+
+def test_multipart_writer_uploads_in_parts(s3):
+    storage = S3Storage(BUCKET, client=s3, part_size=5 * 1024 * 1024)
+    data = os.urandom(11 * 1024 * 1024)
+
+    with storage.open_writer("big.bin") as sink:
+        for i in range(0, len(data), 1024 * 1024):
+            sink.write(data[i:i + 1024 * 1024])
+        assert len(sink.parts) == 2
+        assert len(sink.buffer) == 1024 * 1024
+
+    assert storage.get("big.bin") == data
+
+def test_failed_write_aborts_upload(s3):
+    storage = S3Storage(BUCKET, client=s3, part_size=5 * 1024 * 1024)
+
+    with pytest.raises(RuntimeError):
+        with storage.open_writer("big.bin") as sink:
+            sink.write(os.urandom(6 * 1024 * 1024))
+            raise RuntimeError("parse failed")
+
+    assert not storage.exists("big.bin")
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+def test_handler_streams_one_row_group_per_team(s3, monkeypatch):
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": StubResponse(200, PAGE.replace(b"Bailey", b"Baker"))})
+
+    assert lambda_function.lambda_handler(EVENT, None)["statusCode"] == 200
+
+    season = read_season(s3)
+    df = season.read().to_pandas()
+    assert season.num_row_groups == 2
+    assert season.schema_arrow == lambda_function.SEASON_SCHEMA
+    assert df.groupby("team", observed=True).size().to_dict() == {"adelaide": 18, "carlton": 18}
+
+def test_incremental_run_merges_changed_team_row_groups(s3, monkeypatch):
+    event = dict(EVENT, cache_path="cache/")
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": StubResponse(200, PAGE.replace(b"Bailey", b"Baker"))})
+    lambda_function.lambda_handler(event, None)
+
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE), "carlton": StubResponse(200, PAGE.replace(b"Bailey", b"Brown"))})
+    assert lambda_function.lambda_handler(event, None)["statusCode"] == 200
+
+    df = read_season(s3).read().to_pandas()
+    assert sorted(df.loc[df["team"] == "carlton", "player"].unique()) == ["Brown, Jack", "Ren\xe9, Zo\xeb", "SmithNAJones, Sam"]
+    assert (df["team"] == "adelaide").sum() == 18
+
+    assert "No changes" in lambda_function.lambda_handler(event, None)["body"]
+
+def test_season_table_is_typed():
+    gbg_content = {}
+    lambda_function.parse_team_page(PAGE, "adelaide", gbg_content)
+    table = lambda_function.to_season_table(lambda_function.assemble_game_by_game_stats(gbg_content))
+    df = table.to_pandas()
+
+    assert table.schema == lambda_function.SEASON_SCHEMA
+    assert sorted(df["stat"].unique()) == ["%_played", "disposals"]
+    bailey = df.loc[(df["player"] == "Bailey, Jack") & (df["stat"] == "disposals")]
+    assert bailey["round"].tolist() == [0, 1, 2]
+    assert bailey["value"].isna().tolist() == [True, False, False]
+    assert bailey["value"].tolist()[1:] == [12.0, 9.0]
+    assert bailey["sub"].tolist()[1] == "On"
+    assert bailey["sub"].isna().tolist() == [True, False, True]
+
+def test_incremental_run_converts_legacy_season_file(s3, monkeypatch):
+    gbg_content = {}
+    lambda_function.parse_team_page(PAGE, "carlton", gbg_content)
+    legacy = lambda_function.assemble_game_by_game_stats(gbg_content)
+    buffer = io.BytesIO()
+    # Small row groups put the `subs` rows apart from the stats they mark
+    pq.write_table(pyarrow.Table.from_pandas(legacy), buffer, row_group_size=5)
+    assert pq.ParquetFile(io.BytesIO(buffer.getvalue())).num_row_groups > 1
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=buffer.getvalue())
+
+    serve(monkeypatch, {"adelaide": StubResponse(200, PAGE)})
+    lambda_function.lambda_handler(dict(EVENT, cache_path="cache/"), None)
+
+    season = read_season(s3)
+    assert season.schema_arrow == lambda_function.SEASON_SCHEMA
+    df = season.read().to_pandas()
+    assert df.groupby("team", observed=True).size().to_dict() == {"adelaide": 18, "carlton": 18}
+    assert df.loc[(df["team"] == "carlton") & (df["player"] == "Bailey, Jack"), "sub"].tolist()[1] == "On"
@@ -0,0 +1,166 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# BatchWriteItem accepts at most 25 put or delete requests per call.
+BATCH_SIZE = 25
+MAX_WORKERS = 4
+MAX_RETRIES = 8
+BASE_BACKOFF = 0.05
+MAX_BACKOFF = 5.0
+THROTTLE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+
+class RateLimiter:
+    """Token bucket shared by the writer threads, refilled at `rate` write units a second.
+
+    A request for more units than the bucket holds, such as a 25-item batch at 5 WCU, is
+    handed its units as they refill rather than waiting for a bucket that never fills.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, units: float = 1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                taken = min(units, self.tokens)
+                self.tokens -= taken
+                units -= taken
+                if units <= 0:
+                    return
+                wait = min(units, self.capacity) / self.rate
+            time.sleep(wait)
+
+def dedupe_items(items: Sequence[dict], key_attributes: Sequence[str]) -> List[dict]:
+    """Keeps the last item for each key; BatchWriteItem rejects a batch that repeats a key."""
+    unique = {}
+    for item in items:
+        unique[tuple(item[k] for k in key_attributes)] = item
+    return list(unique.values())
+
+def backoff_delay(attempt: int, base: float = BASE_BACKOFF, cap: float = MAX_BACKOFF) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def backoff_for(max_wcu: Optional[float]) -> Tuple[float, float]:
+    """Returns the backoff base and cap for a write rate.
+
+    Under a rate limit the base is the time a full batch's write units take to refill, so
+    the retry budget outlasts the throttling a provisioned table can cause rather than
+    giving up after a few seconds.
+    """
+    if not max_wcu:
+        return BASE_BACKOFF, MAX_BACKOFF
+    base = max(BASE_BACKOFF, BATCH_SIZE / max_wcu)
+    return base, max(MAX_BACKOFF, 4 * base)
+
+class BatchStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.throttled_items = 0
+        self.throttled_requests = 0
+        self.consumed_wcu = 0.0
+
+    def record(self, batches: int = 0, throttled_items: int = 0, throttled_requests: int = 0, consumed_wcu: float = 0.0):
+        with self.lock:
+            self.batches += batches
+            self.throttled_items += throttled_items
+            self.throttled_requests += throttled_requests
+            self.consumed_wcu += consumed_wcu
+
+def _write_batch(
+    client,
+    table_name: str,
+    requests: List[dict],
+    stats: BatchStats,
+    limiter: Optional[RateLimiter],
+    max_retries: int,
+    backoff: Tuple[float, float] = (BASE_BACKOFF, MAX_BACKOFF),
+):
+    attempt = 0
+    while requests:
+        if limiter is not None:
+            # One write unit per item of up to 1 KB, which covers a vote item.
+            limiter.acquire(len(requests))
+        try:
+            response = client.batch_write_item(
+                RequestItems={table_name: requests},
+                ReturnConsumedCapacity='TOTAL',
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLE_ERRORS:
+                raise
+            stats.record(throttled_requests=1)
+            unprocessed = requests
+        else:
+            consumed = sum(c.get('CapacityUnits', 0) for c in response.get('ConsumedCapacity', []))
+            unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+            stats.record(batches=1, throttled_items=len(unprocessed), consumed_wcu=consumed)
+
+        if not unprocessed:
+            return
+        if attempt >= max_retries:
+            raise RuntimeError(f"{len(unprocessed)} items still unprocessed after {max_retries} retries")
+        time.sleep(backoff_delay(attempt, *backoff))
+        attempt += 1
+        requests = unprocessed
+
+def batch_write_items(
+    client,
+    table_name: str,
+    items: Sequence[dict],
+    key_attributes: Sequence[str] = ('HashKey', 'Model'),
+    max_workers: int = MAX_WORKERS,
+    max_wcu: Optional[float] = None,
+    max_retries: int = MAX_RETRIES,
+    delete_keys: Sequence[dict] = (),
+) -> Dict[str, float]:
+    """Writes `items` with parallel 25-item BatchWriteItem calls and returns throughput stats.
+
+    Unprocessed items are retried with jittered exponential backoff. `max_wcu` caps the
+    write units sent per second across all workers, for tables with provisioned capacity,
+    and stretches the backoff to match.
+    `delete_keys` are deleted in the same batches; none may be the key of an item in `items`.
+    """
+    items = dedupe_items(items, key_attributes)
+    delete_keys = dedupe_items(delete_keys, key_attributes)
+    requests = [{'PutRequest': {'Item': item}} for item in items] + [{'DeleteRequest': {'Key': key}} for key in delete_keys]
+    batches = [requests[i:i + BATCH_SIZE] for i in range(0, len(requests), BATCH_SIZE)]
+    limiter = RateLimiter(max_wcu) if max_wcu else None
+    backoff = backoff_for(max_wcu)
+    stats = BatchStats()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        for future in [executor.submit(_write_batch, client, table_name, b, stats, limiter, max_retries, backoff) for b in batches]:
+            future.result()
+    seconds = time.perf_counter() - start
+
+    result = {
+        'items': len(items),
+        'deleted': len(delete_keys),
+        'batches': stats.batches,
+        'seconds': round(seconds, 3),
+        'items_per_second': round(len(items) / seconds, 1) if seconds else float(len(items)),
+        'throttled_items': stats.throttled_items,
+        'throttled_requests': stats.throttled_requests,
+        'consumed_wcu': stats.consumed_wcu,
+    }
+    logger.info(f"Wrote {len(items)} items to {table_name}: {result}")
+    return result
@@ -0,0 +1,68 @@
+"""Benchmarks reading one round from the partitioned dataset against reading the whole season file.
+
+Run from the function folder:
+
+    python -m benchmarks.bench_dataset [--round 10] [--repeat 5]
+"""
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from benchmarks.season_fixtures import long_frame
+from lambda_function import TEAM_PARTITIONING, build_features, read_dataset, read_season_features
+
+def write_layouts(root: Path, year: int):
+    """Writes a synthetic season as one file and as a partitioned dataset. Returns the file's path."""
+    frame = long_frame(year)
+    season = root / f"season_{year}.parquet"
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), season)
+    for team, rows in frame.groupby("team", observed=True):
+        path = root / "dataset" / f"year={year}" / f"team={team}" / "part-0.parquet"
+        path.parent.mkdir(parents=True)
+        with pq.ParquetWriter(path, pa.Schema.from_pandas(rows.drop(columns="team"), preserve_index=False)) as writer:
+            for _, round_rows in rows.drop(columns="team").groupby("round"):
+                writer.write_table(pa.Table.from_pandas(round_rows, preserve_index=False))
+    return season
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--round", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    year = 2023
+    filesystem = pyarrow.fs.LocalFileSystem()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        season = write_layouts(root, year)
+        base_dir = str(root / "dataset")
+
+        def whole_file():
+            df, X = read_season_features(season.read_bytes(), year)
+            return X[(df["round"] == args.round).to_numpy()]
+
+        def one_round():
+            return build_features(read_dataset(filesystem, base_dir, year, rounds=[args.round]), year)[1]
+
+        assert (whole_file() == one_round()).all()
+        dataset = ds.dataset(f"{base_dir}/year={year}", format="parquet", partitioning=TEAM_PARTITIONING)
+        fragments = list(dataset.get_fragments())
+        selected = sum(len(f.split_by_row_group(ds.field("round") == args.round)) for f in fragments)
+        total = sum(f.num_row_groups for f in fragments)
+
+        full = min(timeit.repeat(whole_file, number=1, repeat=args.repeat))
+        pushdown = min(timeit.repeat(one_round, number=1, repeat=args.repeat))
+        size = season.stat().st_size
+
+    print(f"season file: {size / 2 ** 20:.1f} MB; dataset: {len(fragments)} files, {total} row groups, {selected} read for round {args.round}")
+    print(f"whole season file:  {full * 1000:9.1f} ms")
+    print(f"one round, pushdown: {pushdown * 1000:8.1f} ms  ({full / pushdown:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmarks build_features against pivoting with transform_gamebygame and copying out the matrix.
+
+Run from the function folder:
+
+    python -m benchmarks.bench_features [--seasons 5] [--repeat 3] [--legacy-files]
+"""
+import argparse
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.season_fixtures import long_frame
+from lambda_function import build_features, feature_matrix, transform_gamebygame
+
+def pivot_features(df, year):
+    games = transform_gamebygame(df, year)
+    return games, feature_matrix(games)
+
+def peak_mb(build, frames) -> float:
+    tracemalloc.start()
+    for year, frame in frames.items():
+        build(frame, year)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-files", action="store_true", help="Use string-valued files written before the typed schema")
+    args = parser.parse_args(argv)
+
+    years = range(2023 - args.seasons + 1, 2024)
+    frames = {year: long_frame(year, typed=not args.legacy_files) for year in years}
+    for year, frame in frames.items():
+        np.testing.assert_array_equal(build_features(frame, year)[1], pivot_features(frame, year)[1])
+
+    def run(build):
+        return lambda: [build(frame, year) for year, frame in frames.items()]
+
+    pivot = min(timeit.repeat(run(pivot_features), number=1, repeat=args.repeat))
+    scatter = min(timeit.repeat(run(build_features), number=1, repeat=args.repeat))
+
+    print(f"{args.seasons} seasons, {sum(len(frame) for frame in frames.values())} long rows")
+    print(f"pivot + copy: {pivot * 1000:9.1f} ms  peak {peak_mb(pivot_features, frames):7.1f} MB")
+    print(f"scatter:      {scatter * 1000:9.1f} ms  peak {peak_mb(build_features, frames):7.1f} MB  ({pivot / scatter:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmarks per-row against batched ONNX inference on a synthetic season.
+
+Run from the function folder:
+
+    python -m benchmarks.bench_inference [--rows 9500] [--repeat 3]
+"""
+import argparse
+import timeit
+
+import numpy as np
+import onnxruntime
+
+from benchmarks.onnx_fixtures import synthetic_features, tiny_model
+from lambda_function import predict
+
+def predict_per_row(onnx_session, X):
+    """The previous inference loop: one session.run call per player-game."""
+    inf = []
+    for x in X:
+        t = onnx_session.run(None, {'input': x.reshape(1, -1)})
+        inf.append(float(t[0]))
+    return inf
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # About 207 games a season with 44 players each.
+    parser.add_argument("--rows", type=int, default=9500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    X = synthetic_features(args.rows)
+    session = onnxruntime.InferenceSession(tiny_model())
+    fixed_session = onnxruntime.InferenceSession(tiny_model(batch_size=256))
+    np.testing.assert_allclose(predict(session, X), predict_per_row(session, X), rtol=1e-5)
+    np.testing.assert_allclose(predict(fixed_session, X), predict(session, X), rtol=1e-5)
+
+    cases = [
+        ("per row", lambda: predict_per_row(session, X)),
+        ("batched", lambda: predict(session, X)),
+        ("chunks of 1024", lambda: predict(session, X, batch_size=1024)),
+        ("fixed batch 256", lambda: predict(fixed_session, X)),
+    ]
+    print(f"{args.rows} rows x {X.shape[1]} features")
+    for name, run in cases:
+        elapsed = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(f"{name:16} {elapsed * 1000:9.1f} ms  {args.rows / elapsed:12,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmarks scoring several models against one shared feature matrix over rebuilding it per model.
+
+Run from the function folder:
+
+    python -m benchmarks.bench_models [--models 4] [--hidden 256] [--repeat 3]
+"""
+import argparse
+import io
+import timeit
+
+import onnxruntime
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.onnx_fixtures import tiny_model
+from benchmarks.season_fixtures import long_frame
+from lambda_function import read_season_features, score_models, score_votes, session_options
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=4)
+    parser.add_argument("--hidden", type=int, default=256, help="Hidden units of each synthetic model")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    season = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(long_frame(2023), preserve_index=False), season)
+    parquet_data = season.getvalue()
+    sessions = {
+        f"models/model-{i}.onnx": onnxruntime.InferenceSession(tiny_model(hidden=args.hidden, seed=i), session_options())
+        for i in range(args.models)
+    }
+
+    def per_model():
+        for model_path, session in sessions.items():
+            df, X = read_season_features(parquet_data, 2023)
+            score_votes(df, session, model_path, X=X)
+
+    def shared():
+        df, X = read_season_features(parquet_data, 2023)
+        score_models(df, X, sessions)
+
+    def one_model():
+        df, X = read_season_features(parquet_data, 2023)
+        score_models(df, X, dict(list(sessions.items())[:1]))
+
+    rebuilt = min(timeit.repeat(per_model, number=1, repeat=args.repeat))
+    together = min(timeit.repeat(shared, number=1, repeat=args.repeat))
+    single = min(timeit.repeat(one_model, number=1, repeat=args.repeat))
+
+    print(f"{args.models} models, {len(read_season_features(parquet_data, 2023)[0])} player-games")
+    extra = (together - single) / max(args.models - 1, 1)
+    print(f"one model:                  {single * 1000:9.1f} ms")
+    print(f"features rebuilt per model: {rebuilt * 1000:9.1f} ms")
+    print(f"shared features:            {together * 1000:9.1f} ms  ({extra * 1000:.1f} ms per extra model)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Benchmarks simulated seasons per second on a synthetic season as worker threads are added.
+
+Run from the function folder:
+
+    python -m benchmarks.bench_simulation [--simulations 20000] [--workers 1 2 4] [--chunk-size 500]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.season_fixtures import long_frame
+from lambda_function import build_features
+from simulation import CHUNK_SIZE, simulate_season
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--simulations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    df, _ = build_features(long_frame(2023), 2023)
+    df = df.assign(game_weight=np.random.default_rng(0).normal(size=len(df)))
+
+    print(f"{df['game_id'].nunique()} games, {df['player'].nunique()} players, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        simulate_season(df, args.simulations, workers=workers, seed=0, chunk_size=args.chunk_size)
+        rate = args.simulations / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"{workers:2d} workers: {rate:9.0f} seasons/s  ({rate / baseline:.1f}x)")
+
+if __name__ == "__main__":
+    main()
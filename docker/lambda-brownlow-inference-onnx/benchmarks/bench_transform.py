@@ -0,0 +1,73 @@
+"""Benchmarks transform_gamebygame against the row-wise apply version over several seasons.
+
+Run from the function folder:
+
+    python -m benchmarks.bench_transform [--seasons 5] [--repeat 3] [--legacy-files]
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.season_fixtures import long_frame
+from lambda_function import ScrapedColumnNames, TeamKeys, transform_gamebygame
+
+def legacy_transform(df: pd.DataFrame, year: int):
+    """The previous transform, building game_id and year_round with a row-wise apply."""
+    if df[ScrapedColumnNames.VALUE].dtype == object:
+        df = df.copy()
+        df = df.loc[~df[ScrapedColumnNames.VALUE].isin(["Off", "On"])]
+        df[ScrapedColumnNames.VALUE] = df[ScrapedColumnNames.VALUE].replace({"NA": 0})
+        df[ScrapedColumnNames.VALUE] = df[ScrapedColumnNames.VALUE].astype(np.float32)
+    else:
+        df = df.assign(**{ScrapedColumnNames.VALUE: df[ScrapedColumnNames.VALUE].fillna(0)})
+
+    df = df.pivot(
+        index=[
+            ScrapedColumnNames.PLAYER,
+            ScrapedColumnNames.TEAM,
+            ScrapedColumnNames.ROUND,
+            ScrapedColumnNames.OPPENENT,
+        ],
+        columns=ScrapedColumnNames.STAT,
+        values=ScrapedColumnNames.VALUE,
+    ).reset_index()
+
+    if 'subs' in df.columns:
+        df = df.drop(columns='subs')
+
+    df[ScrapedColumnNames.YEAR] = year
+    df['opponents'] = df['opponents'].map({v: k for k, v in TeamKeys.items()}, na_action=None)
+    df['game_id'] = df.apply(lambda row: '_'.join(sorted([row['team'], row['opponents']]) + [str(row['round'])]), axis=1)
+    df['year_round'] = df.apply(lambda row: '_'.join([str(row[ScrapedColumnNames.YEAR]), str(row['round'])]), axis=1)
+
+    return df
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-files", action="store_true", help="Use string-valued files written before the typed schema")
+    args = parser.parse_args(argv)
+
+    years = range(2023 - args.seasons + 1, 2024)
+    frames = {year: long_frame(year, typed=not args.legacy_files) for year in years}
+    for year, frame in frames.items():
+        expected = legacy_transform(frame, year)
+        actual = transform_gamebygame(frame, year)
+        for column in ["game_id", "year_round"]:
+            assert actual[column].tolist() == expected[column].tolist()
+
+    def run(transform):
+        return lambda: [transform(frame, year) for year, frame in frames.items()]
+
+    legacy = min(timeit.repeat(run(legacy_transform), number=1, repeat=args.repeat))
+    vectorised = min(timeit.repeat(run(transform_gamebygame), number=1, repeat=args.repeat))
+
+    print(f"{args.seasons} seasons, {sum(len(frame) for frame in frames.values())} long rows")
+    print(f"row-wise apply: {legacy * 1000:9.1f} ms")
+    print(f"vectorised:     {vectorised * 1000:9.1f} ms  ({legacy / vectorised:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
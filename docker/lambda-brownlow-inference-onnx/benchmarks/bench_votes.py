@@ -0,0 +1,53 @@
+"""Benchmarks vote assignment against the per-game nlargest loop.
+
+Run from the function folder:
+
+    python -m benchmarks.bench_votes [--seasons 10] [--repeat 3]
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from lambda_function import assign_votes
+
+def legacy_assign_votes(df: pd.DataFrame) -> pd.DataFrame:
+    """The previous assignment: nlargest per game, concatenated."""
+    games = []
+    for game in df.groupby('game_id'):
+        game_df = game[1].nlargest(n=3, columns='game_weight')
+        game_df['votes'] = [3, 2, 1]
+        games.append(game_df)
+    return pd.concat(games, axis=0)
+
+def weighted_games(n_games: int, players_per_game: int = 44, seed: int = 0) -> pd.DataFrame:
+    """Player-games in shuffled order with rounded weights, so some games have ties."""
+    rng = np.random.default_rng(seed)
+    n_rows = n_games * players_per_game
+    df = pd.DataFrame({
+        'player': [f'Player {i}' for i in range(n_rows)],
+        'game_id': np.repeat([f'game_{g:05d}' for g in range(n_games)], players_per_game),
+        'game_weight': rng.normal(size=n_rows).round(1).astype(np.float32),
+    })
+    return df.sample(frac=1, random_state=seed)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # About 207 games a season
+    parser.add_argument("--seasons", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    df = weighted_games(207 * args.seasons)
+    pd.testing.assert_frame_equal(assign_votes(df), legacy_assign_votes(df))
+
+    legacy = min(timeit.repeat(lambda: legacy_assign_votes(df), number=1, repeat=args.repeat))
+    vectorised = min(timeit.repeat(lambda: assign_votes(df), number=1, repeat=args.repeat))
+
+    print(f"{df['game_id'].nunique()} games, {len(df)} player-games")
+    print(f"nlargest loop: {legacy * 1000:9.1f} ms")
+    print(f"one sort:      {vectorised * 1000:9.1f} ms  ({legacy / vectorised:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
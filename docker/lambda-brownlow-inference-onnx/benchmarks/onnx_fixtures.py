@@ -0,0 +1,45 @@
+"""Small ONNX models and synthetic feature matrices for tests and benchmarks."""
+from typing import Optional
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+from lambda_function import INFERENCE_COLUMNS
+
+N_FEATURES = len(INFERENCE_COLUMNS) - 2
+
+def tiny_model(n_features: int = N_FEATURES, hidden: int = 16, batch_size: Optional[int] = None, seed: int = 0) -> bytes:
+    """Builds a one-hidden-layer MLP scoring each row of an `input` matrix.
+
+    The batch dimension is dynamic unless `batch_size` fixes it.
+    """
+    rng = np.random.default_rng(seed)
+    weights = [
+        numpy_helper.from_array(rng.normal(size=(n_features, hidden)).astype(np.float32) / n_features, "w1"),
+        numpy_helper.from_array(rng.normal(size=hidden).astype(np.float32), "b1"),
+        numpy_helper.from_array(rng.normal(size=(hidden, 1)).astype(np.float32), "w2"),
+    ]
+    nodes = [
+        helper.make_node("MatMul", ["input", "w1"], ["h"]),
+        helper.make_node("Add", ["h", "b1"], ["z"]),
+        helper.make_node("Relu", ["z"], ["a"]),
+        helper.make_node("MatMul", ["a", "w2"], ["output"]),
+    ]
+    batch = batch_size if batch_size is not None else "batch"
+    graph = helper.make_graph(
+        nodes,
+        "brownlow_game_weight",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [batch, n_features])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [batch, 1])],
+        initializer=weights,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+    return model.SerializeToString()
+
+def synthetic_features(n_rows: int, n_features: int = N_FEATURES, seed: int = 0) -> np.ndarray:
+    """Draws a float32 matrix of count-like player stats."""
+    rng = np.random.default_rng(seed)
+    return rng.poisson(8, size=(n_rows, n_features)).astype(np.float32)
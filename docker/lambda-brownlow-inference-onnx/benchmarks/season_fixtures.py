@@ -0,0 +1,72 @@
+"""Synthetic long-format season frames, as read from the scraper's parquet files."""
+import numpy as np
+import pandas as pd
+
+from typing import Optional, Sequence
+
+from lambda_function import INFERENCE_COLUMNS, TeamKeys
+
+STATS = INFERENCE_COLUMNS[2:]
+
+def long_frame(
+    year: int = 2023,
+    rounds: int = 23,
+    players_per_team: int = 22,
+    typed: bool = True,
+    seed: int = 0,
+    teams: Optional[Sequence[str]] = None,
+    stats: Sequence[str] = STATS,
+) -> pd.DataFrame:
+    """Builds one season of player/round/stat rows for `teams` (default: every team in `TeamKeys`).
+
+    Teams are paired off at random each round. `typed=False` gives the layout of files
+    written before the typed schema: string values with "NA" placeholders and the
+    "Off"/"On" substitute markers in a `subs` stat.
+    """
+    rng = np.random.default_rng(seed + year)
+    teams = list(teams) if teams is not None else list(TeamKeys)
+    fixtures = []
+    for round_number in range(rounds):
+        order = rng.permutation(len(teams))
+        for home, away in zip(order[::2], order[1::2]):
+            fixtures.append((round_number, teams[home], teams[away]))
+            fixtures.append((round_number, teams[away], teams[home]))
+
+    players, team_col, round_col, opponent_col = [], [], [], []
+    for round_number, team, opponent in fixtures:
+        for i in range(players_per_team):
+            players.append(f"{team.title()} {i:02d}, Player")
+            team_col.append(team)
+            round_col.append(round_number)
+            opponent_col.append(TeamKeys[opponent])
+    n_games = len(players)
+
+    stats = list(stats) + ["subs"]
+    values = rng.integers(0, 30, size=(len(stats), n_games)).astype(np.float32)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    subs = np.full(n_games, None, dtype=object)
+    subs[rng.random(n_games) < 0.04] = "Off"
+    subs[rng.random(n_games) < 0.04] = "On"
+
+    frame = pd.DataFrame({
+        "player": np.tile(players, len(stats)),
+        "team": np.tile(team_col, len(stats)),
+        "round": np.tile(round_col, len(stats)),
+        "opponents": np.tile(opponent_col, len(stats)),
+        "stat": np.repeat(stats, n_games),
+    })
+    if not typed:
+        strings = np.where(np.isnan(values), "NA", np.nan_to_num(values).astype(np.int64).astype(str)).astype(object)
+        strings[-1] = np.where(subs == None, "NA", subs)  # noqa: E711
+        return frame.assign(value=strings.ravel()).reset_index()
+
+    is_sub = frame["stat"] == "subs"
+    frame = frame.assign(value=values.ravel(), sub=pd.Categorical(np.tile(subs, len(stats)), categories=["Off", "On"]))
+    frame = frame.loc[~is_sub].reset_index(drop=True)
+    return frame.astype({
+        "player": "category",
+        "team": "category",
+        "round": np.int16,
+        "opponents": "category",
+        "stat": "category",
+    })
@@ -1,16 +1,31 @@
 import io
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
 import pyarrow.parquet as pq
 import numpy as np
 import boto3
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
 import onnxruntime
 import hashlib
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from batch_writer import MAX_WORKERS, batch_write_items
+from instrumentation import Metrics
+from simulation import simulate_season
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+metrics = Metrics('brownlow-inference-onnx')
+
 class ScrapedColumnNames():
     INDEX = 'index'
     PLAYER = 'player'
@@ -19,6 +34,7 @@ class ScrapedColumnNames():
     OPPENENT = 'opponents'
     STAT = 'stat'
     VALUE = 'value'
+    SUB = 'sub'
     YEAR = 'year'
 
 ExportColumns = {
@@ -83,19 +99,58 @@ INFERENCE_COLUMNS = [
     "uncontested_possessions",
 ]
 
+def game_keys(team: pd.Series, opponents: pd.Series, rounds: pd.Series) -> pd.Series:
+    """Builds `<team>_<team>_<round>` game ids with the two team names in sorted order.
+
+    Both columns are factorised against one sorted set of names, so the smaller code of each
+    pair is also the name that sorts first.
+    """
+    codes, names = pd.factorize(pd.concat([team.astype(str), opponents.astype(str)], ignore_index=True), sort=True)
+    team_codes, opponent_codes = codes[:len(team)], codes[len(team):]
+    names = np.asarray(names, dtype=object)
+    first = pd.Series(names[np.minimum(team_codes, opponent_codes)], index=team.index)
+    second = pd.Series(names[np.maximum(team_codes, opponent_codes)], index=team.index)
+    return first.str.cat([second, rounds.astype(str)], sep='_')
+
+# Model inputs in the order the ONNX graph expects them; the identifiers are not inputs
+FEATURE_COLUMNS = INFERENCE_COLUMNS[2:]
+
+GAME_COLUMNS = [
+    ScrapedColumnNames.PLAYER,
+    ScrapedColumnNames.TEAM,
+    ScrapedColumnNames.ROUND,
+    ScrapedColumnNames.OPPENENT,
+]
+
+def clean_values(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """Returns the identifier and stat columns of a long frame with its values as float32.
+
+    Files scraped before the typed schema hold strings, with "NA" for missing values
+    and the "On"/"Off" substitute markers mixed into the values; those rows are dropped.
+    Typed files store "NA" and empty cells alike as nulls, so both formats read every
+    missing value as 0.
+    """
+    columns = GAME_COLUMNS + [ScrapedColumnNames.STAT]
+    values = df[ScrapedColumnNames.VALUE]
+    if values.dtype == object:
+        keep = ~values.isin(["Off", "On"]).to_numpy()
+        df, values = df.loc[keep], values[keep]
+        values = pd.to_numeric(values, errors='coerce').astype(np.float32)
+    return df[columns], values.fillna(0)
+
+def add_game_columns(df: pd.DataFrame, year: int) -> pd.DataFrame:
+    df[ScrapedColumnNames.YEAR] = year
+    df['opponents'] = df['opponents'].map({v: k for k, v in TeamKeys.items()}, na_action=None)
+    df['game_id'] = game_keys(df['team'], df['opponents'], df['round'])
+    df['year_round'] = f'{year}_' + df['round'].astype(str)
+    return df
+
 def transform_gamebygame(df: pd.DataFrame, year: int):
-    df = df.copy()
-    df = df.loc[~df[ScrapedColumnNames.VALUE].isin(["Off", "On"])]
-    df[ScrapedColumnNames.VALUE] = df[ScrapedColumnNames.VALUE].replace({"NA": 0})
-    df[ScrapedColumnNames.VALUE] = df[ScrapedColumnNames.VALUE].astype(np.float32)
+    df, values = clean_values(df)
+    df = df.assign(**{ScrapedColumnNames.VALUE: values})
 
     df = df.pivot(
-        index=[
-            ScrapedColumnNames.PLAYER,
-            ScrapedColumnNames.TEAM,
-            ScrapedColumnNames.ROUND,
-            ScrapedColumnNames.OPPENENT,
-        ],
+        index=GAME_COLUMNS,
         columns=ScrapedColumnNames.STAT,
         values=ScrapedColumnNames.VALUE,
     ).reset_index()
@@ -103,138 +158,555 @@ def transform_gamebygame(df: pd.DataFrame, year: int):
     if 'subs' in df.columns:
         df = df.drop(columns='subs')
 
-    df[ScrapedColumnNames.YEAR] = year
-    df['opponents'] = df['opponents'].map({v: k for k, v in TeamKeys.items()}, na_action=None)
-    df['game_id'] = df.apply(lambda row: '_'.join(sorted([row['team'], row['opponents']]) + [str(row['round'])]), axis=1)
-    df['year_round'] = df.apply(lambda row: '_'.join([str(row[ScrapedColumnNames.YEAR]), str(row['round'])]), axis=1)
+    return add_game_columns(df, year)
+
+def build_features(df: pd.DataFrame, year: int) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Scatters a long season frame straight into the model's float32 input matrix.
+
+    Returns one row of identifiers per player-game, in the order `transform_gamebygame`
+    gives them, and a C-contiguous matrix whose row `i` holds that player-game's stats in
+    `FEATURE_COLUMNS` order. Stats the model does not take are skipped and stats missing
+    from the file are zero.
+    """
+    df, values = clean_values(df)
+    codes = [pd.factorize(df[column], sort=True)[0] for column in GAME_COLUMNS]
+    known = np.logical_and.reduce([c >= 0 for c in codes])
+    if not known.all():
+        df, values, codes = df.loc[known], values[known], [c[known] for c in codes]
+
+    # One integer per player-game, ordered like the (player, team, round, opponents) index of a pivot
+    keys = np.ravel_multi_index(codes, [c.max(initial=0) + 1 for c in codes])
+    _, first, rows = np.unique(keys, return_index=True, return_inverse=True)
+
+    stats = df[ScrapedColumnNames.STAT].astype('category')
+    positions = pd.Index(FEATURE_COLUMNS).get_indexer(stats.cat.categories)
+    columns = np.where(stats.cat.codes.to_numpy() >= 0, positions[stats.cat.codes.to_numpy()], -1)
+    is_feature = columns >= 0
+
+    X = np.zeros((len(first), len(FEATURE_COLUMNS)), dtype=np.float32)
+    X[rows[is_feature], columns[is_feature]] = values.to_numpy()[is_feature]
+
+    games = df[GAME_COLUMNS].iloc[first].reset_index(drop=True)
+    return add_game_columns(games, year), X
+
+def predict(onnx_session: onnxruntime.InferenceSession, X: np.ndarray, batch_size: Optional[int] = None) -> np.ndarray:
+    """Scores each row of `X` with as few `session.run` calls as the model allows.
+
+    A model with a dynamic batch dimension gets `batch_size` rows per call, or the whole
+    matrix when it is None. A model with a fixed batch dimension gets chunks of exactly
+    that size, the last one zero-padded.
+    """
+    model_input = onnx_session.get_inputs()[0]
+    fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+    chunk_size = fixed_batch or batch_size or max(len(X), 1)
+
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    predictions = np.empty(len(X), dtype=np.float32)
+    for start in range(0, len(X), chunk_size):
+        chunk = X[start:start + chunk_size]
+        n_rows = len(chunk)
+        if fixed_batch and n_rows < fixed_batch:
+            chunk = np.concatenate([chunk, np.zeros((fixed_batch - n_rows, X.shape[1]), dtype=np.float32)])
+        output = onnx_session.run(None, {model_input.name: chunk})[0]
+        predictions[start:start + n_rows] = np.asarray(output).reshape(len(chunk), -1)[:n_rows, 0]
+    return predictions
+
+# Kept for the life of the container so warm invocations skip client setup,
+# the model download and graph optimisation.
+_CLIENTS: Dict[Tuple[str, Optional[str]], object] = {}
+_SESSIONS: Dict[Tuple[str, str], Tuple[str, onnxruntime.InferenceSession]] = {}
+
+# 0 lets ONNX Runtime use one thread per available core.
+INTRA_OP_THREADS = int(os.environ.get('ONNX_INTRA_OP_THREADS', '0'))
+
+def get_client(service: str, region_name: Optional[str] = None):
+    """Returns a cached boto3 client for `service`."""
+    key = (service, region_name)
+    if key not in _CLIENTS:
+        _CLIENTS[key] = boto3.client(service, region_name=region_name)
+    return _CLIENTS[key]
+
+def get_resource(service: str, region_name: Optional[str] = None):
+    """Returns a cached boto3 resource for `service`."""
+    key = (f'{service}:resource', region_name)
+    if key not in _CLIENTS:
+        _CLIENTS[key] = boto3.resource(service, region_name=region_name)
+    return _CLIENTS[key]
+
+def session_options(intra_op_threads: int = INTRA_OP_THREADS) -> onnxruntime.SessionOptions:
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = intra_op_threads
+    return options
+
+def get_onnx_session(s3_client, bucket_name: str, model_path: str) -> onnxruntime.InferenceSession:
+    """Returns the inference session for a model in S3, rebuilt only when its ETag changes."""
+    key = (bucket_name, model_path)
+    etag = s3_client.head_object(Bucket=bucket_name, Key=model_path)['ETag']
+    cached = _SESSIONS.get(key)
+    if cached is not None and cached[0] == etag:
+        logger.info(f"Reusing cached model {model_path} (ETag {etag})")
+        return cached[1]
 
-    return df
+    logger.info(f"Fetching model from bucket: {bucket_name}, path: {model_path}")
+    with metrics.stage('model_load'):
+        response = s3_client.get_object(Bucket=bucket_name, Key=model_path)
+        onnx_session = onnxruntime.InferenceSession(response['Body'].read(), session_options())
+    # Key on the ETag of the bytes actually read in case the object changed after the HEAD.
+    _SESSIONS[key] = (response.get('ETag', etag), onnx_session)
+    return onnx_session
+
+def read_season(parquet_data: bytes, year: int) -> pd.DataFrame:
+    """Reads a scraped season file and pivots it to one row per player-game."""
+    df = pq.read_table(io.BytesIO(parquet_data)).to_pandas()
+    return transform_gamebygame(df, year)
+
+def read_season_features(parquet_data: bytes, year: int) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Reads a scraped season file into player-game identifiers and the model input matrix."""
+    df = pq.read_table(io.BytesIO(parquet_data)).to_pandas()
+    return build_features(df, year)
+
+# Season datasets hold one directory per year with a Hive partition per team, each file
+# with one row group per round (see the scraper's write_team_partition).
+TEAM_PARTITIONING = ds.partitioning(pa.schema([('team', pa.string())]), flavor='hive')
+DATASET_COLUMNS = ['player', 'team', 'round', 'opponents', 'stat', 'value']
+
+def get_filesystem(region_name: Optional[str] = None) -> pyarrow.fs.FileSystem:
+    """Returns a cached Arrow S3 filesystem, for reading partitioned datasets."""
+    key = ('s3:filesystem', region_name)
+    if key not in _CLIENTS:
+        _CLIENTS[key] = pyarrow.fs.S3FileSystem(region=region_name)
+    return _CLIENTS[key]
+
+def read_dataset(
+    filesystem: pyarrow.fs.FileSystem,
+    base_dir: str,
+    year: int,
+    rounds: Optional[List[int]] = None,
+    columns: List[str] = DATASET_COLUMNS,
+) -> pd.DataFrame:
+    """Reads one season of the partitioned dataset under `base_dir` as a long frame.
+
+    Only `columns`, by default those the features need, are read and, with `rounds`, only
+    the row groups whose statistics can hold those rounds.
+    """
+    dataset = ds.dataset(f"{base_dir.rstrip('/')}/year={year}", filesystem=filesystem, format='parquet', partitioning=TEAM_PARTITIONING)
+    row_filter = ds.field('round').isin(rounds) if rounds is not None else None
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+
+def feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Copies the model inputs of a pivoted frame into a float32 matrix in `FEATURE_COLUMNS` order."""
+    missing_columns = [col for col in FEATURE_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise KeyError(f"Columns not found in DataFrame: {missing_columns}")
+
+    X = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for i, column in enumerate(FEATURE_COLUMNS):
+        X[:, i] = df[column].to_numpy()
+    return X
+
+def score_votes(
+    df: pd.DataFrame,
+    onnx_session: onnxruntime.InferenceSession,
+    model_path: str,
+    batch_size: Optional[int] = None,
+    X: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """Scores every player-game with the model and returns the 3-2-1 votes of each game.
+
+    `X` is the feature matrix of `df` from `build_features`; without it the matrix is
+    copied out of the pivoted columns of `df`.
+    """
+    weights = predict(onnx_session, feature_matrix(df) if X is None else X, batch_size=batch_size)
+    return assign_votes(df.assign(game_weight=weights, model=model_path))
+
+def score_models(
+    df: pd.DataFrame,
+    X: np.ndarray,
+    sessions: Dict[str, onnxruntime.InferenceSession],
+    batch_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Scores the same player-games with every model in `sessions` and returns all their votes.
+
+    ONNX Runtime releases the GIL while a session runs, so the models are scored on
+    threads against the one shared feature matrix.
+    """
+    def score(model_path):
+        return score_votes(df, sessions[model_path], model_path, batch_size=batch_size, X=X)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(sessions)) as executor:
+        votes = list(executor.map(score, sessions))
+    return pd.concat(votes, ignore_index=True)
+
+def assign_votes(df: pd.DataFrame, weight: str = 'game_weight', votes=(3, 2, 1)) -> pd.DataFrame:
+    """Gives `votes` to the highest `weight` players of each game in one ranking pass.
+
+    Rows are stably sorted by game and descending weight, so ties go to the player that
+    comes first in `df`, as `nlargest` does. Games with fewer players than votes hand out
+    the top ones only.
+    """
+    ranked = df.loc[df[weight].notna()].sort_values(['game_id', weight], ascending=[True, False], kind='mergesort')
+    rank = ranked.groupby('game_id', sort=False).cumcount().to_numpy()
+    keep = rank < len(votes)
+    ranked = ranked.loc[keep].copy()
+    ranked['votes'] = np.asarray(votes)[rank[keep]]
+    return ranked
+
+def build_vote_items(votes_df: pd.DataFrame, hash_key: str, model_path: str) -> List[dict]:
+    """Builds one DynamoDB item per vote from whole columns, leaving out null attributes."""
+    columns = {k: votes_df[v].astype(str).astype(object).where(votes_df[v].notna(), None).tolist() for k, v in ExportColumns.items()}
+    # Unique identifier for the HashKey built from player, round, year and game
+    identifiers = (
+        votes_df[ExportColumns['Player']].astype(str)
+        .str.cat([votes_df[ExportColumns[k]].astype(str) for k in ['Round', 'Year', 'GameID']], sep='_')
+    )
+    hashes = [hashlib.sha256(identifier.encode()).hexdigest() for identifier in identifiers]
+
+    items = []
+    for i, hashed in enumerate(hashes):
+        item = {k: values[i] for k, values in columns.items() if values[i] is not None}
+        item[hash_key] = hashed
+        item['Model'] = model_path
+        items.append(item)
+    return items
+
+PROGRESS_TABLE_NAME = 'afl-brownlow-inference-progress'
+LEADERBOARD_TABLE_NAME = 'afl-brownlow-leaderboard'
+# Version marker the leaderboard API uses to invalidate its cached responses
+LEADERBOARD_VERSION_KEY = {'Board': '_meta', 'Player': 'version'}
+# Season simulations are stored in the leaderboard table, one board per year and model
+SIMULATION_BOARD = 'sim#{year}#{model}'
+
+def _number(value: float) -> Decimal:
+    return Decimal(str(round(float(value), 6)))
+
+def build_simulation_items(results: pd.DataFrame, year: int, model_path: str, simulations: int, max_round: int) -> List[dict]:
+    """Builds one leaderboard item per player of a `simulate_season` result.
+
+    `Votes` holds the expected votes, so the board reads back in order from `votesLSI`.
+    """
+    board = SIMULATION_BOARD.format(year=year, model=model_path)
+    return [
+        {
+            'Board': board,
+            'Player': player,
+            'Votes': _number(expected),
+            'WinProbability': _number(win),
+            'RankProbabilities': [_number(p) for p in ranks],
+            'Simulations': simulations,
+            'Round': max_round,
+        }
+        for player, expected, win, ranks in zip(
+            results['player'], results['expected_votes'], results['win_probability'], results['rank_probabilities'],
+        )
+    ]
+
+def scan_max_round(table, year: int, model_path: str, page_size: Optional[int] = None) -> int:
+    """Finds the last inferred round of `year` by scanning every page of the votes table."""
+    kwargs = {
+        'ProjectionExpression': 'YearRound',
+        'FilterExpression': Attr('YearRound').begins_with(f'{year}_') & Attr('Model').eq(model_path),
+    }
+    if page_size:
+        kwargs['Limit'] = page_size
+    max_round = 0
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            max_round = max(max_round, int(item['YearRound'].split('_')[1]))
+        if 'LastEvaluatedKey' not in response:
+            return max_round
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def record_progress(progress_table, year: int, model_path: str, max_round: int):
+    """Raises the progress record of `year` and `model_path` to `max_round`; never lowers it."""
+    try:
+        progress_table.update_item(
+            Key={'Year': int(year), 'Model': model_path},
+            UpdateExpression='SET MaxRound = :round',
+            ConditionExpression='attribute_not_exists(MaxRound) OR MaxRound < :round',
+            ExpressionAttributeValues={':round': max_round},
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+def bump_leaderboard_version(leaderboard_table):
+    leaderboard_table.update_item(
+        Key=LEADERBOARD_VERSION_KEY,
+        UpdateExpression='ADD Version :one',
+        ExpressionAttributeValues={':one': 1},
+    )
+
+# Write rate assumed when a table's capacity cannot be read; the stacks provision 5 WCU
+DEFAULT_WCU = 5
+
+def write_capacity(table, event) -> Optional[float]:
+    """Returns the write units per second to hold writes to `table` under.
+
+    `max_wcu` in the event wins; otherwise the table's provisioned write capacity is read
+    with DescribeTable. On-demand tables are not limited.
+    """
+    if event.get('max_wcu'):
+        return event['max_wcu']
+    try:
+        description = table.meta.client.describe_table(TableName=table.name)['Table']
+    except ClientError as e:
+        logger.warning(f"Could not describe {table.name} ({e.response['Error']['Code']}); writing at {DEFAULT_WCU} WCU.")
+        return DEFAULT_WCU
+    if description.get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST':
+        return None
+    return description.get('ProvisionedThroughput', {}).get('WriteCapacityUnits') or DEFAULT_WCU
+
+# Predictions of one season and model, read to find the items a rescored round replaces
+YEAR_INDEX_NAME = 'yearGSI'
+
+def stored_vote_keys(table, year: int, model_path: str, rounds: Optional[List[int]] = None) -> List[dict]:
+    """Lists the keys of the stored votes of `year` and `model_path`, of `rounds` only if given."""
+    kwargs = {
+        'IndexName': YEAR_INDEX_NAME,
+        'KeyConditionExpression': Key('Year').eq(str(year)) & Key('Model').eq(model_path),
+        'ProjectionExpression': 'HashKey, Model',
+    }
+    if rounds is not None:
+        kwargs['FilterExpression'] = Attr('Round').is_in([str(r) for r in rounds])
+    keys = []
+    while True:
+        response = table.query(**kwargs)
+        keys.extend({'HashKey': item['HashKey'], 'Model': item['Model']} for item in response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return keys
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def get_max_round_inferenced(progress_table, votes_table, year: int, model_path: str) -> int:
+    """Reads the last inferred round from the progress table with a single GetItem.
+
+    Years inferred before the progress table existed fall back to a scan of the votes
+    table once, and the record is seeded with the result.
+    """
+    item = progress_table.get_item(Key={'Year': int(year), 'Model': model_path}, ConsistentRead=True).get('Item')
+    if item is not None:
+        return int(item['MaxRound'])
+
+    logger.warning(f"No progress record for {year} and {model_path}; scanning {votes_table.name}.")
+    max_round = scan_max_round(votes_table, year, model_path)
+    if max_round:
+        record_progress(progress_table, year, model_path, max_round)
+    return max_round
+
+def load_season(event, s3_client, rounds: Optional[List[int]] = None) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Fetches the season of `event` and builds its features.
+
+    From a partitioned dataset only `rounds` are read, when given; a season file is
+    always read whole.
+    """
+    year_to_query = event['year_to_query']
+    bucket_name = event['bucket_to_save']
+    # A partitioned dataset under dataset_path takes the place of the season file
+    dataset_path = event.get('dataset_path')
+    if dataset_path:
+        logger.info(f"Reading rounds {rounds or 'all'} of {year_to_query} from bucket: {bucket_name}, dataset: {dataset_path}")
+        with metrics.stage('fetch') as stage:
+            season = read_dataset(get_filesystem(event['region_name']), f'{bucket_name}/{dataset_path}', year_to_query, rounds)
+            stage.rows = len(season)
+        with metrics.stage('transform') as stage:
+            df, X = build_features(season, year_to_query)
+            stage.rows = len(df)
+        return df, X
+
+    data_path = f"{event['data_path']}{year_to_query}.parquet"
+    logger.info(f"Fetching data from bucket: {bucket_name}, path: {data_path}")
+    with metrics.stage('fetch'):
+        response = s3_client.get_object(Bucket=bucket_name, Key=data_path)
+        parquet_data = response['Body'].read()
+    with metrics.stage('transform') as stage:
+        df, X = read_season_features(parquet_data, year_to_query)
+        stage.rows = len(df)
+    return df, X
+
+def write_votes(table, votes_df: pd.DataFrame, event, replaced_rounds: Dict[str, Optional[List[int]]]) -> dict:
+    """Writes the votes of every model in `votes_df`, replacing what those rounds held before.
+
+    `replaced_rounds` maps each model to the rounds it rescored, or None for the whole
+    season. Items of those rounds that are not rewritten are deleted, so votes that moved
+    to other players, or rounds gone from the data, do not linger. Rewriting the same
+    votes leaves the table unchanged.
+    """
+    projection_expression = event['projection_expression']
+    with metrics.stage('write') as stage:
+        items = [
+            item
+            for model_path, model_votes in votes_df.groupby('model', sort=False)
+            for item in build_vote_items(model_votes, projection_expression, model_path)
+        ]
+        written = {(item[projection_expression], item['Model']) for item in items}
+        stale = [
+            key
+            for model_path, rounds in replaced_rounds.items()
+            for key in stored_vote_keys(table, event['year_to_query'], model_path, rounds)
+            if (key['HashKey'], key['Model']) not in written
+        ]
+        stats = batch_write_items(
+            table.meta.client,
+            table.name,
+            items,
+            key_attributes=(projection_expression, 'Model'),
+            max_workers=event.get('write_workers', MAX_WORKERS),
+            max_wcu=write_capacity(table, event),
+            delete_keys=stale,
+        )
+        stage.rows = len(items) + len(stale)
+    logger.info(f"Vote write stats: {stats}")
+    return stats
 
 def lambda_handler(event, context):
+    metrics.reset()
+    try:
+        return run_inference(event)
+    finally:
+        metrics.flush()
+
+def run_inference(event):
     # Extract parameters from the event
     year_to_query = event['year_to_query']
     bucket_name = event['bucket_to_save']
-    data_path = event['data_path']
-    data_path = f'{data_path}{str(year_to_query)}.parquet'
     
     # Check if 'run_all' parameter is specified
     run_all = event.get('run_all', False)
+    simulations = event.get('simulations', 0)
 
     # DynamoDB params
     region_name = event['region_name']
     table_name = event['table_name']
     projection_expression = event['projection_expression']  # This should be 'HashKey'
-    model_path = event['model_path']
+    # Several models can be scored against the one feature matrix
+    model_paths = event.get('model_paths') or [event['model_path']]
 
     logger.info(f"Projection expression: {projection_expression}")
 
-    # Set up the S3 client
-    s3_client = boto3.client('s3')
-
-    # Fetch data from S3
-    logger.info(f"Fetching data from bucket: {bucket_name}, path: {data_path}")
-    response = s3_client.get_object(Bucket=bucket_name, Key=data_path)
-    parquet_data = response['Body'].read()
-
-    # Read Parquet data using pyarrow
-    parquet_table = pq.read_table(io.BytesIO(parquet_data))
-
-    # Convert Parquet table to Pandas DataFrame
-    df = parquet_table.to_pandas()
-    df = transform_gamebygame(df, year_to_query)
+    s3_client = get_client('s3')
 
     # DynamoDB setup
-    dynamodb = boto3.resource('dynamodb', region_name=region_name)
+    dynamodb = get_resource('dynamodb', region_name=region_name)
     table = dynamodb.Table(table_name)
-    response = table.scan(
-        ProjectionExpression='YearRound, ' + projection_expression  # Ensure 'YearRound' is included
-    )
+    progress_table = dynamodb.Table(event.get('progress_table_name', PROGRESS_TABLE_NAME))
+    # A scrape event names the rounds that changed; every model rescores those
+    changed_rounds = event.get('rounds')
+    max_rounds = {} if run_all or changed_rounds else {
+        model_path: get_max_round_inferenced(progress_table, table, year_to_query, model_path) for model_path in model_paths
+    }
 
-    # Safely extract unique YearRound values
-    unique_year_round_values = {item['YearRound'] for item in response.get('Items', []) if 'YearRound' in item}
-    
-    # Check if the table is empty or if there are no matching 'YearRound' values
-    if not unique_year_round_values:
-        logger.warning("No 'YearRound' values found in DynamoDB scan results. Table might be empty.")
-        rounds_in_year = []  # Set rounds_in_year to empty to avoid further processing
+    # Only the next or changed rounds are read from a dataset, unless all of them are scored or simulated
+    if run_all or simulations:
+        rounds = None
+    elif changed_rounds:
+        rounds = sorted(changed_rounds)
     else:
-        rounds_in_year = [int(x.split('_')[1]) for x in unique_year_round_values if int(x.split('_')[0]) == year_to_query]
+        rounds = sorted({max_round + 1 for max_round in max_rounds.values()})
+    df, X = load_season(event, s3_client, rounds)
 
-    if not rounds_in_year:
-        logger.warning("No matching rounds found for the specified year.")
-        max_round_inferenced = 0
+    # If run_all is True, infer for all rounds; changed rounds are rescored by every model;
+    # otherwise infer only for each model's next round
+    rounds_to_infer: Dict[Optional[int], List[str]] = {}
+    available_rounds = df['round'].unique()
+    if run_all:
+        rounds_to_infer[None] = list(model_paths)
+    elif changed_rounds:
+        for round_to_infer in sorted(changed_rounds):
+            if round_to_infer in available_rounds:
+                rounds_to_infer[round_to_infer] = list(model_paths)
+                logger.info(f"Running inference for changed round {round_to_infer}.")
+            else:
+                logger.warning(f"No data found for changed round {round_to_infer}. Its stored votes will be removed.")
     else:
-        max_round_inferenced = max(rounds_in_year, default=0)
-
-    # If run_all is True, infer for all rounds; otherwise infer only for the next round
+        for model_path in model_paths:
+            next_round = max_rounds[model_path] + 1
+            if next_round in available_rounds:
+                rounds_to_infer.setdefault(next_round, []).append(model_path)
+                logger.info(f"Running inference for round {next_round} with {model_path}.")
+            else:
+                logger.warning(f"No data found for round {next_round} for {model_path}. No inference will be done.")
+
+    # The stored votes of every rescored round are replaced, including rounds gone from the data
     if run_all:
-        df_to_infer = df  # Use all rounds
-        logger.info("Running inference for all rounds.")
+        replaced_rounds = {model_path: None for model_path in model_paths}
+    elif changed_rounds:
+        replaced_rounds = {model_path: sorted(changed_rounds) for model_path in model_paths}
     else:
-        if max_round_inferenced + 1 in df['round'].unique():
-            df_to_infer = df.loc[df['round'] == max_round_inferenced + 1]  # Infer for the next round
-            logger.info(f"Running inference for round {max_round_inferenced + 1}.")
-        else:
-            logger.warning(f"No data found for round {max_round_inferenced + 1}. No inference will be done.")
-            return {
-                'statusCode': 200,
-                'body': f"No new rounds available to process. Max round inferred: {max_round_inferenced}."
-            }
-
-    # Fetch model from S3
-    logger.info(f"Fetching model from bucket: {bucket_name}, path: {model_path}")
-    response = s3_client.get_object(Bucket=bucket_name, Key=model_path)
-    onnx_model_bytes = response['Body'].read()
-
-    # Load ONNX model using ONNX Runtime
-    onnx_session = onnxruntime.InferenceSession(onnx_model_bytes)
-
-    # Ensure only existing columns are dropped, allowing 'brownlow_votes' to be missing
-    columns_to_drop = ['player', 'team', 'opponents', 'round', 'year', 'brownlow_votes', 'game_id', 'year_round']
-    missing_columns = [col for col in columns_to_drop if col not in df_to_infer.columns and col != 'brownlow_votes']
-
-    if missing_columns:
-        raise KeyError(f"Columns not found in DataFrame: {missing_columns}")
-
-    X_test = df_to_infer.drop(columns=[col for col in columns_to_drop if col in df_to_infer.columns])
-    X_test = X_test.astype(np.float32)
-    X_test = X_test.to_numpy()
-
-    # Perform inference using ONNX Runtime
-    inf = []
-    for x in X_test:
-        t = onnx_session.run(None, {'input': x.reshape(1, -1)})
-        inf.append(float(t[0]))
-
-    # Predict Brownlow
-    df_to_infer['game_weight'] = inf
-    df_to_infer['model'] = model_path
-
-    games = []
-    for game in df_to_infer.groupby('game_id'):
-        game_df = game[1].nlargest(n=3, columns='game_weight')
-        game_df['votes'] = [3, 2, 1]
-        games.append(game_df)
-    votes_df = pd.concat(games, axis=0)
-
-    for index, row in votes_df.iterrows():
-        item = {k: str(row[v]) if pd.notnull(row[v]) else None for k, v in ExportColumns.items()}
-        item = {k: v for k, v in item.items() if v is not None}
-
-        # Create a unique identifier for the HashKey using multiple attributes
-        unique_identifier = f"{row[ExportColumns['Player']]}_{row[ExportColumns['Round']]}_{row[ExportColumns['Year']]}_{row[ExportColumns['GameID']]}"
-        item[projection_expression] = str(hashlib.sha256(unique_identifier.encode()).hexdigest())
-        item['Model'] = model_path  # Assuming model_path or a similar value is used as the Model attribute
-
-        # Log the item and its keys to ensure correctness
-        logger.info(f"Item to insert: {item}")
-        logger.info(f"Keys in item: {list(item.keys())}")
+        replaced_rounds = {
+            model_path: [round_to_infer] for round_to_infer, round_models in rounds_to_infer.items() for model_path in round_models
+        }
+
+    if not rounds_to_infer and changed_rounds:
+        write_votes(table, pd.DataFrame(columns=['model']), event, replaced_rounds)
+        return {
+            'statusCode': 200,
+            'body': f"None of the changed rounds {sorted(changed_rounds)} are available to process."
+        }
+    if not rounds_to_infer:
+        return {
+            'statusCode': 200,
+            'body': f"No new rounds available to process. Max round inferred: {max(max_rounds.values())}."
+        }
+    if run_all:
+        logger.info("Running inference for all rounds.")
 
-        # Put the item into DynamoDB
-        table.put_item(Item=item)
+    # Load ONNX models using ONNX Runtime, reusing the sessions from a warm container
+    sessions = {model_path: get_onnx_session(s3_client, bucket_name, model_path) for model_path in model_paths}
+
+    # Perform inference using ONNX Runtime and predict Brownlow votes, slicing the matrix once per round
+    with metrics.stage('inference') as stage:
+        votes = []
+        for round_to_infer, round_models in rounds_to_infer.items():
+            if round_to_infer is None:
+                df_to_infer, X_to_infer = df, X
+            else:
+                in_round = (df['round'] == round_to_infer).to_numpy()
+                df_to_infer, X_to_infer = df.loc[in_round], X[in_round]
+            votes.append(score_models(
+                df_to_infer,
+                X_to_infer,
+                {model_path: sessions[model_path] for model_path in round_models},
+                batch_size=event.get('inference_batch_size'),
+                max_workers=event.get('model_workers'),
+            ))
+            stage.rows = (stage.rows or 0) + len(df_to_infer) * len(round_models)
+        votes_df = pd.concat(votes, ignore_index=True)
+
+    write_votes(table, votes_df, event, replaced_rounds)
+
+    scored_rounds = votes_df.groupby('model')['round'].max()
+    for model_path, max_round in scored_rounds.items():
+        record_progress(progress_table, year_to_query, model_path, int(max_round))
+
+    leaderboard_table = dynamodb.Table(event.get('leaderboard_table_name', LEADERBOARD_TABLE_NAME))
+    if simulations:
+        # Every round so far is rescored, as only the votes of earlier rounds are stored
+        with metrics.stage('simulate') as stage:
+            simulation_items = []
+            for model_path, max_round in scored_rounds.items():
+                season = (df['round'] <= max_round).to_numpy()
+                weights = predict(sessions[model_path], X[season], batch_size=event.get('inference_batch_size'))
+                results = simulate_season(
+                    df.loc[season].assign(game_weight=weights),
+                    simulations,
+                    workers=event.get('simulation_workers'),
+                    temperature=event.get('simulation_temperature', 1.0),
+                )
+                simulation_items.extend(build_simulation_items(results, year_to_query, model_path, simulations, int(max_round)))
+            stage.rows = simulations * len(scored_rounds)
+        batch_write_items(
+            leaderboard_table.meta.client,
+            leaderboard_table.name,
+            simulation_items,
+            key_attributes=('Board', 'Player'),
+            max_workers=event.get('write_workers', MAX_WORKERS),
+            max_wcu=write_capacity(leaderboard_table, event),
+        )
+    bump_leaderboard_version(leaderboard_table)
 
     return {
         'statusCode': 200,
         'body': 'Lambda execution completed successfully.'
     }
-
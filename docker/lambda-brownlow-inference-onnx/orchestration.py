@@ -0,0 +1,168 @@
+"""Fan-out inference: a season split into one task per round, scored by parallel workers.
+
+The Step Functions state machine of the scheduled stack runs three handlers from this
+image in turn:
+
+1. `plan` lists the rounds each model still has to score and returns one task per round.
+2. `infer_round` runs in a Map state, once per task. It reads only its round, scores it
+   with the task's models and writes the votes. Items are keyed on the SHA-256 `HashKey`
+   and `Model`, so a retried task rewrites identical items.
+3. `aggregate` runs once every task has succeeded. It moves each model's progress record
+   forward and bumps the leaderboard version.
+
+`run_local` runs the same three steps in process, with the Map state replaced by a thread
+pool, for tests and for running a fan-out without AWS Step Functions. Stage metrics are
+kept per thread, so each task reports only its own stages.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from batch_writer import BATCH_SIZE
+from lambda_function import (
+    LEADERBOARD_TABLE_NAME,
+    PROGRESS_TABLE_NAME,
+    bump_leaderboard_version,
+    get_client,
+    get_filesystem,
+    get_max_round_inferenced,
+    get_onnx_session,
+    get_resource,
+    load_season,
+    metrics,
+    read_dataset,
+    record_progress,
+    score_models,
+    write_capacity,
+    write_votes,
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Keys of a task that describe its slice of work rather than the season
+TASK_KEYS = ('round', 'model_paths')
+# Rounds scored at once; the Map state of the scheduled stack uses the same limit
+MAX_CONCURRENCY = 10
+
+def season_rounds(event, s3_client) -> List[int]:
+    """Lists the rounds present in the season of `event`, reading only the round column."""
+    year_to_query = event['year_to_query']
+    if event.get('dataset_path'):
+        base_dir = f"{event['bucket_to_save']}/{event['dataset_path']}"
+        season = read_dataset(get_filesystem(event['region_name']), base_dir, year_to_query, columns=['round'])
+    else:
+        key = f"{event['data_path']}{year_to_query}.parquet"
+        body = s3_client.get_object(Bucket=event['bucket_to_save'], Key=key)['Body'].read()
+        season = pq.read_table(io.BytesIO(body), columns=['round']).to_pandas()
+    return sorted(int(r) for r in season['round'].unique())
+
+def plan(event, context=None) -> dict:
+    """Returns one task per round still to score, each naming the models that need it.
+
+    With `run_all` every model scores every round, and with `rounds`, as sent by a scrape
+    event, every model scores those rounds. Otherwise each model scores the rounds after
+    its progress record, so a fan-out also catches up on any missed weeks.
+
+    The votes table's write capacity is split between the tasks that run at once, as each
+    task limits its own writes. Fewer tasks run at once when the capacity would leave each
+    less than a full batch a second, down to one task holding all of it; the returned
+    `max_concurrency` sets the Map state's limit.
+    """
+    model_paths = event.get('model_paths') or [event['model_path']]
+    dynamodb = get_resource('dynamodb', region_name=event['region_name'])
+    votes_table = dynamodb.Table(event['table_name'])
+    run_all = event.get('run_all', False)
+    changed_rounds = set() if run_all else set(event.get('rounds') or [])
+    if run_all or changed_rounds:
+        max_rounds = {model_path: -1 for model_path in model_paths}
+    else:
+        progress_table = dynamodb.Table(event.get('progress_table_name', PROGRESS_TABLE_NAME))
+        max_rounds = {
+            model_path: get_max_round_inferenced(progress_table, votes_table, event['year_to_query'], model_path)
+            for model_path in model_paths
+        }
+
+    base = {k: v for k, v in event.items() if k not in TASK_KEYS + ('model_path', 'run_all', 'rounds')}
+    # Changed rounds gone from the data still get a task, which removes their stored votes
+    rounds = sorted(changed_rounds) if changed_rounds else season_rounds(event, get_client('s3'))
+    tasks = []
+    for round_number in rounds:
+        models = [model_path for model_path in model_paths if round_number > max_rounds[model_path]]
+        if models:
+            tasks.append(dict(base, round=round_number, model_paths=models))
+    concurrent = max(1, min(len(tasks), event.get('max_concurrency', MAX_CONCURRENCY)))
+    max_wcu = write_capacity(votes_table, event) if tasks else None
+    if max_wcu:
+        concurrent = max(1, min(concurrent, int(max_wcu // BATCH_SIZE)))
+        for task in tasks:
+            task['max_wcu'] = max_wcu / concurrent
+    logger.info(f"Planned {len(tasks)} round tasks for {event['year_to_query']}, {concurrent} at once")
+    return {'event': base, 'tasks': tasks, 'max_concurrency': concurrent}
+
+def infer_round(event, context=None) -> dict:
+    """Scores one round with the task's models and replaces that round's stored votes."""
+    metrics.reset()
+    try:
+        round_number = event['round']
+        s3_client = get_client('s3')
+        df, X = load_season(event, s3_client, rounds=[round_number])
+        in_round = (df['round'] == round_number).to_numpy()
+        votes_df = pd.DataFrame(columns=['model'])
+        if in_round.any():
+            sessions = {
+                model_path: get_onnx_session(s3_client, event['bucket_to_save'], model_path)
+                for model_path in event['model_paths']
+            }
+            with metrics.stage('inference', rows=int(in_round.sum()) * len(sessions)):
+                votes_df = score_models(
+                    df.loc[in_round],
+                    X[in_round],
+                    sessions,
+                    batch_size=event.get('inference_batch_size'),
+                    max_workers=event.get('model_workers'),
+                )
+        dynamodb = get_resource('dynamodb', region_name=event['region_name'])
+        replaced_rounds = {model_path: [round_number] for model_path in event['model_paths']}
+        stats = write_votes(dynamodb.Table(event['table_name']), votes_df, event, replaced_rounds)
+        return {'round': round_number, 'model_paths': event['model_paths'], 'items': stats['items']}
+    finally:
+        metrics.flush()
+
+def aggregate(event, context=None) -> dict:
+    """Records each model's last scored round and bumps the leaderboard version once.
+
+    Tasks that wrote no votes, such as those only clearing a round gone from the data, do
+    not move progress, as in the single handler.
+    """
+    base = event['event']
+    max_rounds: Dict[str, int] = {}
+    for result in event.get('results', []):
+        if not result['items']:
+            continue
+        for model_path in result['model_paths']:
+            max_rounds[model_path] = max(max_rounds.get(model_path, -1), result['round'])
+
+    dynamodb = get_resource('dynamodb', region_name=base['region_name'])
+    progress_table = dynamodb.Table(base.get('progress_table_name', PROGRESS_TABLE_NAME))
+    for model_path, max_round in max_rounds.items():
+        record_progress(progress_table, base['year_to_query'], model_path, max_round)
+    if max_rounds:
+        bump_leaderboard_version(dynamodb.Table(base.get('leaderboard_table_name', LEADERBOARD_TABLE_NAME)))
+    return {
+        'rounds': len(event.get('results', [])),
+        'items': sum(result['items'] for result in event.get('results', [])),
+        'max_rounds': max_rounds,
+    }
+
+def run_local(event, max_workers: Optional[int] = None) -> dict:
+    """Runs plan, the per-round tasks and aggregate in process, tasks on a thread pool."""
+    planned = plan(event)
+    max_workers = min(max_workers or planned['max_concurrency'], planned['max_concurrency'])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(infer_round, planned['tasks']))
+    return aggregate(dict(planned, results=results))
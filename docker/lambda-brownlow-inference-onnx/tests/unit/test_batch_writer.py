@@ -0,0 +1,125 @@
+import hashlib
+
+import boto3
+import pandas as pd
+import pytest
+from moto import mock_aws
+
+import batch_writer
+import lambda_function
+
+TABLE_NAME = "afl-brownlow-vote-predictions"
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        yield dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "HashKey", "KeyType": "HASH"}, {"AttributeName": "Model", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "HashKey", "AttributeType": "S"}, {"AttributeName": "Model", "AttributeType": "S"}],
+            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        )
+
+def votes_frame():
+    return pd.DataFrame({
+        "year_round": ["2023_0"] * 3 + ["2023_1"] * 3,
+        "year": [2023] * 6,
+        "round": [0, 0, 0, 1, 1, 1],
+        "player": ["Smith, Jack", "Ward, Tom", "Dangerfield, Patrick", "Smith, Jack", "Ward, Tom", "Rory, Laird"],
+        "model": ["models/model.onnx"] * 6,
+        "team": ["adelaide", "geelong", "geelong", "adelaide", "geelong", "adelaide"],
+        "votes": [3, 2, 1, 3, 2, 1],
+        "opponents": ["geelong", "adelaide", "adelaide", None, None, None],
+        "game_id": ["adelaide_geelong_0"] * 3 + ["adelaide_carlton_1"] * 3,
+    })
+
+def test_vote_items_match_row_by_row_build():
+    votes_df = votes_frame()
+    expected = []
+    for _, row in votes_df.iterrows():
+        item = {k: str(row[v]) if pd.notnull(row[v]) else None for k, v in lambda_function.ExportColumns.items()}
+        item = {k: v for k, v in item.items() if v is not None}
+        unique_identifier = f"{row['player']}_{row['round']}_{row['year']}_{row['game_id']}"
+        item["HashKey"] = str(hashlib.sha256(unique_identifier.encode()).hexdigest())
+        item["Model"] = "models/model.onnx"
+        expected.append(item)
+
+    assert lambda_function.build_vote_items(votes_df, "HashKey", "models/model.onnx") == expected
+
+def test_batch_write_items_writes_every_item_once(table):
+    items = [{"HashKey": f"key-{i}", "Model": "m", "Votes": str(i % 3 + 1)} for i in range(60)]
+    items.append({"HashKey": "key-0", "Model": "m", "Votes": "3"})
+
+    stats = batch_writer.batch_write_items(table.meta.client, TABLE_NAME, items, max_workers=3)
+
+    assert stats["items"] == 60
+    assert stats["batches"] == 3
+    assert table.scan(Select="COUNT")["Count"] == 60
+    assert table.get_item(Key={"HashKey": "key-0", "Model": "m"})["Item"]["Votes"] == "3"
+
+def test_batch_write_items_deletes_keys_alongside_puts(table):
+    batch_writer.batch_write_items(table.meta.client, TABLE_NAME, [{"HashKey": f"key-{i}", "Model": "m"} for i in range(30)])
+
+    stats = batch_writer.batch_write_items(
+        table.meta.client, TABLE_NAME, [{"HashKey": "key-30", "Model": "m"}],
+        delete_keys=[{"HashKey": f"key-{i}", "Model": "m"} for i in range(10)],
+    )
+
+    assert (stats["items"], stats["deleted"], stats["batches"]) == (1, 10, 1)
+    assert sorted(item["HashKey"] for item in table.scan()["Items"]) == sorted(f"key-{i}" for i in range(10, 31))
+
+class ThrottlingClient:
+    """Leaves the last item of every first attempt unprocessed."""
+
+    def __init__(self):
+        self.calls = []
+
+    def batch_write_item(self, RequestItems, ReturnConsumedCapacity):
+        (table_name, requests), = RequestItems.items()
+        self.calls.append(len(requests))
+        unprocessed = requests[-1:] if len(requests) > 1 else []
+        return {
+            "UnprocessedItems": {table_name: unprocessed} if unprocessed else {},
+            "ConsumedCapacity": [{"TableName": table_name, "CapacityUnits": float(len(requests) - len(unprocessed))}],
+        }
+
+def test_unprocessed_items_are_retried(monkeypatch):
+    monkeypatch.setattr(batch_writer, "backoff_delay", lambda attempt, *backoff: 0)
+    client = ThrottlingClient()
+    items = [{"HashKey": f"key-{i}", "Model": "m"} for i in range(30)]
+
+    stats = batch_writer.batch_write_items(client, TABLE_NAME, items, max_workers=1)
+
+    assert sorted(client.calls) == [1, 1, 5, 25]
+    assert stats["throttled_items"] == 2
+    assert stats["consumed_wcu"] == 30
+
+def test_rate_limiter_caps_write_units(monkeypatch):
+    clock = {"now": 0.0}
+    monkeypatch.setattr(batch_writer.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(batch_writer.time, "sleep", lambda seconds: clock.update(now=clock["now"] + seconds))
+    limiter = batch_writer.RateLimiter(5)
+
+    for _ in range(4):
+        limiter.acquire(5)
+
+    assert clock["now"] == pytest.approx(3.0)
+
+@pytest.mark.parametrize("rate, seconds", [(5, 4.0), (0.5, 49.0)])
+def test_rate_limiter_hands_out_batches_larger_than_the_bucket(monkeypatch, rate, seconds):
+    clock = {"now": 0.0}
+    monkeypatch.setattr(batch_writer.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(batch_writer.time, "sleep", lambda seconds: clock.update(now=clock["now"] + seconds))
+    limiter = batch_writer.RateLimiter(rate)
+
+    limiter.acquire(batch_writer.BATCH_SIZE)
+
+    # The first `rate` units are already in the bucket; the rest arrive at `rate` a second
+    assert clock["now"] == pytest.approx(seconds)
+
+def test_backoff_stretches_to_the_write_rate():
+    assert batch_writer.backoff_for(None) == (batch_writer.BASE_BACKOFF, batch_writer.MAX_BACKOFF)
+    # A full batch takes five seconds to refill at 5 WCU
+    assert batch_writer.backoff_for(5) == (5.0, 20.0)
@@ -0,0 +1,208 @@
+import io
+import json
+
+import boto3
+import onnxruntime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset
+import pyarrow.fs
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+
+from benchmarks.onnx_fixtures import tiny_model
+from benchmarks.season_fixtures import long_frame
+import lambda_function
+
+BUCKET = "afl-game-data"
+DATA_PATH = "data/player-gamebygame/AFL-Tables_game-by-game-stats_"
+MODEL_PATH = "models/model.onnx"
+CHALLENGER_PATH = "models/challenger.onnx"
+TEAMS = ["adelaide", "carlton", "geelong", "melbourne"]
+
+def create_table(dynamodb, name, hash_key, range_key, hash_type="S"):
+    return dynamodb.create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": hash_key, "KeyType": "HASH"}, {"AttributeName": range_key, "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": hash_key, "AttributeType": hash_type}, {"AttributeName": range_key, "AttributeType": "S"}],
+        ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+    )
+
+def create_votes_table(dynamodb):
+    """The predictions table with the `yearGSI` index that rescored rounds are cleared through."""
+    return dynamodb.create_table(
+        TableName="afl-brownlow-vote-predictions",
+        KeySchema=[{"AttributeName": "HashKey", "KeyType": "HASH"}, {"AttributeName": "Model", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": name, "AttributeType": "S"} for name in ["HashKey", "Model", "Year"]],
+        GlobalSecondaryIndexes=[{
+            "IndexName": lambda_function.YEAR_INDEX_NAME,
+            "KeySchema": [{"AttributeName": "Year", "KeyType": "HASH"}, {"AttributeName": "Model", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["Player", "Team", "Round", "Votes"]},
+            "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        }],
+        ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+    )
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+    monkeypatch.setattr(lambda_function, "_CLIENTS", {})
+    monkeypatch.setattr(lambda_function, "_SESSIONS", {})
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"})
+        season = io.BytesIO()
+        pq.write_table(pa.Table.from_pandas(long_frame(2024, rounds=3, teams=TEAMS), preserve_index=False), season)
+        s3.put_object(Bucket=BUCKET, Key=f"{DATA_PATH}2024.parquet", Body=season.getvalue())
+        s3.put_object(Bucket=BUCKET, Key=MODEL_PATH, Body=tiny_model())
+        s3.put_object(Bucket=BUCKET, Key=CHALLENGER_PATH, Body=tiny_model(seed=1))
+
+        dynamodb = boto3.resource("dynamodb")
+        votes = create_votes_table(dynamodb)
+        create_table(dynamodb, lambda_function.PROGRESS_TABLE_NAME, "Year", "Model", hash_type="N")
+        create_table(dynamodb, lambda_function.LEADERBOARD_TABLE_NAME, "Board", "Player")
+        yield votes
+
+EVENT = {
+    "bucket_to_save": BUCKET,
+    "data_path": DATA_PATH,
+    "model_path": MODEL_PATH,
+    "year_to_query": 2024,
+    "region_name": "ap-southeast-2",
+    "table_name": "afl-brownlow-vote-predictions",
+    "projection_expression": "HashKey",
+}
+
+def test_handler_infers_the_next_round_each_run(aws):
+    results = [lambda_function.lambda_handler(EVENT, None) for _ in range(3)]
+
+    assert [r["statusCode"] for r in results] == [200, 200, 200]
+    assert "No new rounds" in results[2]["body"]
+    # Rounds are numbered from 0 and the first run starts after round 0
+    items = aws.scan()["Items"]
+    assert sorted({item["Round"] for item in items}) == ["1", "2"]
+    assert len(items) == 2 * 2 * 3
+
+def test_handler_scores_several_models_from_each_ones_next_round(aws):
+    lambda_function.lambda_handler(EVENT, None)
+
+    result = lambda_function.lambda_handler(dict(EVENT, model_paths=[MODEL_PATH, CHALLENGER_PATH]), None)
+
+    assert result["statusCode"] == 200
+    rounds = {}
+    for item in aws.scan()["Items"]:
+        rounds.setdefault(item["Model"], set()).add(item["Round"])
+    assert rounds == {MODEL_PATH: {"1", "2"}, CHALLENGER_PATH: {"1"}}
+    progress = boto3.resource("dynamodb").Table(lambda_function.PROGRESS_TABLE_NAME).scan()["Items"]
+    assert {item["Model"]: item["MaxRound"] for item in progress} == {MODEL_PATH: 2, CHALLENGER_PATH: 1}
+
+def test_handler_stores_season_simulations_for_the_leaderboard(aws):
+    lambda_function.lambda_handler(dict(EVENT, run_all=True, simulations=2000), None)
+
+    board = boto3.resource("dynamodb").Table(lambda_function.LEADERBOARD_TABLE_NAME).query(
+        KeyConditionExpression="Board = :board",
+        ExpressionAttributeValues={":board": f"sim#2024#{MODEL_PATH}"},
+    )["Items"]
+    assert len(board) == len(TEAMS) * 22
+    # Six votes a game, two games a round over three rounds
+    assert float(sum(item["Votes"] for item in board)) == pytest.approx(6 * 2 * 3, abs=1e-3)
+    assert float(sum(item["WinProbability"] for item in board)) >= 1
+    assert {item["Round"] for item in board} == {2}
+    assert all(len(item["RankProbabilities"]) == 10 for item in board)
+
+def test_score_models_matches_scoring_each_model_alone():
+    frame = long_frame(2024, rounds=2, teams=TEAMS)
+    df, X = lambda_function.build_features(frame, 2024)
+    sessions = {
+        path: onnxruntime.InferenceSession(tiny_model(seed=seed), lambda_function.session_options())
+        for seed, path in enumerate([MODEL_PATH, CHALLENGER_PATH])
+    }
+
+    together = lambda_function.score_models(df, X, sessions)
+
+    for path, session in sessions.items():
+        alone = lambda_function.score_votes(df, session, path, X=X).reset_index(drop=True)
+        pd.testing.assert_frame_equal(together.loc[together["model"] == path].reset_index(drop=True), alone)
+
+def write_dataset(root, frame, year):
+    """Lays `frame` out like the scraper's partitioned dataset: one file per team, a row group per round."""
+    for team, rows in frame.groupby("team", observed=True):
+        path = root / f"year={year}" / f"team={team}" / "part-0.parquet"
+        path.parent.mkdir(parents=True)
+        table = pa.Table.from_pandas(rows.drop(columns="team").sort_values("round"), preserve_index=False)
+        pq.write_table(table, path, row_group_size=int((rows["round"] == rows["round"].iloc[0]).sum()))
+
+def test_read_dataset_reads_only_the_requested_rounds(tmp_path):
+    frame = long_frame(2024, rounds=3, teams=TEAMS)
+    write_dataset(tmp_path, frame, 2024)
+    filesystem = pyarrow.fs.LocalFileSystem()
+
+    season = lambda_function.read_dataset(filesystem, str(tmp_path), 2024, rounds=[1])
+
+    assert set(season["round"]) == {1}
+    assert len(season) == (frame["round"] == 1).sum()
+    assert list(season.columns) == lambda_function.DATASET_COLUMNS
+    dataset = pyarrow.dataset.dataset(tmp_path / "year=2024", format="parquet", partitioning=lambda_function.TEAM_PARTITIONING)
+    row_groups = [f.split_by_row_group(pyarrow.dataset.field("round") == 1) for f in dataset.get_fragments()]
+    assert [len(groups) for groups in row_groups] == [1] * len(TEAMS)
+
+def test_handler_reads_next_rounds_from_the_partitioned_dataset(aws, tmp_path):
+    write_dataset(tmp_path / BUCKET / "dataset", long_frame(2024, rounds=3, teams=TEAMS), 2024)
+    filesystem = pyarrow.fs.SubTreeFileSystem(str(tmp_path), pyarrow.fs.LocalFileSystem())
+    lambda_function._CLIENTS[("s3:filesystem", EVENT["region_name"])] = filesystem
+    event = {k: v for k, v in EVENT.items() if k != "data_path"}
+    event["dataset_path"] = "dataset/"
+
+    results = [lambda_function.lambda_handler(event, None) for _ in range(3)]
+
+    assert "No new rounds" in results[2]["body"]
+    items = aws.scan()["Items"]
+    assert sorted({item["Round"] for item in items}) == ["1", "2"]
+    assert len(items) == 2 * 2 * 3
+
+def test_handler_emits_stage_metrics_when_enabled(aws, monkeypatch, capsys):
+    monkeypatch.setenv("METRICS_ENABLED", "1")
+
+    lambda_function.lambda_handler(dict(EVENT, run_all=True), None)
+
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    stages = {d["Stage"]: d for d in documents}
+    assert set(stages) == {"fetch", "transform", "model_load", "inference", "write"}
+    assert stages["write"]["Rows"] == 3 * 2 * 3
+    assert all(d["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "BrownlowPipeline" for d in documents)
+
+def test_handler_rescores_the_changed_rounds_of_a_scrape_event(aws):
+    lambda_function.lambda_handler(dict(EVENT, run_all=True), None)
+    aws.delete_item(Key=next({"HashKey": i["HashKey"], "Model": i["Model"]} for i in aws.scan()["Items"] if i["Round"] == "0"))
+    before = len(aws.scan()["Items"])
+
+    result = lambda_function.lambda_handler(dict(EVENT, model_paths=[MODEL_PATH, CHALLENGER_PATH], rounds=[0]), None)
+
+    assert result["statusCode"] == 200
+    items = aws.scan()["Items"]
+    assert {(item["Model"], item["Round"]) for item in items if item["Model"] == CHALLENGER_PATH} == {(CHALLENGER_PATH, "0")}
+    assert len(items) == before + 1 + 2 * 3
+    assert "None of the changed rounds [7]" in lambda_function.lambda_handler(dict(EVENT, rounds=[7]), None)["body"]
+
+def test_rescored_round_replaces_the_votes_of_players_no_longer_polling(aws, monkeypatch):
+    lambda_function.lambda_handler(dict(EVENT, run_all=True), None)
+    before = {item["HashKey"] for item in aws.scan()["Items"] if item["Round"] == "1"}
+    aws.put_item(Item={"HashKey": "stale", "Model": MODEL_PATH, "Year": "2024", "Round": "5", "Player": "Gone, Player", "Votes": "3"})
+
+    # A different model at the same path picks different players in round 1
+    boto3.client("s3").put_object(Bucket=BUCKET, Key=MODEL_PATH, Body=tiny_model(seed=3))
+    lambda_function.lambda_handler(dict(EVENT, rounds=[1, 5]), None)
+
+    items = aws.scan()["Items"]
+    round_one = [item for item in items if item["Round"] == "1"]
+    assert {item["HashKey"] for item in round_one} != before
+    assert len(round_one) == 2 * 3
+    assert sum(int(item["Votes"]) for item in round_one) == 2 * 6
+    assert "5" not in {item["Round"] for item in items}
+
+def test_writes_default_to_the_provisioned_write_capacity(aws):
+    assert lambda_function.write_capacity(aws, EVENT) == 5
+    assert lambda_function.write_capacity(aws, dict(EVENT, max_wcu=20)) == 20
+    missing = boto3.resource("dynamodb").Table("missing")
+    assert lambda_function.write_capacity(missing, EVENT) == lambda_function.DEFAULT_WCU
@@ -0,0 +1,31 @@
+import numpy as np
+import onnxruntime
+import pytest
+
+from benchmarks.bench_inference import predict_per_row
+from benchmarks.onnx_fixtures import synthetic_features, tiny_model
+import lambda_function
+
+X = synthetic_features(50)
+
+@pytest.mark.parametrize("batch_size", [None, 7, 64])
+def test_batched_inference_matches_per_row(batch_size):
+    session = onnxruntime.InferenceSession(tiny_model())
+
+    predictions = lambda_function.predict(session, X, batch_size=batch_size)
+
+    assert predictions.shape == (50,)
+    np.testing.assert_allclose(predictions, predict_per_row(session, X), rtol=1e-5)
+
+def test_fixed_batch_model_is_fed_padded_chunks():
+    session = onnxruntime.InferenceSession(tiny_model(batch_size=16))
+    reference = onnxruntime.InferenceSession(tiny_model())
+
+    predictions = lambda_function.predict(session, X)
+
+    np.testing.assert_allclose(predictions, lambda_function.predict(reference, X), rtol=1e-5)
+
+def test_empty_matrix():
+    session = onnxruntime.InferenceSession(tiny_model())
+
+    assert lambda_function.predict(session, X[:0]).shape == (0,)
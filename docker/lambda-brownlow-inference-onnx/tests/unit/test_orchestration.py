@@ -0,0 +1,94 @@
+import json
+
+import boto3
+
+import lambda_function
+import orchestration
+from tests.unit.test_handler import CHALLENGER_PATH, EVENT, MODEL_PATH, aws  # noqa: F401
+
+def test_plan_splits_the_remaining_rounds_by_model(aws):
+    lambda_function.lambda_handler(EVENT, None)
+
+    planned = orchestration.plan(dict(EVENT, model_paths=[MODEL_PATH, CHALLENGER_PATH]))
+
+    assert [(task["round"], task["model_paths"]) for task in planned["tasks"]] == [
+        (1, [CHALLENGER_PATH]),
+        (2, [MODEL_PATH, CHALLENGER_PATH]),
+    ]
+    assert "model_path" not in planned["event"]
+    assert all(task["year_to_query"] == 2024 for task in planned["tasks"])
+
+def test_run_local_matches_the_single_handler(aws):
+    summary = orchestration.run_local(dict(EVENT, run_all=True), max_workers=3)
+
+    fanned_out = {(item["HashKey"], item["Model"]): item for item in aws.scan()["Items"]}
+    for key in fanned_out:
+        aws.delete_item(Key={"HashKey": key[0], "Model": key[1]})
+    lambda_function.lambda_handler(dict(EVENT, run_all=True), None)
+    single = {(item["HashKey"], item["Model"]): item for item in aws.scan()["Items"]}
+
+    assert fanned_out == single
+    assert summary == {"rounds": 3, "items": len(single), "max_rounds": {MODEL_PATH: 2}}
+
+def test_run_local_tasks_report_their_own_metrics(aws, monkeypatch, capsys):
+    monkeypatch.setenv("METRICS_ENABLED", "1")
+
+    # Capacity for three full batches a second, so all three rounds run at once
+    summary = orchestration.run_local(dict(EVENT, run_all=True, max_wcu=75), max_workers=3)
+
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    writes = [d for d in documents if d["Stage"] == "write"]
+    assert [d["Calls"] for d in writes] == [1, 1, 1]
+    assert sorted(d["Rows"] for d in writes) == [summary["items"] // 3] * 3
+
+def test_retried_rounds_rewrite_identical_votes(aws):
+    planned = orchestration.plan(dict(EVENT, run_all=True))
+    first = [orchestration.infer_round(task) for task in planned["tasks"]]
+    before = aws.scan()["Items"]
+
+    retried = orchestration.infer_round(planned["tasks"][1])
+
+    assert retried == first[1]
+    assert sorted(aws.scan()["Items"], key=str) == sorted(before, key=str)
+
+def test_aggregate_records_progress_and_bumps_the_leaderboard_once(aws):
+    planned = orchestration.plan(dict(EVENT, model_paths=[MODEL_PATH, CHALLENGER_PATH]))
+    results = [orchestration.infer_round(task) for task in planned["tasks"]]
+
+    orchestration.aggregate(dict(planned, results=results))
+
+    dynamodb = boto3.resource("dynamodb")
+    progress = dynamodb.Table(lambda_function.PROGRESS_TABLE_NAME).scan()["Items"]
+    assert {item["Model"]: item["MaxRound"] for item in progress} == {MODEL_PATH: 2, CHALLENGER_PATH: 2}
+    version = dynamodb.Table(lambda_function.LEADERBOARD_TABLE_NAME).get_item(Key=lambda_function.LEADERBOARD_VERSION_KEY)["Item"]
+    assert version["Version"] == 1
+    assert orchestration.plan(dict(EVENT, model_paths=[MODEL_PATH, CHALLENGER_PATH]))["tasks"] == []
+
+def test_plan_fans_out_only_the_changed_rounds(aws):
+    aws.put_item(Item={"HashKey": "stale", "Model": MODEL_PATH, "Year": "2024", "Round": "7", "Player": "Gone, Player", "Votes": "3"})
+
+    planned = orchestration.plan(dict(EVENT, rounds=[0, 2, 7]))
+    results = [orchestration.infer_round(task) for task in planned["tasks"]]
+
+    assert [(task["round"], task["model_paths"]) for task in planned["tasks"]] == [(0, [MODEL_PATH]), (2, [MODEL_PATH]), (7, [MODEL_PATH])]
+    assert "rounds" not in planned["event"]
+    # Round 7 is not in the data, so its task only removes the stored votes
+    assert results[2]["items"] == 0
+    assert sorted({item["Round"] for item in aws.scan()["Items"]}) == ["0", "2"]
+    # and does not count as scored progress
+    assert orchestration.aggregate(dict(planned, results=results))["max_rounds"] == {MODEL_PATH: 2}
+
+def test_plan_splits_the_write_capacity_between_concurrent_rounds(aws):
+    planned = orchestration.plan(dict(EVENT, run_all=True, max_wcu=100, max_concurrency=2))
+
+    assert planned["max_concurrency"] == 2
+    assert [task["max_wcu"] for task in planned["tasks"]] == [50] * 3
+
+def test_plan_runs_fewer_rounds_at_once_than_a_full_batch_each_allows(aws):
+    planned = orchestration.plan(dict(EVENT, run_all=True))
+    assert planned["max_concurrency"] == 1
+    assert [task["max_wcu"] for task in planned["tasks"]] == [5] * 3
+
+    planned = orchestration.plan(dict(EVENT, run_all=True, max_wcu=60))
+    assert planned["max_concurrency"] == 2
+    assert [task["max_wcu"] for task in planned["tasks"]] == [30] * 3
@@ -0,0 +1,80 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+import lambda_function
+
+MODEL_PATH = "models/model.onnx"
+
+@pytest.fixture
+def tables(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        votes = dynamodb.create_table(
+            TableName="afl-brownlow-vote-predictions",
+            KeySchema=[{"AttributeName": "HashKey", "KeyType": "HASH"}, {"AttributeName": "Model", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "HashKey", "AttributeType": "S"}, {"AttributeName": "Model", "AttributeType": "S"}],
+            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        )
+        progress = dynamodb.create_table(
+            TableName=lambda_function.PROGRESS_TABLE_NAME,
+            KeySchema=[{"AttributeName": "Year", "KeyType": "HASH"}, {"AttributeName": "Model", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "Year", "AttributeType": "N"}, {"AttributeName": "Model", "AttributeType": "S"}],
+            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        )
+        yield votes, progress
+
+def put_votes(votes, year, rounds, model_path=MODEL_PATH):
+    with votes.batch_writer() as batch:
+        for round_number in rounds:
+            for player in range(3):
+                batch.put_item(Item={
+                    "HashKey": f"{year}-{round_number}-{player}",
+                    "Model": model_path,
+                    "YearRound": f"{year}_{round_number}",
+                })
+
+def test_progress_record_is_read_without_scanning(tables, monkeypatch):
+    votes, progress = tables
+    lambda_function.record_progress(progress, 2024, MODEL_PATH, 7)
+    monkeypatch.setattr(votes, "scan", lambda **kwargs: pytest.fail("scanned the votes table"))
+
+    assert lambda_function.get_max_round_inferenced(progress, votes, 2024, MODEL_PATH) == 7
+
+def test_progress_only_moves_forward(tables):
+    _, progress = tables
+    lambda_function.record_progress(progress, 2024, MODEL_PATH, 12)
+    lambda_function.record_progress(progress, 2024, MODEL_PATH, 3)
+
+    assert progress.get_item(Key={"Year": 2024, "Model": MODEL_PATH})["Item"]["MaxRound"] == 12
+
+def test_missing_record_falls_back_to_a_paginated_scan_and_seeds_it(tables):
+    votes, progress = tables
+    put_votes(votes, 2024, range(0, 12))
+    put_votes(votes, 2023, range(0, 24))
+    put_votes(votes, 2024, range(0, 20), model_path="models/other.onnx")
+
+    assert lambda_function.scan_max_round(votes, 2024, MODEL_PATH, page_size=5) == 11
+    assert lambda_function.get_max_round_inferenced(progress, votes, 2024, MODEL_PATH) == 11
+    assert progress.get_item(Key={"Year": 2024, "Model": MODEL_PATH})["Item"]["MaxRound"] == 11
+
+def test_empty_year_starts_from_round_zero(tables):
+    votes, progress = tables
+
+    assert lambda_function.get_max_round_inferenced(progress, votes, 2025, MODEL_PATH) == 0
+    assert "Item" not in progress.get_item(Key={"Year": 2025, "Model": MODEL_PATH})
+
+def test_leaderboard_version_is_bumped(tables):
+    dynamodb = boto3.resource("dynamodb")
+    leaderboard = dynamodb.create_table(
+        TableName=lambda_function.LEADERBOARD_TABLE_NAME,
+        KeySchema=[{"AttributeName": "Board", "KeyType": "HASH"}, {"AttributeName": "Player", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "Board", "AttributeType": "S"}, {"AttributeName": "Player", "AttributeType": "S"}],
+        ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+    )
+
+    lambda_function.bump_leaderboard_version(leaderboard)
+    lambda_function.bump_leaderboard_version(leaderboard)
+
+    assert leaderboard.get_item(Key=lambda_function.LEADERBOARD_VERSION_KEY)["Item"]["Version"] == 2
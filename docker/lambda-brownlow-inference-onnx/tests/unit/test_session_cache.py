@@ -0,0 +1,53 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from benchmarks.onnx_fixtures import tiny_model
+import lambda_function
+
+BUCKET = "brownlow-models"
+MODEL_PATH = "models/model.onnx"
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+    monkeypatch.setattr(lambda_function, "_SESSIONS", {})
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"})
+        client.put_object(Bucket=BUCKET, Key=MODEL_PATH, Body=tiny_model(seed=1))
+        downloads = []
+        get_object = client.get_object
+
+        def counting_get_object(**kwargs):
+            downloads.append(kwargs["Key"])
+            return get_object(**kwargs)
+
+        monkeypatch.setattr(client, "get_object", counting_get_object)
+        yield client, downloads
+
+def test_warm_invocation_reuses_session(s3):
+    client, downloads = s3
+
+    first = lambda_function.get_onnx_session(client, BUCKET, MODEL_PATH)
+    second = lambda_function.get_onnx_session(client, BUCKET, MODEL_PATH)
+
+    assert second is first
+    assert downloads == [MODEL_PATH]
+
+def test_changed_model_is_reloaded(s3):
+    client, downloads = s3
+    first = lambda_function.get_onnx_session(client, BUCKET, MODEL_PATH)
+
+    client.put_object(Bucket=BUCKET, Key=MODEL_PATH, Body=tiny_model(seed=2))
+    second = lambda_function.get_onnx_session(client, BUCKET, MODEL_PATH)
+
+    assert second is not first
+    assert downloads == [MODEL_PATH, MODEL_PATH]
+
+def test_clients_are_created_once(monkeypatch):
+    monkeypatch.setattr(lambda_function, "_CLIENTS", {})
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+
+    assert lambda_function.get_client("s3") is lambda_function.get_client("s3")
+    assert lambda_function.get_resource("dynamodb", "ap-southeast-2") is not lambda_function.get_client("dynamodb", "ap-southeast-2")
@@ -0,0 +1,57 @@
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import simulation
+
+def game(game_id, weights, prefix=""):
+    return pd.DataFrame({
+        "game_id": game_id,
+        "player": [f"{prefix}{i}" for i in range(len(weights))],
+        "game_weight": weights,
+    })
+
+def exact_expected_votes(weights, votes=(3, 2, 1)):
+    """Expected votes of each player when votes go to draws without replacement."""
+    weights = np.exp(weights)
+    expected = np.zeros(len(weights))
+    for order in permutations(range(len(weights)), len(votes)):
+        p, left = 1.0, weights.sum()
+        for i in order:
+            p *= weights[i] / left
+            left -= weights[i]
+        for v, i in zip(votes, order):
+            expected[i] += p * v
+    return expected
+
+def test_draws_votes_in_proportion_to_the_softmax_of_weights():
+    weights = [2.0, 1.0, 0.0, -1.0, 0.5]
+
+    results = simulation.simulate_season(game("g", weights), 100000, seed=0).set_index("player")
+
+    expected = exact_expected_votes(np.array(weights))
+    np.testing.assert_allclose(results.loc[[str(i) for i in range(5)], "expected_votes"], expected, atol=0.02)
+
+def test_totals_ranks_and_wins_over_a_season():
+    df = pd.concat([game("a", [3.0, 0.0, 0.0], "x"), game("b", [0.0, 0.0], "y"), game("c", [1.0, 1.0, 1.0, 1.0], "x")])
+
+    results = simulation.simulate_season(df, 5000, seed=1, ranks=3)
+
+    # Game b has two players, so its 1 vote goes unawarded
+    assert results["expected_votes"].sum() == pytest.approx(6 + 5 + 6)
+    assert results["win_probability"].sum() >= 1
+    assert results["player"].iloc[0] == "x0"
+    ranks = np.stack(results["rank_probabilities"])
+    assert ranks.shape == (len(results), 3)
+    assert ranks[:, 0].sum() == pytest.approx(results["win_probability"].sum())
+
+def test_results_do_not_depend_on_the_number_of_workers():
+    rng = np.random.default_rng(0)
+    df = pd.concat([game(f"g{i}", rng.normal(size=8), f"p{i % 3}-") for i in range(20)])
+
+    one = simulation.simulate_season(df, 3000, workers=1, seed=7, chunk_size=500)
+    four = simulation.simulate_season(df, 3000, workers=4, seed=7, chunk_size=500)
+
+    pd.testing.assert_frame_equal(one, four)
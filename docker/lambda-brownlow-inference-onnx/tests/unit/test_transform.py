@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_transform import legacy_transform
+from benchmarks.season_fixtures import long_frame
+import lambda_function
+
+ROWS = [
+    # player, team, round, opponents, stat, value
+    ("Smith, Jack", "adelaide", 0, "GE", "kicks", "12"),
+    ("Smith, Jack", "adelaide", 0, "GE", "goals", "NA"),
+    ("Smith, Jack", "adelaide", 0, "GE", "subs", "Off"),
+    ("Smith, Jack", "adelaide", 1, "CA", "kicks", "NA"),
+    ("Smith, Jack", "adelaide", 1, "CA", "goals", "NA"),
+    ("Smith, Jack", "adelaide", 1, "CA", "subs", "NA"),
+    ("Ward, Tom", "geelong", 0, "AD", "kicks", "7"),
+    ("Ward, Tom", "geelong", 0, "AD", "goals", "3"),
+    ("Ward, Tom", "geelong", 0, "AD", "subs", "NA"),
+]
+
+def legacy_frame(rows=ROWS):
+    df = pd.DataFrame(rows, columns=["player", "team", "round", "opponents", "stat", "value"])
+    return df.reset_index()
+
+def typed_frame(rows=ROWS):
+    df = pd.DataFrame([row for row in rows if row[4] != "subs"], columns=["player", "team", "round", "opponents", "stat", "value"])
+    return pd.DataFrame({
+        "player": pd.Categorical(df["player"]),
+        "team": pd.Categorical(df["team"]),
+        "round": df["round"].astype(np.int16),
+        "opponents": pd.Categorical(df["opponents"]),
+        "stat": pd.Categorical(df["stat"]),
+        "value": pd.to_numeric(df["value"], errors="coerce").astype(np.float32),
+        "sub": pd.Categorical(["Off", "Off", None, None, None, None], categories=["Off", "On"]),
+    })
+
+def test_transform_reads_legacy_and_typed_files_alike():
+    legacy = lambda_function.transform_gamebygame(legacy_frame(), 2023)
+    typed = lambda_function.transform_gamebygame(typed_frame(), 2023)
+
+    assert list(legacy.columns) == list(typed.columns)
+    assert "subs" not in typed.columns
+    for column in ["player", "team", "opponents", "game_id", "year_round"]:
+        assert typed[column].astype(str).tolist() == legacy[column].tolist()
+    for column in ["kicks", "goals"]:
+        assert typed[column].dtype == np.float32
+        assert typed[column].tolist() == legacy[column].tolist()
+    assert legacy["game_id"].tolist() == ["adelaide_geelong_0", "adelaide_carlton_1", "adelaide_geelong_0"]
+    assert legacy["goals"].tolist() == [0.0, 0.0, 3.0]
+
+def test_missing_values_read_alike_from_legacy_and_typed_files():
+    # Ward's kicks are an empty cell rather than "NA"
+    rows = [row[:5] + (None,) if row[5] == "7" else row for row in ROWS]
+
+    legacy = lambda_function.transform_gamebygame(legacy_frame(rows), 2023)
+    typed = lambda_function.transform_gamebygame(typed_frame(rows), 2023)
+
+    assert typed["kicks"].tolist() == legacy["kicks"].tolist() == [12.0, 0.0, 0.0]
+    np.testing.assert_array_equal(
+        lambda_function.build_features(legacy_frame(rows), 2023)[1],
+        lambda_function.build_features(typed_frame(rows), 2023)[1],
+    )
+
+@pytest.mark.parametrize("typed", [True, False])
+def test_vectorised_keys_match_row_wise_apply(typed):
+    frame = long_frame(2023, rounds=3, players_per_team=4, typed=typed)
+
+    expected = legacy_transform(frame, 2023)
+    actual = lambda_function.transform_gamebygame(frame, 2023)
+
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual["game_id"].str.count("_").eq(2).all()
+
+@pytest.mark.parametrize("typed", [True, False])
+def test_build_features_matches_the_pivot(typed):
+    frame = long_frame(2023, rounds=3, players_per_team=4, typed=typed)
+
+    expected = lambda_function.transform_gamebygame(frame, 2023)
+    games, X = lambda_function.build_features(frame, 2023)
+
+    assert X.dtype == np.float32 and X.flags["C_CONTIGUOUS"]
+    assert X.shape == (len(expected), len(lambda_function.FEATURE_COLUMNS))
+    np.testing.assert_array_equal(X, lambda_function.feature_matrix(expected))
+    pd.testing.assert_frame_equal(games, expected[games.columns.tolist()].rename_axis(columns=None))
+
+def test_build_features_orders_columns_for_the_model():
+    frame = long_frame(2023, rounds=2, players_per_team=3, stats=["tackles", "kicks", "brownlow_votes"])
+
+    games, X = lambda_function.build_features(frame, 2023)
+
+    kicks = lambda_function.FEATURE_COLUMNS.index("kicks")
+    tackles = lambda_function.FEATURE_COLUMNS.index("tackles")
+    pivoted = lambda_function.transform_gamebygame(frame, 2023)
+    np.testing.assert_array_equal(X[:, kicks], pivoted["kicks"].to_numpy())
+    np.testing.assert_array_equal(X[:, tackles], pivoted["tackles"].to_numpy())
+    # Stats the model does not take are left out and the ones not scraped are zero
+    assert np.count_nonzero(np.delete(X, [kicks, tackles], axis=1)) == 0
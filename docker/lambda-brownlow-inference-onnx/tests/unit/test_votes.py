@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_votes import legacy_assign_votes, weighted_games
+import lambda_function
+
+def test_assign_votes_matches_nlargest_loop():
+    df = weighted_games(30, players_per_game=10)
+
+    pd.testing.assert_frame_equal(lambda_function.assign_votes(df), legacy_assign_votes(df))
+
+def test_ties_go_to_the_first_player():
+    df = pd.DataFrame({
+        "player": ["a", "b", "c", "d"],
+        "game_id": ["g"] * 4,
+        "game_weight": np.array([1.0, 2.0, 1.0, 1.0], dtype=np.float32),
+    })
+
+    votes = lambda_function.assign_votes(df)
+
+    assert votes[["player", "votes"]].values.tolist() == [["b", 3], ["a", 2], ["c", 1]]
+
+def test_short_games_get_the_top_votes_only():
+    df = pd.DataFrame({
+        "player": ["a", "b", "c"],
+        "game_id": ["g1", "g1", "g2"],
+        "game_weight": [0.5, 0.9, 0.1],
+    })
+
+    votes = lambda_function.assign_votes(df)
+
+    assert votes[["player", "votes"]].values.tolist() == [["b", 3], ["a", 2], ["c", 3]]
@@ -0,0 +1,162 @@
+"""Times each stage of the scrape and inference hot path on synthetic seasons.
+
+Stages are timed separately (HTML parsing, the scraper's DataFrame assembly,
+transform_gamebygame, build_features, ONNX inference, vote ranking and item
+serialisation) and
+written as JSON, so results from two commits can be compared:
+
+    python bench_suite.py --seasons 3 --output before.json
+    python bench_suite.py --seasons 3 --output after.json --compare before.json
+
+With --compare, any stage more than --threshold slower than the baseline is
+reported and the exit code is 1.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import onnxruntime
+import pandas as pd
+
+from run_pipeline import INFERENCE_DIR, MODEL_PATH, ROOT, SCRAPE_DIR, load_lambda_modules
+
+STAGES = ["parse_html", "assemble", "transform", "features", "inference", "vote_ranking", "item_serialisation"]
+
+def time_stage(run: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return {"min_seconds": min(timings), "median_seconds": statistics.median(timings)}
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(
+    seasons: int = 1,
+    teams: int = 18,
+    rounds: int = 23,
+    players_per_team: int = 22,
+    stats: Optional[int] = None,
+    repeat: int = 3,
+    parser: str = "lxml",
+) -> dict:
+    """Generates `seasons` synthetic seasons and times every stage over all of them."""
+    scrape = load_lambda_modules(SCRAPE_DIR, "lambda_function", "benchmarks.gbg_fixtures")
+    inference = load_lambda_modules(INFERENCE_DIR, "lambda_function", "benchmarks.onnx_fixtures", "benchmarks.season_fixtures")
+    scraper, gbg_fixtures = scrape["lambda_function"], scrape["benchmarks.gbg_fixtures"]
+    lambda_function = inference["lambda_function"]
+    season_fixtures = inference["benchmarks.season_fixtures"]
+
+    team_names = list(lambda_function.TeamKeys)[:teams]
+    stat_names = season_fixtures.STATS[:stats] if stats else season_fixtures.STATS
+    years = list(range(2024 - seasons, 2024))
+
+    pages = {
+        year: gbg_fixtures.season_fixture(year, teams=team_names, rounds=rounds, players_per_team=players_per_team)
+        for year in years
+    }
+    parse = scraper.PARSERS[parser]
+    parsed = {year: {team: parse(content) for team, content in season.items()} for year, season in pages.items()}
+    assembled_rows = sum(len(scraper.assemble_team_pages(p)) for p in parsed.values())
+    frames = {
+        year: season_fixtures.long_frame(year, rounds=rounds, players_per_team=players_per_team, teams=team_names, stats=stat_names)
+        for year in years
+    }
+    # Stats left out of the fixtures are zero, so the model sees the production feature width
+    features = [lambda_function.build_features(frame, year) for year, frame in frames.items()]
+    df = pd.concat([games for games, _ in features], ignore_index=True)
+    X = np.concatenate([X for _, X in features])
+    session = onnxruntime.InferenceSession(
+        inference["benchmarks.onnx_fixtures"].tiny_model(n_features=X.shape[1]), lambda_function.session_options(),
+    )
+    weighted = df.assign(game_weight=lambda_function.predict(session, X), model=MODEL_PATH)
+    votes_df = lambda_function.assign_votes(weighted)
+
+    runs = {
+        "parse_html": (lambda: [parse(c) for season in pages.values() for c in season.values()], sum(map(len, pages.values()))),
+        "assemble": (lambda: [scraper.assemble_team_pages(p) for p in parsed.values()], assembled_rows),
+        "transform": (lambda: [lambda_function.transform_gamebygame(f, y) for y, f in frames.items()], sum(map(len, frames.values()))),
+        "features": (lambda: [lambda_function.build_features(f, y) for y, f in frames.items()], sum(map(len, frames.values()))),
+        "inference": (lambda: lambda_function.predict(session, X), len(X)),
+        "vote_ranking": (lambda: lambda_function.assign_votes(weighted), len(weighted)),
+        "item_serialisation": (lambda: lambda_function.build_vote_items(votes_df, "HashKey", MODEL_PATH), len(votes_df)),
+    }
+    results = {}
+    for stage in STAGES:
+        run, items = runs[stage]
+        results[stage] = {**time_stage(run, repeat), "items": items}
+        results[stage]["items_per_second"] = items / results[stage]["min_seconds"] if results[stage]["min_seconds"] else None
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "onnxruntime": onnxruntime.__version__,
+            "params": {
+                "seasons": seasons, "teams": teams, "rounds": rounds, "players_per_team": players_per_team,
+                "stats": len(stat_names), "repeat": repeat, "parser": parser,
+            },
+        },
+        "stages": results,
+    }
+
+def compare(result: dict, baseline: dict, threshold: float) -> Dict[str, dict]:
+    """Returns the stages whose best time is more than `threshold` slower than the baseline's."""
+    regressions = {}
+    for stage, timing in result["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before or not before["min_seconds"]:
+            continue
+        ratio = timing["min_seconds"] / before["min_seconds"]
+        if ratio > 1 + threshold:
+            regressions[stage] = {"baseline_seconds": before["min_seconds"], "seconds": timing["min_seconds"], "ratio": ratio}
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, default=1)
+    parser.add_argument("--teams", type=int, default=18)
+    parser.add_argument("--rounds", type=int, default=23)
+    parser.add_argument("--players-per-team", type=int, default=22)
+    parser.add_argument("--stats", type=int, help="Number of stats per player-game (default: all model inputs)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--parser", default="lxml")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown reported as a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    result = run_suite(
+        seasons=args.seasons, teams=args.teams, rounds=args.rounds, players_per_team=args.players_per_team,
+        stats=args.stats, repeat=args.repeat, parser=args.parser,
+    )
+    if args.compare:
+        with open(args.compare) as f:
+            result["regressions"] = compare(result, json.load(f), args.threshold)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if result.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Runs the scrape and inference stages end to end on this machine, with no AWS or network.
+
+Team pages come from a recorded fixture directory laid out like AFL Tables
+(``{team}/{year}_gbg.html``) or are generated on the fly, the season file is
+written to a local directory, and votes go to an in-memory or SQLite store:
+
+    python run_pipeline.py --year 2023 --synthetic
+    python run_pipeline.py --year 2023 --fixtures ./pages --model ./model.onnx --store sqlite:votes.db
+
+Each stage is timed and the timings are printed at the end.
+"""
+import argparse
+import importlib
+import json
+import logging
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+import onnxruntime
+
+from vote_stores import open_vote_store
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRAPE_DIR = ROOT / "docker" / "lambda-afl-gamebygame-scrape"
+INFERENCE_DIR = ROOT / "docker" / "lambda-brownlow-inference-onnx"
+COMMON_DIR = ROOT / "docker" / "common"
+DATA_PATH = "data/player-gamebygame/AFL-Tables_game-by-game-stats_"
+MODEL_PATH = "models/local.onnx"
+
+def load_lambda_modules(folder: Path, *names: str) -> dict:
+    """Imports modules from a Lambda folder as if it were the task root.
+
+    Both Lambdas have a `lambda_function` module and a `benchmarks` package, so the
+    folder's modules are dropped from `sys.modules` again once imported. The shared
+    modules of `docker/common` are importable too, as they are in the images.
+    """
+    sys.path[:0] = [str(folder), str(COMMON_DIR)]
+    try:
+        return {name: importlib.import_module(name) for name in names}
+    finally:
+        sys.path.remove(str(folder))
+        sys.path.remove(str(COMMON_DIR))
+        for name, module in list(sys.modules.items()):
+            if str(getattr(module, "__file__", None) or "").startswith(str(folder)):
+                del sys.modules[name]
+
+class FixtureResponse:
+    def __init__(self, status_code: int, content: bytes = b""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+class FixtureSession:
+    """Serves team pages from memory in place of `requests.Session`; unknown pages are 404s."""
+
+    def __init__(self, pages: Dict[str, bytes]):
+        self.pages = pages
+
+    def get(self, url, timeout=None, headers=None):
+        team = url.rstrip("/").split("/")[-2]
+        content = self.pages.get(team)
+        return FixtureResponse(200, content) if content is not None else FixtureResponse(404)
+
+    def close(self):
+        pass
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+def run_pipeline(
+    year: int,
+    pages: Dict[str, bytes],
+    data_dir: Path,
+    model_bytes: Optional[bytes] = None,
+    store: str = "memory",
+    model_path: str = MODEL_PATH,
+) -> dict:
+    """Scrapes `pages` to a season file under `data_dir`, scores it and stores the votes.
+
+    Without `model_bytes` a small random model with the production input shape is used.
+    Returns the stage timings, row counts and the season leaderboard.
+    """
+    scrape = load_lambda_modules(SCRAPE_DIR, "lambda_function", "storage")
+    inference = load_lambda_modules(INFERENCE_DIR, "lambda_function")["lambda_function"]
+    if model_bytes is None:
+        model_bytes = load_lambda_modules(INFERENCE_DIR, "benchmarks.onnx_fixtures")["benchmarks.onnx_fixtures"].tiny_model()
+
+    timer = StageTimer()
+    storage = scrape["storage"].LocalStorage(data_dir)
+    key = f"{DATA_PATH}{year}.parquet"
+    vote_store = open_vote_store(store)
+    try:
+        with timer.stage("scrape"):
+            scraped = scrape["lambda_function"].scrape_season(year, storage, key, session=FixtureSession(pages))
+        with timer.stage("read_transform"):
+            df, X = inference.read_season_features(storage.get(key), year)
+        with timer.stage("load_model"):
+            onnx_session = onnxruntime.InferenceSession(model_bytes, inference.session_options())
+        with timer.stage("score_votes"):
+            votes_df = inference.score_votes(df, onnx_session, model_path, X=X)
+        with timer.stage("build_items"):
+            items = inference.build_vote_items(votes_df, "HashKey", model_path)
+        with timer.stage("store_votes"):
+            stored = vote_store.put_items(items)
+        leaderboard = vote_store.leaderboard(year, model_path)
+    finally:
+        vote_store.close()
+
+    return {
+        "year": year,
+        "season_file": storage.uri(key),
+        "scraped_rows": scraped["rows"],
+        "player_games": len(df),
+        "votes": stored,
+        "timings": timer.timings,
+        "leaderboard": leaderboard[:10],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--year", type=int, default=2023)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--fixtures", type=Path, help="Recorded pages laid out as {team}/{year}_gbg.html")
+    source.add_argument("--synthetic", action="store_true", help="Generate a synthetic season instead")
+    parser.add_argument("--data-dir", type=Path, help="Where to write the season file (default: a temporary directory)")
+    parser.add_argument("--model", type=Path, help="ONNX model to score with (default: a small random model)")
+    parser.add_argument("--store", default="memory", help="memory, sqlite or sqlite:<path>")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    fixtures = load_lambda_modules(SCRAPE_DIR, "benchmarks.gbg_fixtures")["benchmarks.gbg_fixtures"]
+    pages = fixtures.season_fixture(args.year) if args.synthetic else fixtures.load_season_fixture(args.fixtures, args.year)
+    if not pages:
+        parser.error(f"No {args.year} pages found under {args.fixtures}")
+    model_bytes = args.model.read_bytes() if args.model else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run_pipeline(args.year, pages, args.data_dir or Path(tmp), model_bytes=model_bytes, store=args.store)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.year}: {len(pages)} team pages, {result['scraped_rows']} scraped rows, "
+          f"{result['player_games']} player-games, {result['votes']} votes")
+    for stage, seconds in result["timings"].items():
+        print(f"  {stage:15} {seconds * 1000:9.1f} ms")
+    print(f"  {'total':15} {sum(result['timings'].values()) * 1000:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
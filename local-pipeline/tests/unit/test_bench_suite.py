@@ -0,0 +1,19 @@
+import json
+
+import bench_suite
+
+def test_suite_times_every_stage(tmp_path):
+    output = tmp_path / "results.json"
+
+    bench_suite.main(["--seasons", "1", "--teams", "4", "--rounds", "2", "--players-per-team", "22", "--repeat", "1", "--output", str(output)])
+
+    result = json.loads(output.read_text())
+    assert list(result["stages"]) == bench_suite.STAGES
+    assert all(stage["items"] > 0 and stage["min_seconds"] > 0 for stage in result["stages"].values())
+    assert result["meta"]["params"]["teams"] == 4
+
+def test_compare_reports_slower_stages():
+    baseline = {"stages": {"transform": {"min_seconds": 1.0}, "inference": {"min_seconds": 1.0}}}
+    result = {"stages": {"transform": {"min_seconds": 1.5}, "inference": {"min_seconds": 1.1}, "assemble": {"min_seconds": 9.0}}}
+
+    assert list(bench_suite.compare(result, baseline, threshold=0.2)) == ["transform"]
@@ -0,0 +1,40 @@
+import pytest
+
+import run_pipeline
+from vote_stores import MemoryVoteStore, SQLiteVoteStore
+
+TEAMS = ["adelaide", "carlton", "geelong", "melbourne"]
+
+@pytest.fixture(scope="module")
+def pages():
+    fixtures = run_pipeline.load_lambda_modules(run_pipeline.SCRAPE_DIR, "benchmarks.gbg_fixtures")["benchmarks.gbg_fixtures"]
+    return fixtures.season_fixture(2023, teams=TEAMS, rounds=3, players_per_team=24)
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+def test_pipeline_runs_offline(tmp_path, pages, store):
+    result = run_pipeline.run_pipeline(2023, pages, tmp_path, store=store)
+
+    # Four teams play two games a round, and each game hands out three votes
+    assert result["votes"] == 3 * 3 * 2
+    totals = [votes for _, votes in result["leaderboard"]]
+    assert totals and totals == sorted(totals, reverse=True)
+    assert set(result["timings"]) == {"scrape", "read_transform", "load_model", "score_votes", "build_items", "store_votes"}
+    assert (tmp_path / (run_pipeline.DATA_PATH + "2023.parquet")).exists()
+
+def test_stores_agree(tmp_path, pages):
+    memory = run_pipeline.run_pipeline(2023, pages, tmp_path / "a", store="memory")
+    sqlite = run_pipeline.run_pipeline(2023, pages, tmp_path / "b", store=f"sqlite:{tmp_path / 'votes.db'}")
+
+    assert memory["leaderboard"] == sqlite["leaderboard"]
+
+@pytest.mark.parametrize("store_class", [MemoryVoteStore, SQLiteVoteStore])
+def test_vote_store_overwrites_by_key(store_class):
+    store = store_class()
+    store.put_items([
+        {"HashKey": "a", "Model": "m", "Year": "2023", "Round": "2", "Player": "Cripps, Patrick", "Votes": "1"},
+        {"HashKey": "b", "Model": "m", "Year": "2023", "Round": "10", "Player": "Oliver, Clayton", "Votes": "2"},
+        {"HashKey": "a", "Model": "m", "Year": "2023", "Round": "2", "Player": "Cripps, Patrick", "Votes": "3"},
+    ])
+
+    assert store.leaderboard(2023, "m") == [("Cripps, Patrick", 3), ("Oliver, Clayton", 2)]
+    assert store.leaderboard(2024) == []
@@ -0,0 +1,69 @@
+"""Vote stores standing in for the DynamoDB predictions table when running offline."""
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+KEY_ATTRIBUTES = ("HashKey", "Model")
+COLUMNS = ["HashKey", "Model", "YearRound", "Year", "Round", "Player", "Team", "Votes", "Opponent", "GameID"]
+
+def _ranked(totals: Dict[str, int]) -> List[Tuple[str, int]]:
+    return sorted(totals.items(), key=lambda x: (-x[1], x[0]))
+
+class MemoryVoteStore:
+    """Keeps vote items in a dict keyed like the predictions table."""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_items(self, items: Iterable[dict]) -> int:
+        n = 0
+        for item in items:
+            self.items[tuple(item[k] for k in KEY_ATTRIBUTES)] = dict(item)
+            n += 1
+        return n
+
+    def leaderboard(self, year: Optional[int] = None, model: Optional[str] = None) -> List[Tuple[str, int]]:
+        totals = defaultdict(int)
+        for item in self.items.values():
+            if (year is None or item["Year"] == str(year)) and (model is None or item["Model"] == model):
+                totals[item["Player"]] += int(item["Votes"])
+        return _ranked(totals)
+
+    def close(self):
+        pass
+
+class SQLiteVoteStore:
+    """Keeps vote items in a SQLite table, on disk or in memory (":memory:")."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.connection = sqlite3.connect(path)
+        columns = ", ".join(f'"{c}" TEXT' for c in COLUMNS)
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS votes ({columns}, PRIMARY KEY ("HashKey", "Model"))')
+
+    def put_items(self, items: Iterable[dict]) -> int:
+        rows = [tuple(item.get(c) for c in COLUMNS) for item in items]
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self.connection:
+            self.connection.executemany(f"INSERT OR REPLACE INTO votes VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def leaderboard(self, year: Optional[int] = None, model: Optional[str] = None) -> List[Tuple[str, int]]:
+        rows = self.connection.execute(
+            'SELECT "Player", SUM(CAST("Votes" AS INTEGER)) FROM votes'
+            ' WHERE (? IS NULL OR "Year" = ?) AND (? IS NULL OR "Model" = ?) GROUP BY "Player"',
+            (year, None if year is None else str(year), model, model),
+        ).fetchall()
+        return _ranked(dict(rows))
+
+    def close(self):
+        self.connection.close()
+
+def open_vote_store(target: str):
+    """Returns the store for `memory`, `sqlite` (in memory) or `sqlite:<path>`."""
+    if target == "memory":
+        return MemoryVoteStore()
+    if target == "sqlite":
+        return SQLiteVoteStore()
+    if target.startswith("sqlite:"):
+        return SQLiteVoteStore(target[len("sqlite:"):])
+    raise ValueError(f"Unknown vote store {target!r}; use memory, sqlite or sqlite:<path>")
@@ -10,6 +10,8 @@ from aws_cdk import (
     aws_events,
     aws_events_targets,
     aws_ecr,
+    aws_stepfunctions,
+    aws_stepfunctions_tasks,
 )
 from constructs import Construct
 
@@ -53,11 +55,19 @@ class ScheduledLambdaStack(Stack):
                 "dynamodb:UpdateItem",
                 "dynamodb:Scan",
                 "dynamodb:BatchWriteItem",
-                "dynamodb:BatchGetItem"
+                "dynamodb:BatchGetItem",
+                "dynamodb:DescribeTable"
             ],
             resources=["*"]  
         ))
 
+        # The scrape announces the rounds it changed on the default event bus
+        lambda_role.add_to_policy(aws_iam.PolicyStatement(
+            effect=aws_iam.Effect.ALLOW,
+            actions=["events:PutEvents"],
+            resources=[f"arn:aws:events:{self.region}:{self.account}:event-bus/default"]
+        ))
+
         lambda_role.add_to_policy(aws_iam.PolicyStatement(
             effect=aws_iam.Effect.ALLOW,
             actions=[
@@ -71,10 +81,11 @@ class ScheduledLambdaStack(Stack):
 
         ecr_repository_inference = aws_ecr.Repository.from_repository_name(self, "ECRRepoInference", "lambda-brownlow-inference-onnx")
 
-        # Define the Lambda function for Brownlow Inference using a Docker image 
+        # Single-invocation Brownlow Inference, with no trigger: scrape events start the fan-out
+        # below. Kept for manual runs, such as a `run_all` backfill of a season.
         lambda_inference_fn = aws_lambda.DockerImageFunction(self, "BrownlowInference",
             function_name="brownlow-inference",
-            description="Scheduled Lambda using Docker Image for Brownlow Inference",
+            description="Brownlow Inference in one invocation, run manually for backfills",
             code=aws_lambda.DockerImageCode.from_ecr(
                 repository=ecr_repository_inference,
                 tag_or_digest="20231217"
@@ -83,27 +94,104 @@ class ScheduledLambdaStack(Stack):
             timeout=cdk.Duration.minutes(15),
             memory_size=1024,
             environment={
-                "ENV_VARIABLE_NAME": "value"
+                "ENV_VARIABLE_NAME": "value",
+                "METRICS_ENABLED": "1"
             }
         )
 
-        # Create an EventBridge rule for Brownlow Inference
-        inference_schedule = aws_events.Rule(self, 'BrownlowInferenceScheduledRule',
-            rule_name="brownlow-inference-weekly",
-            description="Scheduled rule for brownlow-inference",
-            schedule=aws_events.Schedule.cron(minute="20", hour="9", day="4", month="*", year="*")
+        # Fan-out inference: the same image with one handler per step of the state machine
+        def orchestration_fn(construct_id, handler, timeout):
+            return aws_lambda.DockerImageFunction(self, construct_id,
+                function_name=f"brownlow-inference-{handler.replace('_', '-')}",
+                description=f"Brownlow Inference fan-out step: {handler}",
+                code=aws_lambda.DockerImageCode.from_ecr(
+                    repository=ecr_repository_inference,
+                    tag_or_digest="20231217",
+                    cmd=[f"orchestration.{handler}"]
+                ),
+                role=lambda_role,
+                timeout=timeout,
+                memory_size=1024,
+                environment={
+                    "ENV_VARIABLE_NAME": "value",
+                    "METRICS_ENABLED": "1"
+                }
+            )
+
+        plan_fn = orchestration_fn("BrownlowInferencePlan", "plan", cdk.Duration.minutes(2))
+        infer_round_fn = orchestration_fn("BrownlowInferenceRound", "infer_round", cdk.Duration.minutes(5))
+        aggregate_fn = orchestration_fn("BrownlowInferenceAggregate", "aggregate", cdk.Duration.minutes(1))
+
+        plan_step = aws_stepfunctions_tasks.LambdaInvoke(self, "PlanRounds",
+            lambda_function=plan_fn,
+            payload_response_only=True
         )
 
-        inference_schedule.add_target(aws_events_targets.LambdaFunction(
-            lambda_inference_fn,
-            event=aws_events.RuleTargetInput.from_object({
-                "bucket_to_save": "afl-game-data",
-                "data_path": "data/player-gamebygame/AFL-Tables_game-by-game-stats_",
+        # One worker per round; writes are keyed on HashKey and Model, so a retried round is a no-op
+        infer_round_step = aws_stepfunctions_tasks.LambdaInvoke(self, "InferRound",
+            lambda_function=infer_round_fn,
+            payload_response_only=True
+        )
+        infer_round_step.add_retry(
+            errors=["States.ALL"],
+            interval=cdk.Duration.seconds(10),
+            max_attempts=3,
+            backoff_rate=2
+        )
+        # The plan lowers the concurrency when the table's capacity cannot give every round a
+        # full batch a second
+        rounds_map = aws_stepfunctions.Map(self, "InferRounds",
+            items_path="$.tasks",
+            max_concurrency_path="$.max_concurrency",
+            result_path="$.results"
+        )
+        rounds_map.item_processor(infer_round_step)
+
+        aggregate_step = aws_stepfunctions_tasks.LambdaInvoke(self, "AggregateRounds",
+            lambda_function=aggregate_fn,
+            payload_response_only=True
+        )
+
+        inference_state_machine = aws_stepfunctions.StateMachine(self, "BrownlowInferenceFanOut",
+            state_machine_name="brownlow-inference-fan-out",
+            definition_body=aws_stepfunctions.DefinitionBody.from_chainable(
+                plan_step.next(rounds_map).next(aggregate_step)
+            ),
+            timeout=cdk.Duration.hours(1)
+        )
+
+        cdk.CfnOutput(self, "InferenceStateMachineArn", value=inference_state_machine.state_machine_arn)
+
+        # Run the fan-out as soon as a scrape announces changed rounds, rather than on a cron.
+        # Each changed round is scored by its own worker, so a large re-scrape finishes in
+        # about the time of one round.
+        inference_trigger = aws_events.Rule(self, 'BrownlowInferenceScrapedRule',
+            rule_name="brownlow-inference-on-scrape",
+            description="Runs brownlow-inference-fan-out on the rounds changed by brownlow-scrape",
+            event_pattern=aws_events.EventPattern(
+                source=["brownlow.scrape"],
+                detail_type=["Season scraped"]
+            )
+        )
+
+        inference_trigger.add_target(aws_events_targets.SfnStateMachine(
+            inference_state_machine,
+            input=aws_events.RuleTargetInput.from_object({
+                "bucket_to_save": aws_events.EventField.from_path("$.detail.bucket"),
+                # The scrape sends one of these, depending on how it stores the season
+                "dataset_path": aws_events.EventField.from_path("$.detail.dataset_path"),
+                "data_path": aws_events.EventField.from_path("$.detail.data_path"),
                 "model_path": "models/brownlow_player_single-game/afl_brownlow_player_single-game.onnx",
-                "year_to_query": 2024,
+                "year_to_query": aws_events.EventField.from_path("$.detail.year"),
+                "rounds": aws_events.EventField.from_path("$.detail.rounds"),
                 "region_name": "ap-southeast-2",
                 "table_name": "afl-brownlow-vote-predictions",
-                "projection_expression": "HashKey"
+                "progress_table_name": "afl-brownlow-inference-progress",
+                "leaderboard_table_name": "afl-brownlow-leaderboard",
+                "projection_expression": "HashKey",
+                # The 5 WCU provisioned on the predictions table. At this capacity the plan runs
+                # one round at a time, each writing at the full 5 WCU.
+                "max_wcu": 5
             })
         ))
 
@@ -121,7 +209,8 @@ class ScheduledLambdaStack(Stack):
             timeout=cdk.Duration.minutes(15),
             memory_size=1024,
             environment={
-                "ENV_VARIABLE_NAME": "value"
+                "ENV_VARIABLE_NAME": "value",
+                "METRICS_ENABLED": "1"
             }
         )
 
@@ -136,7 +225,9 @@ class ScheduledLambdaStack(Stack):
             lambda_scrape_fn,
             event=aws_events.RuleTargetInput.from_object({
                 "bucket_to_save": "afl-game-data",
-                "data_path": "data/player-gamebygame/AFL-Tables_game-by-game-stats_",
+                "dataset_path": "data/player-gamebygame/dataset/",
+                "cache_path": "cache/afl-tables-gbg/",
+                "event_bus_name": "default",
                 "year_to_query": 2024
             })
         ))
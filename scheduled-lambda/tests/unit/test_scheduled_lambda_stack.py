@@ -13,3 +13,40 @@ def test_sqs_queue_created():
 #     template.has_resource_properties("AWS::SQS::Queue", {
 #         "VisibilityTimeout": 300
 #     })
+
+def test_inference_fan_out_state_machine_created():
+    app = core.App()
+    stack = ScheduledLambdaStack(app, "scheduled-lambda")
+    template = assertions.Template.from_stack(stack)
+
+    template.resource_count_is("AWS::StepFunctions::StateMachine", 1)
+    for handler in ["orchestration.plan", "orchestration.infer_round", "orchestration.aggregate"]:
+        template.has_resource_properties("AWS::Lambda::Function", {
+            "ImageConfig": {"Command": [handler]}
+        })
+    definition = template.find_resources("AWS::StepFunctions::StateMachine")
+    assert "InferRounds" in str(definition)
+    assert "$.max_concurrency" in str(definition)
+
+def test_scrape_events_start_the_inference_fan_out():
+    app = core.App()
+    stack = ScheduledLambdaStack(app, "scheduled-lambda")
+    template = assertions.Template.from_stack(stack)
+
+    rules = template.find_resources("AWS::Events::Rule")
+    schedules = [r["Properties"].get("ScheduleExpression") for r in rules.values()]
+    assert [s for s in schedules if s] == ["cron(0 9 4 * ? *)"]
+    state_machine_id, = template.find_resources("AWS::StepFunctions::StateMachine")
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": {"source": ["brownlow.scrape"], "detail-type": ["Season scraped"]},
+        "Targets": [assertions.Match.object_like({
+            "Arn": {"Ref": state_machine_id},
+            "InputTransformer": assertions.Match.object_like({
+                "InputPathsMap": assertions.Match.object_like({
+                    "detail-rounds": "$.detail.rounds",
+                    "detail-dataset_path": "$.detail.dataset_path",
+                    "detail-data_path": "$.detail.data_path",
+                })
+            })
+        })]
+    })